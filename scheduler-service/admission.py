@@ -0,0 +1,259 @@
+import os
+import sys
+import time
+import uuid
+import itertools
+import threading
+from contextlib import contextmanager
+
+import cancellation
+
+# --- Tunable Parameters ---
+# Budgets for concurrently running solves in this container. Leave headroom
+# for the interpreter and Flask (~300MB) below the Cloud Run memory limit.
+ENABLED = os.environ.get("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+MEMORY_BUDGET_MB = float(os.environ.get("ADMISSION_MEMORY_MB", "1536"))
+CPU_BUDGET = int(os.environ.get("ADMISSION_CPUS", str(os.cpu_count() or 1)))
+MAX_QUEUE_LENGTH = 32
+MAX_QUEUE_WAIT_SECONDS = 120.0  # Well inside the 300s client timeout in the Next.js routes
+
+# Cost model: base + per 1k (employee, console-slot) pairs, capped at the solver's own memory limit,
+# for each of the parts decompose.run_parts / tiling solve at once (see _parallel_solves)
+BASE_JOB_MB = 64.0
+MB_PER_1K_PAIRS = 8.0
+
+# Priority classes: lower runs first
+PRIORITY_GENERATE = 0
+PRIORITY_SIMULATE_PENDING = 1
+PRIORITY_SIMULATE = 2
+
+# schedulingMode -> (priority, CP-SAT workers, solver memory cap in MB or None)
+# Workers/caps mirror NUM_SEARCH_WORKERS / MAX_MEMORY_MB in each scheduler module.
+# Greedy (team, draft) and repair (sub-second) jobs reserve no solver core so they are
+# never held back by CPU-bound solves already running.
+JOB_CLASSES = {
+    "individual": (PRIORITY_GENERATE, 8, None),
+    "team": (PRIORITY_GENERATE, 0, 128),
+    "competency": (PRIORITY_GENERATE, 2, 1024),
+    "repair": (PRIORITY_GENERATE, 0, 128),
+    "simulation-pending": (PRIORITY_SIMULATE_PENDING, 2, 1024),
+    "simulation": (PRIORITY_SIMULATE, 2, 1024),
+    "simulation-risk": (PRIORITY_SIMULATE, 4, 256),  # risk.MAX_PROCESSES sampling processes, no CP-SAT
+    "draft": (PRIORITY_GENERATE, 0, 128),  # Greedy only, milliseconds
+}
+DEFAULT_JOB_CLASS = "individual"
+# Modes whose scheduler splits by site; scheduler3/4/5 also split by console group and tile cycles
+SITE_SPLIT_MODES = ("individual", "competency", "simulation", "simulation-pending")
+CONSOLE_SPLIT_MODES = ("competency", "simulation", "simulation-pending")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a job cannot be queued (queue full) or waited too long."""
+
+    def __init__(self, message, retry_after_seconds):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class Job:
+    """One solve request waiting for, or holding, a share of the container budget."""
+
+    def __init__(self, mode, user, ticket, memory_mb, cpus, token=None):
+        self.mode = mode
+        self.token = token  # cancellation.CancelToken; a cancelled job leaves the queue
+        self.user = user
+        self.ticket = ticket or uuid.uuid4().hex
+        self.priority = JOB_CLASSES.get(mode, JOB_CLASSES[DEFAULT_JOB_CLASS])[0]
+        self.memory_mb = memory_mb
+        self.cpus = cpus
+        self.seq = 0
+        self.turn = 0
+        self.enqueued_at = None
+        self.admitted_at = None
+        self.queue_position = 0  # position when it arrived (0 = admitted straight away)
+
+    def sort_key(self):
+        # Priority class first, then round-robin across users within the class
+        return (self.priority, self.turn, self.seq)
+
+    def describe(self):
+        return {
+            "ticket": self.ticket,
+            "mode": self.mode,
+            "priority": self.priority,
+            "memoryMb": round(self.memory_mb, 1),
+            "cpus": self.cpus,
+            "waitedSeconds": round((self.admitted_at or time.time()) - self.enqueued_at, 3),
+        }
+
+
+def _parallel_solves(data, mode):
+    """
+    (solves running at once, backend) for a decomposing mode. Each level
+    (site parts, console parts inside those, tiled cycle days inside those)
+    runs up to decompose.MAX_PARALLEL_PARTS in parallel.
+    """
+    # OR-Tools comes with these; only reached for jobs about to load it anyway
+    import decompose
+    import site_registry
+    import solve_control
+    import tiling
+
+    limit = decompose.MAX_PARALLEL_PARTS
+    site_parts, console_parts = decompose.count_parts(
+        data, site_registry.from_payload(data), by_competency=mode in CONSOLE_SPLIT_MODES
+    )
+    solves = min(site_parts, limit) * min(console_parts, limit)
+    if mode in CONSOLE_SPLIT_MODES and tiling.enabled(data):
+        solves *= limit
+    backend = (data.get("solveOptions") or {}).get("backend") or solve_control.DEFAULT_BACKEND
+    return solves, backend
+
+
+def estimate_cost(data, mode):
+    """
+    (memory_mb, cpus) for one job from the instance size, before any model is built.
+    Pairs approximate the solver's eligible (employee, console slot) variables:
+    employees x console slots per day-shift, since pattern rules allow one shift a day.
+    A job split into parallel parts pays workers, base memory and the memory
+    cap once per part; its pairs are shared between them. HiGHS ("highs")
+    has no memory cap, so nothing caps the pairs estimate then.
+    """
+    _, workers, cap = JOB_CLASSES.get(mode, JOB_CLASSES[DEFAULT_JOB_CLASS])
+    solves, backend = _parallel_solves(data, mode) if mode in SITE_SPLIT_MODES else (1, None)
+    if backend == "highs":
+        cap = None  # Workers stay: models HiGHS can't take fall back to CP-SAT
+    requests_data = data.get("requests", [])
+    slots = 0
+    for req in requests_data:
+        comps = req.get("required_competencies") or {}
+        profs = req.get("required_proficiencies") or {}
+        slots += sum(int(c) for c in comps.values()) or sum(int(c) for c in profs.values())
+    shifts = len({req.get("shiftType") for req in requests_data}) or 1
+    pairs = len(data.get("employees", [])) * slots / shifts
+
+    memory_mb = BASE_JOB_MB * solves + MB_PER_1K_PAIRS * pairs / 1000.0
+    if cap is not None:
+        memory_mb = min(memory_mb, (BASE_JOB_MB + cap) * solves)
+    return memory_mb, min(workers * solves, CPU_BUDGET)
+
+
+class AdmissionController:
+    """
+    Admits jobs while their estimated memory and CPU fit the container budget.
+    The rest wait in one queue ordered by priority class, then by per-user turn,
+    then by arrival, so one user's burst cannot starve another user of the same
+    class. Only the head of the queue is admitted (no backfilling), which keeps
+    large jobs from being overtaken forever; a job bigger than the whole budget
+    runs once nothing else is running.
+    """
+
+    def __init__(self, memory_budget_mb=MEMORY_BUDGET_MB, cpu_budget=CPU_BUDGET,
+                 max_queue_length=MAX_QUEUE_LENGTH, max_wait_seconds=MAX_QUEUE_WAIT_SECONDS):
+        self.memory_budget_mb = memory_budget_mb
+        self.cpu_budget = cpu_budget
+        self.max_queue_length = max_queue_length
+        self.max_wait_seconds = max_wait_seconds
+        self._cond = threading.Condition()
+        self._queue = []
+        self._running = []
+        self._seq = itertools.count()
+
+    def _fits(self, job):
+        if not self._running:
+            return True
+        memory = sum(j.memory_mb for j in self._running)
+        cpus = sum(j.cpus for j in self._running)
+        return memory + job.memory_mb <= self.memory_budget_mb and cpus + job.cpus <= self.cpu_budget
+
+    def _enqueue(self, job):
+        job.seq = next(self._seq)
+        job.turn = sum(1 for q in self._queue if q.user == job.user and q.priority == job.priority)
+        job.enqueued_at = time.time()
+        self._queue.append(job)
+        self._queue.sort(key=Job.sort_key)
+        job.queue_position = self._queue.index(job)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def admit(self, job):
+        """
+        Block until `job` may run. Raises AdmissionRejected if the queue is full
+        or the wait times out, and cancellation.Cancelled if its token is cancelled.
+        """
+        unregister = job.token.on_cancel(self._wake) if job.token is not None else None
+        try:
+            self._admit(job)
+        finally:
+            if unregister is not None:
+                unregister()
+
+    def _admit(self, job):
+        with self._cond:
+            if len(self._queue) >= self.max_queue_length:
+                raise AdmissionRejected("Scheduler queue is full", retry_after_seconds=30)
+            self._enqueue(job)
+            deadline = job.enqueued_at + self.max_wait_seconds
+            while not (self._queue[0] is job and self._fits(job)):
+                if job.token is not None and job.token.cancelled:
+                    self._queue.remove(job)
+                    self._cond.notify_all()
+                    raise cancellation.Cancelled(job.token.reason)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._queue.remove(job)
+                    self._cond.notify_all()
+                    raise AdmissionRejected("Timed out waiting for scheduler capacity", retry_after_seconds=60)
+                self._cond.wait(remaining)
+            self._queue.pop(0)
+            job.admitted_at = time.time()
+            self._running.append(job)
+            self._cond.notify_all()
+
+        if job.queue_position or job.admitted_at - job.enqueued_at > 0.01:
+            sys.stderr.write(
+                f"Admission: {job.mode} job {job.ticket} admitted after {job.admitted_at - job.enqueued_at:.2f}s "
+                f"(arrived at position {job.queue_position}, est {job.memory_mb:.0f}MB/{job.cpus}cpu)\n"
+            )
+
+    def release(self, job):
+        with self._cond:
+            if job in self._running:
+                self._running.remove(job)
+            self._cond.notify_all()
+
+    @contextmanager
+    def admitted(self, job):
+        self.admit(job)
+        try:
+            yield job
+        finally:
+            self.release(job)
+
+    def position(self, ticket):
+        """{"state": "queued", "position": n, "ahead": n} / {"state": "running"} / None if unknown."""
+        with self._cond:
+            if any(j.ticket == ticket for j in self._running):
+                return {"state": "running"}
+            for i, job in enumerate(self._queue):
+                if job.ticket == ticket:
+                    return {"state": "queued", "position": i, "ahead": i}
+        return None
+
+    def snapshot(self):
+        with self._cond:
+            running = list(self._running)
+            return {
+                "budget": {"memoryMb": self.memory_budget_mb, "cpus": self.cpu_budget},
+                "inUse": {
+                    "memoryMb": round(sum(j.memory_mb for j in running), 1),
+                    "cpus": sum(j.cpus for j in running),
+                },
+                "running": [j.describe() for j in running],
+                "queued": [dict(j.describe(), position=i) for i, j in enumerate(self._queue)],
+            }
+
+
+controller = AdmissionController()
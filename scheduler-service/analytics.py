@@ -0,0 +1,239 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pymongo
+except ImportError:  # Only needed when reading straight from MongoDB
+    pymongo = None
+
+# --- Tunable Parameters ---
+MONGODB_URI = os.environ.get("MONGODB_URI")
+MONGODB_DB = os.environ.get("MONGODB_DB")  # Defaults to the database named in the URI
+MAX_CACHED_RESULTS = 16
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+ALL_GRADES = list(range(1, 10))
+# leave_type -> key used by the leave-trend chart
+LEAVE_TYPE_KEYS = {
+    "Annual leave": "annual",
+    "Medical leave": "medical",
+    "Hospitalisation Leave": "hospitalisation",
+}
+METRICS = ("deploymentRate", "leaves", "teamProficiency", "workforceStructure")
+
+_cache = OrderedDict()  # (year, grades, metrics, data_version) -> result
+_cache_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+
+
+class AnalyticsUnavailable(Exception):
+    """Raised when no data source is configured (no MONGODB_URI or pymongo missing)."""
+
+
+# --- Loading ---
+def _frame(records, columns):
+    return pd.DataFrame.from_records(records, columns=columns) if records else pd.DataFrame(columns=columns)
+
+
+def _year_bounds(year):
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def _database():
+    global _client
+    if pymongo is None:
+        raise AnalyticsUnavailable("pymongo is not installed")
+    if not MONGODB_URI:
+        raise AnalyticsUnavailable("MONGODB_URI is not set")
+    with _client_lock:
+        if _client is None:
+            _client = pymongo.MongoClient(MONGODB_URI)
+    return _client[MONGODB_DB] if MONGODB_DB else _client.get_default_database()
+
+
+def _mongo_version(db, year):
+    """
+    Cheap data version for one year: document counts and the newest update
+    time of the roster and leave collections, plus a hash of the user
+    attributes the metrics read. Any edit that changes a chart changes it.
+    """
+    start, end = _year_bounds(year)
+    parts = [str(year)]
+    for name in ("Rosters", "Leaves"):
+        collection = db[name]
+        match = {"date": {"$gte": start, "$lt": end}}
+        newest = collection.find_one(match, sort=[("updatedAt", -1)], projection={"updatedAt": 1})
+        parts.append(f"{name}:{collection.count_documents(match)}:{newest.get('updatedAt') if newest else ''}")
+    users = db["Users"].find({}, {"_id": 0, "user_id": 1, "account_type": 1, "proficiency_grade": 1, "team": 1})
+    user_rows = sorted(
+        f"{u.get('user_id')}|{u.get('account_type')}|{u.get('proficiency_grade')}|{u.get('team')}" for u in users
+    )
+    parts.append(hashlib.sha256("\n".join(user_rows).encode("utf-8")).hexdigest())
+    return hashlib.sha256("/".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def load_from_mongo(year):
+    """One query per collection for the whole year, straight into columnar frames."""
+    db = _database()
+    start, end = _year_bounds(year)
+    users = _frame(
+        list(db["Users"].find({}, {"_id": 0, "user_id": 1, "account_type": 1, "proficiency_grade": 1, "team": 1})),
+        ["user_id", "account_type", "proficiency_grade", "team"],
+    )
+    rosters = _frame(
+        list(db["Rosters"].find({"date": {"$gte": start, "$lt": end}}, {"_id": 0, "user_id": 1, "date": 1})),
+        ["user_id", "date"],
+    )
+    leaves = _frame(
+        list(db["Leaves"].find(
+            {"date": {"$gte": start, "$lt": end}, "status": "Approved"},
+            {"_id": 0, "user_id": 1, "date": 1, "leave_type": 1},
+        )),
+        ["user_id", "date", "leave_type"],
+    )
+    return users, rosters, leaves
+
+
+def load_from_payload(data):
+    """
+    Same frames from a request body: {"users": [...], "rosters": [...], "leaves": [...]},
+    using the Mongo field names. Leaves without a status are taken as approved.
+    """
+    users = _frame(data.get("users", []), ["user_id", "account_type", "proficiency_grade", "team"])
+    rosters = _frame(data.get("rosters", []), ["user_id", "date"])
+    leaves = pd.DataFrame(data.get("leaves", []))
+    if leaves.empty:
+        leaves = pd.DataFrame(columns=["user_id", "date", "leave_type"])
+    elif "status" in leaves.columns:
+        leaves = leaves[leaves["status"].fillna("Approved") == "Approved"]
+    return users, rosters, leaves[["user_id", "date", "leave_type"]]
+
+
+def payload_version(data, raw_body):
+    return data.get("dataVersion") or hashlib.sha256(raw_body).hexdigest()[:16]
+
+
+# --- Metrics ---
+def _months(dates, year):
+    """Month index 0..11 for each date in `year`, -1 outside it."""
+    # ISO8601 rather than inferring one format from the first row, which turns
+    # date-only strings mixed in with full timestamps into NaT
+    dates = pd.to_datetime(dates, utc=True, errors="coerce", format="ISO8601").dt.tz_localize(None)
+    months = dates.dt.month.to_numpy(dtype=float, na_value=np.nan) - 1
+    in_year = dates.dt.year.to_numpy(dtype=float, na_value=np.nan) == year
+    return np.where(in_year, months, -1).astype(int)
+
+
+def deployment_rate(users, rosters, year, grades):
+    """% of each grade's non-planner workforce rostered at least once per month."""
+    staff = users[users["account_type"] == "Non-Planner"]
+    workforce = staff.groupby("proficiency_grade").size().reindex(grades, fill_value=0).to_numpy()
+
+    grade_of = staff.set_index("user_id")["proficiency_grade"]
+    months = _months(rosters["date"], year)
+    deployed = pd.DataFrame({
+        "month": months,
+        "user_id": rosters["user_id"].to_numpy(),
+        "grade": rosters["user_id"].map(grade_of).to_numpy(),
+    })
+    deployed = deployed[(deployed["month"] >= 0) & deployed["grade"].notna()].drop_duplicates(["month", "user_id"])
+    counts = (
+        deployed.groupby(["month", "grade"]).size().unstack(fill_value=0)
+        .reindex(index=range(12), columns=grades, fill_value=0).to_numpy(dtype=float)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(workforce > 0, np.round(counts / workforce * 100.0, 2), 0.0)
+
+    result = []
+    for m in range(12):
+        row = {"month": MONTH_NAMES[m]}
+        for g_idx, grade in enumerate(grades):
+            row[f"grade_{grade}"] = float(rates[m, g_idx])
+        result.append(row)
+    return result
+
+
+def leave_trends(leaves, year):
+    """Approved annual/medical/hospitalisation leave days per month."""
+    months = _months(leaves["date"], year)
+    keys = leaves["leave_type"].map(LEAVE_TYPE_KEYS).to_numpy()
+    result = [{"month": MONTH_NAMES[m], **{k: 0 for k in LEAVE_TYPE_KEYS.values()}} for m in range(12)]
+    for key in LEAVE_TYPE_KEYS.values():
+        per_month = np.bincount(months[(keys == key) & (months >= 0)], minlength=12)
+        for m in range(12):
+            result[m][key] = int(per_month[m])
+    return result
+
+
+def team_proficiency(users):
+    """Headcount per team and grade (all accounts, as the existing chart shows)."""
+    known = users.dropna(subset=["team", "proficiency_grade"])
+    table = known.groupby([known["team"].astype(int), known["proficiency_grade"].astype(int)]).size().unstack()
+    result = []
+    for team, counts in table.iterrows():
+        row = {"team": int(team)}
+        row.update({str(grade): int(n) for grade, n in counts.dropna().items()})
+        result.append(row)
+    return result
+
+
+def workforce_structure(users):
+    """Non-planner headcount per grade 1-9."""
+    staff = users[users["account_type"] == "Non-Planner"]
+    counts = staff.groupby("proficiency_grade").size().reindex(ALL_GRADES, fill_value=0)
+    return [{"grade": str(grade), "count": int(n)} for grade, n in counts.items()]
+
+
+def compute(users, rosters, leaves, year, grades, metrics):
+    result = {}
+    if "deploymentRate" in metrics:
+        result["deploymentRate"] = deployment_rate(users, rosters, year, grades)
+    if "leaves" in metrics:
+        result["leaves"] = leave_trends(leaves, year)
+    if "teamProficiency" in metrics:
+        result["teamProficiency"] = team_proficiency(users)
+    if "workforceStructure" in metrics:
+        result["workforceStructure"] = workforce_structure(users)
+    return result
+
+
+# --- Cached entry point ---
+def get_analytics(year, grades=None, metrics=METRICS, data=None, raw_body=None):
+    """
+    Compute the requested metrics for `year`, from MongoDB or from a request
+    body (`data`). Results are cached by data version, so repeated dashboard
+    loads cost one version check. Returns (result, data_version, cached).
+    """
+    grades = list(grades or ALL_GRADES)
+    metrics = tuple(m for m in METRICS if m in metrics)
+
+    version = payload_version(data, raw_body) if data is not None else _mongo_version(_database(), year)
+    key = (year, tuple(grades), metrics, version)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key], version, True
+
+    start = time.time()
+    users, rosters, leaves = load_from_payload(data) if data is not None else load_from_mongo(year)
+    loaded = time.time()
+    result = compute(users, rosters, leaves, year, grades, metrics)
+    sys.stderr.write(
+        f"Analytics: year={year} users={len(users)} rosters={len(rosters)} leaves={len(leaves)} "
+        f"load={loaded - start:.3f}s compute={time.time() - loaded:.3f}s version={version}\n"
+    )
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > MAX_CACHED_RESULTS:
+            _cache.popitem(last=False)
+    return result, version, False
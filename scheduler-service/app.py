@@ -1,60 +1,123 @@
+import os
 import sys
+import time
 import traceback
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 
-# Import the main function from each scheduler
-from scheduler import main as individual_scheduler_main
-from scheduler2 import main as team_scheduler_main
-from scheduler3 import main as competency_scheduler_main
-from scheduler4 import main as simulation_scheduler_main
-from scheduler5 import main as simulation_pending_scheduler_main
+# Schedulers are imported lazily through the registry (see scheduler_registry.py)
+import scheduler_registry
+import reserve_pool
+import payload
+import solve_history
+import profiling
+import admission
+import corpus
+import cancellation
+import leave_impact
 
 app = Flask(__name__)
 
-@app.route('/generate-roster', methods=['POST'])
-def handle_generate_roster():
-    # Check if the request has JSON data
-    if not request.is_json:
-        return jsonify({"error": "Request must be JSON"}), 400
+# Set SCHEDULER_WARMUP=1 to import all schedulers in the background once the server is up
+WARMUP_ENABLED = os.environ.get("SCHEDULER_WARMUP", "0").lower() in ("1", "true", "yes")
 
-    # Get the data from the POST request
-    input_data = request.get_json()
-    scheduling_mode = input_data.get("schedulingMode", "individual")
-    
-    sys.stderr.write(f"Dispatcher: Received schedulingMode: {scheduling_mode}\n")
+def _cancelled_response(e):
+    # 409 tells a client that kept listening it was superseded; a disconnected client reads nothing
+    status = 409 if e.reason == "superseded" else 499
+    response = jsonify({"error": f"Solve cancelled ({e.reason})"})
+    response.status_code = status
+    return response
 
+def dispatch(input_data, scheduling_mode):
+    """
+    Run the scheduler for scheduling_mode under a cancel token: a newer request
+    with the same X-User-Id and X-Session-Id, or the client disconnecting,
+    stops the solve (see cancellation.py).
+    """
+    client_socket = request.environ.get("gunicorn.socket") or request.environ.get("werkzeug.socket")
+    with cancellation.supersedable(cancellation.request_key(request.headers)) as token, \
+            cancellation.watch_disconnect(client_socket, token), cancellation.attached(token):
+        return _dispatch(input_data, scheduling_mode, token)
+
+def _dispatch(input_data, scheduling_mode, token):
+    """Run the scheduler registered for scheduling_mode and turn its JSON string into a response."""
     try:
+        # Drop any index left over from an earlier solve on this worker thread
+        reserve_pool.take_published()
+
         # Call the appropriate scheduler based on the mode
-        if scheduling_mode == "team":
-            sys.stderr.write("Dispatcher: Calling team-based scheduler...\n")
-            result = team_scheduler_main(input_data)
-        elif scheduling_mode == "competency":
-            sys.stderr.write("Dispatcher: Calling competency-based scheduler...\n")
-            result = competency_scheduler_main(input_data)
-        elif scheduling_mode == "simulation":
-            sys.stderr.write("Dispatcher: Calling simulation-based scheduler (Scheduler4)...\n")
-            result = simulation_scheduler_main(input_data)
-        elif scheduling_mode == "simulation-pending":
-            sys.stderr.write("Dispatcher: Calling simulation-pending scheduler (Scheduler5)...\n")
-            result = simulation_pending_scheduler_main(input_data)
-        else:
-            sys.stderr.write("Dispatcher: Calling individual-based scheduler...\n")
-            result = individual_scheduler_main(input_data)
+        sys.stderr.write(f"Dispatcher: Calling {scheduler_registry.describe_mode(scheduling_mode)}...\n")
+        scheduler_main = scheduler_registry.get_scheduler(scheduling_mode)
+
+        # Wait for a share of the container's memory/CPU budget (see admission.py)
+        mode = scheduler_registry.resolve_mode(scheduling_mode)
+        memory_mb, cpus = admission.estimate_cost(input_data, mode)
+        job = admission.Job(
+            mode,
+            user=request.headers.get("X-User-Id") or request.remote_addr,
+            ticket=request.headers.get("X-Request-Id"),
+            memory_mb=memory_mb,
+            cpus=cpus,
+            token=token,
+        )
+        try:
+            if admission.ENABLED:
+                admission.controller.admit(job)
+        except admission.AdmissionRejected as e:
+            response = jsonify({"error": str(e), "ticket": job.ticket})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(e.retry_after_seconds)
+            return response
+        except cancellation.Cancelled as e:
+            return _cancelled_response(e)
+        # Opt-in corpus recording for replay (see corpus.py)
+        recording = corpus.Recording() if corpus.enabled() else None
+        started = time.time()
+        try:
+            with profiling.profile_request(profiling.requested(request.headers, input_data), scheduling_mode) as profile, \
+                    corpus.attached(recording):
+                result = scheduler_main(input_data)
+        except cancellation.Cancelled as e:
+            sys.stderr.write(f"Dispatcher: {scheduling_mode} solve cancelled after {time.time() - started:.2f}s ({e.reason})\n")
+            response = _cancelled_response(e)
+            if recording is not None:
+                corpus.record(input_data, mode, response.status_code, time.time() - started, recording)
+            return response
+        except Exception:
+            if recording is not None:
+                corpus.record(input_data, mode, 500, time.time() - started, recording)
+            raise
+        finally:
+            if admission.ENABLED:
+                admission.controller.release(job)
+        elapsed = time.time() - started
         
         # The result from either scheduler is a JSON string. Parse it.
         parsed_result = json.loads(result)
         
         # Check if the parsed result contains an error
         if isinstance(parsed_result, dict) and "error" in parsed_result:
-            return jsonify(parsed_result), 400
-        
-        # Return the successful roster JSON
-        return app.response_class(
-            response=result,
-            status=200,
-            mimetype='application/json'
-        )
+            response = jsonify(parsed_result)
+            response.status_code = 400
+        else:
+            # Return the successful roster JSON
+            response = app.response_class(
+                response=result,
+                status=200,
+                mimetype='application/json'
+            )
+            reserve_index_id = reserve_pool.take_published()
+            if reserve_index_id:
+                response.headers["X-Reserve-Index-Id"] = reserve_index_id
+        if profile is not None:
+            response.headers["X-Profile-Id"] = profile.profile_id
+        if admission.ENABLED:
+            response.headers["X-Queue-Ticket"] = job.ticket
+            response.headers["X-Queue-Position"] = str(job.queue_position)
+            response.headers["X-Queue-Wait-Ms"] = str(int((job.admitted_at - job.enqueued_at) * 1000))
+        if recording is not None:
+            corpus.record(input_data, mode, response.status_code, elapsed, recording)
+        return response
 
     except Exception as e:
         # Log the error for debugging, including full traceback
@@ -62,5 +125,215 @@ def handle_generate_roster():
         print(traceback.format_exc(), file=sys.stderr)
         return jsonify({"error": "An internal error occurred during roster generation."} ), 500
 
+@app.route('/generate-roster', methods=['POST'])
+def handle_generate_roster():
+    # Check if the request has JSON data
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    # Decode and validate the body in one pass; bad input is rejected before any solver work
+    try:
+        input_data = payload.decode_request(request.get_data())
+    except payload.SnapshotNotFound as e:
+        # Evicted or uploaded to another instance: the client re-uploads and retries
+        return jsonify({"error": str(e), "details": e.details}), 404
+    except payload.PayloadError as e:
+        sys.stderr.write(f"Dispatcher: Rejected payload: {e} {e.details}\n")
+        return jsonify({"error": str(e), "details": e.details}), 400
+    scheduling_mode = input_data["schedulingMode"]
+    
+    sys.stderr.write(f"Dispatcher: Received schedulingMode: {scheduling_mode}\n")
+    return dispatch(input_data, scheduling_mode)
+
+@app.route('/coordinate-roster', methods=['POST'])
+def handle_coordinate_roster():
+    # Same body as /generate-roster; shards are solved on the COORDINATOR_PEERS instances (see coordinator.py).
+    # Imported here: it pulls in decompose and the solver, which app.py leaves to the scheduler registry.
+    import coordinator
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    try:
+        input_data = payload.decode_request(request.get_data())
+    except payload.SnapshotNotFound as e:
+        return jsonify({"error": str(e), "details": e.details}), 404
+    except payload.PayloadError as e:
+        return jsonify({"error": str(e), "details": e.details}), 400
+
+    reserve_pool.take_published()
+    body, status = coordinator.coordinate(input_data, user=request.headers.get("X-User-Id") or request.remote_addr)
+    response = jsonify(body)
+    response.status_code = status
+    reserve_index_id = reserve_pool.take_published()
+    if reserve_index_id:
+        response.headers["X-Reserve-Index-Id"] = reserve_index_id
+    return response
+
+@app.route('/leave-impact', methods=['POST'])
+def handle_leave_impact():
+    # Coverage change from approving candidateLeaves, by incremental matching (see leave_impact.py)
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    try:
+        input_data = payload.decode_request(request.get_data())
+    except payload.SnapshotNotFound as e:
+        return jsonify({"error": str(e), "details": e.details}), 404
+    except payload.PayloadError as e:
+        return jsonify({"error": str(e), "details": e.details}), 400
+    body, status = leave_impact.evaluate(input_data)
+    return jsonify(body), status
+
+@app.route('/reserve-pool/<index_id>', methods=['GET'])
+def handle_reserve_pool(index_id):
+    # Whole reserve pool index, for a coordinator merging its peers' indexes
+    entry = reserve_pool.get_index(index_id=index_id)
+    if entry is None:
+        return jsonify({"success": False, "message": "Unknown or evicted reserve pool index"}), 404
+    return jsonify({"success": True, "source": entry["source"], "data": entry["index"]})
+
+@app.route('/workforce-snapshots', methods=['POST'])
+def handle_store_snapshot():
+    # Upload {"employees": [...]} once; later payloads send "workforceSnapshot": <snapshotId> instead
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    try:
+        snapshot_id, employee_count = payload.store_snapshot(request.get_data())
+    except payload.PayloadError as e:
+        return jsonify({"error": str(e), "details": e.details}), 400
+    return jsonify({"success": True, "data": {"snapshotId": snapshot_id, "employees": employee_count}})
+
+@app.route('/workforce-snapshots/<snapshot_id>', methods=['GET'])
+def handle_snapshot(snapshot_id):
+    snapshot = payload.get_snapshot(snapshot_id)
+    if snapshot is None:
+        return jsonify({"success": False, "message": "Unknown or evicted snapshot"}), 404
+    employees, workforce = snapshot
+    return jsonify({"success": True, "data": {
+        "snapshotId": snapshot_id,
+        "employees": len(employees),
+        "competencies": len(workforce.competency_names),
+    }})
+
+@app.route('/repair-roster', methods=['POST'])
+def handle_repair_roster():
+    # Same-day disruption repair: minimum-change fix of an existing roster
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    try:
+        input_data = payload.decode_repair(request.get_data())
+    except payload.PayloadError as e:
+        sys.stderr.write(f"Dispatcher: Rejected repair payload: {e} {e.details}\n")
+        return jsonify({"error": str(e), "details": e.details}), 400
+    return dispatch(input_data, "repair")
+
+@app.route('/replacements', methods=['GET', 'POST'])
+def handle_replacements():
+    # Answers "who can cover console X on date D, shift S" from the reserve pool
+    # index `indexId`, or else the last roster (not simulation) solve covering that date.
+    params = (request.get_json(silent=True) or {}) if request.method == "POST" else request.args
+    date = params.get("date")
+    shift_name = params.get("shift") or params.get("shiftType")
+    console = params.get("console") or params.get("required_console")
+    min_grade = params.get("min_proficiency_grade")
+    index_id = params.get("indexId")
+
+    if not date or not shift_name:
+        return jsonify({"success": False, "message": "Missing date or shift"}), 400
+
+    try:
+        min_grade = int(min_grade) if min_grade is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "min_proficiency_grade must be an integer"}), 400
+
+    candidates, used_index_id = reserve_pool.find_replacements(
+        date, shift_name, console=console, min_grade=min_grade, index_id=index_id
+    )
+    if candidates is None:
+        return jsonify({"success": False, "message": "No reserve pool index covers this date"}), 404
+
+    return jsonify({"success": True, "indexId": used_index_id, "data": candidates})
+
+@app.route('/solve-history', methods=['GET'])
+def handle_solve_history():
+    # Recorded CP-SAT runs (see solve_history.py); ?summary=1 aggregates per scheduler
+    if not solve_history.enabled():
+        return jsonify({"success": False, "message": "Solve history is disabled (set SOLVE_HISTORY_DB)"}), 503
+    try:
+        hours = request.args.get("hours", type=float)
+        since = time.time() - hours * 3600 if hours else None
+        if request.args.get("summary"):
+            return jsonify({"success": True, "data": solve_history.summary(since)})
+        runs = solve_history.recent(
+            label=request.args.get("label"),
+            mode=request.args.get("mode"),
+            fingerprint=request.args.get("fingerprint"),
+            since=since,
+            limit=request.args.get("limit", solve_history.DEFAULT_QUERY_LIMIT, type=int),
+        )
+        return jsonify({"success": True, "data": runs})
+    except Exception as e:
+        print(f"Error reading solve history: {e}", file=sys.stderr)
+        return jsonify({"success": False, "message": "Solve history is unavailable"}), 500
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+@app.route('/profiles/<profile_id>/<name>', methods=['GET'])
+def handle_profile(profile_id, name="summary.json"):
+    # Artifacts from a request sent with X-Debug-Profile: 1 (id is in its X-Profile-Id header).
+    # Files: summary.json, profile.txt, profile.pstats, solver.log
+    path = profiling.artifact_path(profile_id, name)
+    if path is None:
+        return jsonify({"success": False, "message": "Unknown or expired profile"}), 404
+    return send_file(path, as_attachment=name.endswith(".pstats"))
+
+@app.route('/analytics', methods=['GET', 'POST'])
+def handle_analytics():
+    # Dashboard metrics in one pass (see analytics.py). GET reads MongoDB; POST takes
+    # {"users", "rosters", "leaves"} in the body. pandas is only imported on first use.
+    import analytics
+
+    params = request.args
+    try:
+        year = int(params.get("year", time.localtime().tm_year))
+        grades = [int(g) for g in params["grades"].split(",")] if params.get("grades") else None
+    except ValueError:
+        return jsonify({"success": False, "message": "year and grades must be integers"}), 400
+    metrics = params["metrics"].split(",") if params.get("metrics") else analytics.METRICS
+
+    try:
+        if request.method == "POST":
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({"success": False, "message": "Request must be JSON"}), 400
+            result, version, cached = analytics.get_analytics(year, grades, metrics, data=data, raw_body=request.get_data())
+        else:
+            result, version, cached = analytics.get_analytics(year, grades, metrics)
+    except analytics.AnalyticsUnavailable as e:
+        return jsonify({"success": False, "message": f"Analytics data source unavailable: {e}"}), 503
+    except Exception as e:
+        print(f"Error computing analytics: {e}", file=sys.stderr)
+        print(traceback.format_exc(), file=sys.stderr)
+        return jsonify({"success": False, "message": "Failed to compute analytics."}), 500
+
+    return jsonify({"success": True, "dataVersion": version, "cached": cached, "data": result})
+
+@app.route('/queue', methods=['GET'])
+def handle_queue():
+    # Running and waiting solves with their estimated cost
+    return jsonify({"success": True, "data": admission.controller.snapshot()})
+
+@app.route('/queue/<ticket>', methods=['GET'])
+def handle_queue_position(ticket):
+    # Poll with the X-Request-Id sent on /generate-roster while it is waiting
+    position = admission.controller.position(ticket)
+    if position is None:
+        return jsonify({"success": False, "message": "Unknown ticket (finished or never queued)"}), 404
+    return jsonify({"success": True, "data": position})
+
+@app.route('/healthz', methods=['GET'])
+def handle_healthz():
+    return jsonify({"status": "ok", "loaded_schedulers": scheduler_registry.loaded_modules()})
+
 if __name__ == '__main__':
+    if WARMUP_ENABLED:
+        scheduler_registry.start_warmup()
     app.run(host='0.0.0.0', port=5000)
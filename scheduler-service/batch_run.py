@@ -0,0 +1,285 @@
+"""
+Batch runner for offline rebuilds and back-fills (replaces run_scheduler_helper.py,
+which ran one temp_input.json through scheduler2).
+
+Reads payloads from JSON files, directories of JSON files, or NDJSON files
+(one payload per line; "-" reads NDJSON from stdin), picks the scheduler
+from each payload's schedulingMode, and runs them on a pool of worker
+processes. Every finished job streams two NDJSON lines, in completion order:
+
+    {"type": "result", "job": ..., "mode": ..., "result": <roster or {"error": ...}>}
+    {"type": "stats", "job": ..., "mode": ..., "ok": ..., "seconds": ..., "solves": [...], ...}
+
+    python batch_run.py months/ --jobs 8 --time-limit 120 --out backfill.ndjson
+    python batch_run.py departments.ndjson --mode simulation --stats-only
+    python batch_run.py temp_input.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+# --- Tunable Parameters ---
+KILL_GRACE_SECONDS = 30  # Hard kill this long after a job's solver time limit has passed
+
+# Cores one job can keep busy: each scheduler's NUM_SEARCH_WORKERS, times the
+# parts scheduler3/4/5 solve at once (decompose.MAX_PARALLEL_PARTS, up to 4).
+# Kept here so the driver doesn't import OR-Tools just to size the pool.
+THREADS_PER_JOB = {
+    "individual": 8,
+    "team": 1,
+    "competency": 2 * 4,
+    "simulation": 2 * 4,
+    "simulation-pending": 2 * 4,
+    "repair": 1,
+    "simulation-risk": 4,  # risk.MAX_PROCESSES, for runs big enough to use its pool
+    "draft": 1,
+}
+
+
+def default_jobs(mode=None):
+    """
+    Worker processes that fill the cores without oversubscribing them: by
+    `mode` when every job runs it, else by the hungriest mode, since each
+    payload picks its own.
+    """
+    threads = THREADS_PER_JOB.get(mode) if mode else None
+    if threads is None:
+        threads = max(THREADS_PER_JOB.values())
+    return max(1, (os.cpu_count() or 1) // threads)
+
+
+# --- Input ---
+def iter_jobs(paths):
+    """Yield (job_id, raw_bytes) from files, directories and NDJSON streams."""
+    for path in paths:
+        if path == "-":
+            for line_no, line in enumerate(sys.stdin.buffer, 1):
+                if line.strip():
+                    yield f"stdin:{line_no}", line
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json"):
+                    with open(os.path.join(path, name), "rb") as f:
+                        yield name, f.read()
+        elif path.endswith((".ndjson", ".jsonl")):
+            with open(path, "rb") as f:
+                for line_no, line in enumerate(f, 1):
+                    if line.strip():
+                        yield f"{os.path.basename(path)}:{line_no}", line
+        else:
+            with open(path, "rb") as f:
+                yield os.path.basename(path), f.read()
+
+
+# --- Worker process ---
+def _run_job(raw, mode_override, time_limit):
+    """Decode, solve and describe one payload. Runs inside a worker process."""
+    import payload
+    import corpus
+    import scheduler_registry
+
+    started = time.time()
+    mode = mode_override
+    try:
+        body = json.loads(raw)
+        if mode:
+            body["schedulingMode"] = mode
+        mode = scheduler_registry.resolve_mode(body.get("schedulingMode"))
+        # Repair payloads aren't roster payloads; app.py passes them through as well
+        data = body if mode == "repair" else payload.decode_request(json.dumps(body).encode("utf-8"))
+        if time_limit is not None:
+            data["solveOptions"] = dict(data.get("solveOptions") or {})
+            data["solveOptions"].setdefault("maxTimeSeconds", time_limit)
+
+        recording = corpus.Recording()
+        with corpus.attached(recording):
+            result = json.loads(scheduler_registry.get_scheduler(mode)(data))
+        solves = recording.solves
+        ok = not (isinstance(result, dict) and "error" in result)
+    except payload.PayloadError as e:
+        result, solves, ok = {"error": str(e), "details": e.details}, [], False
+    except Exception as e:
+        traceback.print_exc()
+        result, solves, ok = {"error": f"{type(e).__name__}: {e}"}, [], False
+
+    stats = {
+        "mode": mode,
+        "ok": ok,
+        "seconds": round(time.time() - started, 3),
+        "solves": solves,
+    }
+    return result, stats
+
+
+def _worker_loop(conn, quiet):
+    if quiet:
+        sys.stderr = open(os.devnull, "w")
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        seq, job_id, raw, mode_override, time_limit = job
+        result, stats = _run_job(raw, mode_override, time_limit)
+        conn.send((seq, result, stats))
+
+
+class Worker:
+    """One long-lived worker process; replaced if a job has to be killed."""
+
+    def __init__(self, context, quiet):
+        self.context = context
+        self.quiet = quiet
+        self.job = None
+        self.deadline = None
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_loop, args=(child_conn, self.quiet), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def submit(self, job, kill_after):
+        self.job = job
+        self.started = time.time()
+        self.deadline = self.started + kill_after if kill_after else None
+        self.conn.send(job)
+
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.job = None
+        self._start()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+# --- Driver ---
+def run_batch(jobs, emit, workers=None, mode=None, time_limit=None, kill_after=None, quiet=False):
+    """
+    Run (job_id, raw) pairs on `workers` processes (default_jobs(mode) if not
+    given), calling emit(job_id, result, stats)
+    as each finishes. Jobs still running `kill_after` seconds after they started
+    are killed and reported as errors. Returns (succeeded, failed).
+    """
+    if workers is None:
+        workers = default_jobs(mode)
+    context = multiprocessing.get_context("spawn")
+    pool = [Worker(context, quiet) for _ in range(max(1, workers))]
+    pending = iter(enumerate(jobs))
+    succeeded = failed = 0
+    exhausted = False
+
+    def feed(worker):
+        nonlocal exhausted
+        if exhausted:
+            return
+        try:
+            seq, (job_id, raw) = next(pending)
+        except StopIteration:
+            exhausted = True
+            return
+        worker.submit((seq, job_id, raw, mode, time_limit), kill_after)
+
+    def finish(worker, result, stats):
+        nonlocal succeeded, failed
+        seq, job_id = worker.job[:2]
+        stats = dict({"job": job_id, "seq": seq, "worker": worker.process.pid}, **stats)
+        if not stats["ok"] and isinstance(result, dict):
+            stats["error"] = result.get("error")
+        emit(job_id, result, stats)
+        if stats["ok"]:
+            succeeded += 1
+        else:
+            failed += 1
+
+    try:
+        for worker in pool:
+            feed(worker)
+        while any(w.job is not None for w in pool):
+            busy = {w.conn: w for w in pool if w.job is not None}
+            deadlines = [w.deadline for w in busy.values() if w.deadline is not None]
+            timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+            for conn in wait(list(busy), timeout):
+                worker = busy[conn]
+                try:
+                    _, result, stats = conn.recv()
+                except (EOFError, OSError):
+                    # The worker died (e.g. out of memory); report and replace it
+                    finish(worker, {"error": "Worker process exited"},
+                           {"mode": mode, "ok": False, "seconds": round(time.time() - worker.started, 3), "solves": []})
+                    worker.restart()
+                else:
+                    finish(worker, result, stats)
+                    worker.job = None
+                feed(worker)
+            now = time.time()
+            for worker in pool:
+                if worker.job is not None and worker.deadline is not None and now >= worker.deadline:
+                    finish(worker, {"error": f"Killed after {kill_after:g}s"},
+                           {"mode": mode, "ok": False, "seconds": round(now - worker.started, 3), "solves": []})
+                    worker.restart()
+                    feed(worker)
+    finally:
+        for worker in pool:
+            worker.stop()
+    return succeeded, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many scheduler payloads in parallel, streaming NDJSON.")
+    parser.add_argument("inputs", nargs="+", help="JSON files, directories of JSON files, NDJSON files, or - for stdin")
+    parser.add_argument("--jobs", type=int,
+                        help="worker processes (default: cores divided by the solver threads one job of --mode uses)")
+    parser.add_argument("--mode", help="override every payload's schedulingMode")
+    parser.add_argument("--time-limit", type=float,
+                        help="solver time limit per job in seconds (unless the payload sets solveOptions.maxTimeSeconds)")
+    parser.add_argument("--kill-after", type=float,
+                        help=f"hard wall-clock limit per job (default: time limit + {KILL_GRACE_SECONDS}s when one is set)")
+    parser.add_argument("--out", help="write NDJSON here instead of stdout")
+    parser.add_argument("--stats-only", action="store_true", help="emit only the per-job stats lines")
+    parser.add_argument("--quiet", action="store_true", help="silence scheduler logs from the workers")
+    args = parser.parse_args()
+
+    if args.jobs is None:
+        args.jobs = default_jobs(args.mode)
+    kill_after = args.kill_after
+    if kill_after is None and args.time_limit is not None:
+        kill_after = args.time_limit + KILL_GRACE_SECONDS
+
+    out = open(args.out, "w") if args.out else sys.stdout
+
+    def emit(job_id, result, stats):
+        if not args.stats_only:
+            out.write(json.dumps({"type": "result", "job": job_id, "mode": stats["mode"], "result": result}) + "\n")
+        out.write(json.dumps(dict(stats, type="stats")) + "\n")
+        out.flush()
+
+    started = time.time()
+    try:
+        succeeded, failed = run_batch(iter_jobs(args.inputs), emit, args.jobs, args.mode, args.time_limit,
+                                      kill_after, args.quiet)
+    finally:
+        if args.out:
+            out.close()
+    sys.stderr.write(
+        f"Batch: {succeeded + failed} jobs ({failed} failed) in {time.time() - started:.1f}s on {args.jobs} workers\n"
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+CP-SAT vs HiGHS on the same instances.
+
+Runs each scheduler end to end once per backend (solveOptions.backend) and
+reports wall time, time spent in the solver, status and objective, so the
+"auto" rule in solve_control.choose_backend can be checked against real
+instance shapes:
+
+    python bench_backends.py --sizes 40x9,120x28,300x28 --modes competency,simulation
+    python bench_backends.py --payload simulation=big_sim.json --profile thorough
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+import payload
+import corpus
+import scheduler_registry
+from bench_load import build_payload, parse_payload_arg
+
+BACKENDS = ("cp-sat", "highs")
+
+
+def run_backend(body, mode, backend, profile=None, time_limit=None):
+    """One end-to-end run; returns a result row."""
+    body = dict(body, schedulingMode=mode)
+    options = dict(body.get("solveOptions") or {}, backend=backend)
+    if time_limit is not None:
+        options["maxTimeSeconds"] = time_limit
+    body["solveOptions"] = options
+    if profile:
+        body["solveProfile"] = profile
+    data = payload.decode_request(json.dumps(body).encode("utf-8"))
+
+    recording = corpus.Recording()
+    started = time.time()
+    with corpus.attached(recording):
+        result = json.loads(scheduler_registry.get_scheduler(mode)(data))
+    wall = time.time() - started
+
+    solves = recording.solves
+    objectives = [s["objective"] for s in solves]
+    return {
+        "backend": backend,
+        "ran_on": sorted({s.get("backend") for s in solves}),
+        "wall_seconds": round(wall, 3),
+        "solve_seconds": round(sum(s["searchSeconds"] for s in solves), 3),
+        "solves": len(solves),
+        "status": "OPTIMAL" if solves and all(s["status"] == "OPTIMAL" for s in solves)
+                  else ",".join(sorted({s["status"] for s in solves})),
+        "objective": None if None in objectives or not objectives else sum(objectives),
+        "num_vars": max((s["numVars"] for s in solves), default=0),
+        "error": result.get("error") if isinstance(result, dict) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare solver backends on the same scheduler instances.")
+    parser.add_argument("--modes", default="competency,simulation,simulation-pending")
+    parser.add_argument("--sizes", default="40x9,120x28,300x28", help="EMPLOYEESxDAYS list for built-in payloads")
+    parser.add_argument("--payload", action="append", default=[], help="mode=path, repeatable (replaces --sizes)")
+    parser.add_argument("--profile", help="solveProfile for every run")
+    parser.add_argument("--time-limit", type=float, help="solveOptions.maxTimeSeconds for every run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep scheduler logs")
+    args = parser.parse_args()
+
+    instances = []
+    if args.payload:
+        for spec in args.payload:
+            mode, body, _ = parse_payload_arg(spec)
+            instances.append((spec.partition("=")[2], mode, body))
+    else:
+        for size in args.sizes.split(","):
+            employees, days = (int(n) for n in size.lower().split("x"))
+            for mode in args.modes.split(","):
+                instances.append((size, mode, build_payload(mode, employees, days, args.seed)))
+
+    rows = []
+    with contextlib.ExitStack() as stack:
+        quiet = sys.stderr if args.verbose else stack.enter_context(open(os.devnull, "w"))
+        for name, mode, body in instances:
+            for backend in BACKENDS:
+                with contextlib.redirect_stderr(quiet):
+                    row = run_backend(body, mode, backend, args.profile, args.time_limit)
+                rows.append(dict(row, instance=name, mode=mode))
+                if not args.json:
+                    print(
+                        f"{name:>10} {mode:<19} {backend:<7} ran_on={','.join(row['ran_on']) or '-':<7} "
+                        f"vars={row['num_vars']:>7} wall={row['wall_seconds']:>8.2f}s solve={row['solve_seconds']:>8.2f}s "
+                        f"{row['status']:<9} objective={row['objective']}" + (f" error={row['error']}" if row["error"] else ""),
+                        flush=True,
+                    )
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Cold start benchmark for the dispatcher.
+
+Starts app.py in a fresh interpreter, then measures:
+  - import time of the app module
+  - time from process launch until the first successful /generate-roster response
+
+Run with --eager to preload every scheduler before serving (the old behaviour)
+so the two can be compared:
+
+    python bench_cold_start.py --runs 5
+    python bench_cold_start.py --runs 5 --eager
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Server bootstrap executed in the child interpreter. Prints the app import time
+# on stdout so the parent can collect it.
+BOOT_SCRIPT = """
+import sys, time
+t0 = time.time()
+import app
+import_seconds = time.time() - t0
+if {eager}:
+    import scheduler_registry
+    scheduler_registry.load_all()
+print(f"IMPORT {{import_seconds:.4f}} READY {{time.time() - t0:.4f}}", flush=True)
+app.app.run(host="127.0.0.1", port={port})
+"""
+
+
+def build_team_payload():
+    """Small team-mode payload that the greedy scheduler can always satisfy."""
+    employees = []
+    for team_id in range(1, 10):
+        for grade in (9, 8, 7):
+            employees.append({"id": f"t{team_id}g{grade}", "proficiency_grade": grade, "team": team_id})
+    requests = [
+        {"date": "2026-03-01", "shiftType": "Morning", "location": "East", "required_proficiencies": {"9": 1, "7": 1}},
+        {"date": "2026-03-01", "shiftType": "Morning", "location": "West", "required_proficiencies": {"8": 1}},
+    ]
+    return {"employees": employees, "requests": requests, "leaveData": {}, "schedulingMode": "team"}
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def post_json(url, payload, timeout):
+    body = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.status, resp.read()
+
+
+def run_once(payload, eager, timeout):
+    port = free_port()
+    script = BOOT_SCRIPT.format(eager=bool(eager), port=port)
+    launched = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", script],
+        cwd=SERVICE_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        line = proc.stdout.readline().split()
+        import_seconds = float(line[1]) if len(line) >= 2 else float("nan")
+        url = f"http://127.0.0.1:{port}/generate-roster"
+        while True:
+            if time.time() - launched > timeout:
+                raise TimeoutError("server did not answer in time")
+            try:
+                status, _ = post_json(url, payload, timeout)
+                if status == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        first_response_seconds = time.time() - launched
+    finally:
+        proc.terminate()
+        proc.wait()
+    return import_seconds, first_response_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dispatcher cold start time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--eager", action="store_true", help="preload all schedulers before serving")
+    parser.add_argument("--payload", help="JSON payload file (defaults to a small team-mode roster)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.payload:
+        with open(args.payload, "r") as f:
+            payload = json.load(f)
+    else:
+        payload = build_team_payload()
+
+    imports, firsts = [], []
+    for i in range(args.runs):
+        import_s, first_s = run_once(payload, args.eager, args.timeout)
+        imports.append(import_s)
+        firsts.append(first_s)
+        sys.stderr.write(f"run {i + 1}: import={import_s:.3f}s first_response={first_s:.3f}s\n")
+
+    print(json.dumps({
+        "mode": payload.get("schedulingMode", "individual"),
+        "eager": args.eager,
+        "runs": args.runs,
+        "import_median_s": round(statistics.median(imports), 4),
+        "first_response_median_s": round(statistics.median(firsts), 4),
+        "first_response_max_s": round(max(firsts), 4),
+    }))
+
+
+if __name__ == "__main__":
+    main()
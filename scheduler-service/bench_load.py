@@ -0,0 +1,323 @@
+"""
+Concurrent load test for the scheduler HTTP service.
+
+Starts the service in a child process (gunicorn with the Dockerfile's
+worker/thread layout, or Flask's threaded dev server) unless --url points at
+one already running, then replays a weighted mix of scheduling modes and
+reports throughput, latency percentiles, error rates and peak server memory.
+
+Closed loop (each of --concurrency clients sends its next request as soon as
+the last one returns):
+
+    python bench_load.py --concurrency 4 --duration 60
+
+Open loop (Poisson arrivals at --rate req/s; latency is measured from the
+scheduled arrival so queueing in front of a saturated server is counted):
+
+    python bench_load.py --rate 2 --concurrency 16 --duration 60
+
+Use your own payloads, optionally weighted:
+
+    python bench_load.py --payload simulation=big_sim.json:3 --payload team=team.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_cold_start import SERVICE_DIR, free_port, build_team_payload
+
+MODES = ["individual", "team", "competency", "simulation", "simulation-pending"]
+CONSOLES = ["East Control", "VTIS West", "Pilot", "Radar", "Berth"]
+MEMORY_SAMPLE_SECONDS = 0.2
+
+FLASK_BOOT_SCRIPT = """
+import app
+app.app.run(host="127.0.0.1", port={port}, threaded=True)
+"""
+
+
+# --- Payloads ---
+def build_payload(mode, num_employees=40, num_days=9, seed=1):
+    """Synthetic payload for `mode`, sized like a small site's fortnight."""
+    if mode == "team":
+        return build_team_payload()
+
+    rng = random.Random(seed)
+    employees = []
+    for i in range(num_employees):
+        employees.append({
+            "id": f"u{i:03d}",
+            "proficiency_grade": rng.randint(5, 10),
+            "team": (i % 9) + 1,
+            "competencies": rng.sample(CONSOLES, rng.randint(1, 3)),
+            "reserve_deploy_count": rng.randint(0, 5),
+        })
+
+    start = date(2026, 3, 1)
+    dates = [(start + timedelta(days=d)).isoformat() for d in range(num_days)]
+    requests = []
+    for date_str in dates:
+        for location in ("East", "West"):
+            for shift in ("Morning", "Afternoon", "Night"):
+                requests.append({
+                    "date": date_str, "location": location, "shiftType": shift,
+                    "required_competencies": {c: 1 for c in CONSOLES[:3]},
+                    "required_proficiencies": {"7": 1},
+                })
+
+    leave = {}
+    for i in rng.sample(range(num_employees), max(1, num_employees // 8)):
+        leave[f"u{i:03d}"] = {rng.choice(dates): True}
+
+    payload = {
+        "employees": employees, "requests": requests, "leaveData": leave, "ojtData": {},
+        "schedulingMode": mode,
+        "shiftPattern": ["Morning", "Morning", "Afternoon", "Afternoon", "OFF", "Night", "Night", "OFF", "OFF"],
+    }
+    if mode == "simulation-pending":
+        payload["pendingLeaves"] = [
+            {"user_id": "u001", "start_date": f"{dates[1]}T00:00:00.000Z", "end_date": f"{dates[-1]}T00:00:00.000Z"}
+        ]
+    return payload
+
+
+def parse_payload_arg(spec):
+    """'mode=path[:weight]' -> (mode, payload, weight)."""
+    mode, _, rest = spec.partition("=")
+    path, _, weight = rest.partition(":")
+    with open(path, "r") as f:
+        payload = json.load(f)
+    payload["schedulingMode"] = mode
+    return mode, payload, float(weight or 1)
+
+
+# --- Server ---
+def _process_tree(pid):
+    """pid and all its descendants (Linux /proc only)."""
+    pids = [pid]
+    i = 0
+    while i < len(pids):
+        try:
+            with open(f"/proc/{pids[i]}/task/{pids[i]}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+        i += 1
+    return pids
+
+
+def _rss_mb(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024.0
+
+
+class MemorySampler:
+    """Samples the summed RSS of the server process tree; `peak_mb` is the highest seen."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(MEMORY_SAMPLE_SECONDS):
+            rss = _rss_mb(_process_tree(self.pid))
+            if rss and (self.peak_mb is None or rss > self.peak_mb):
+                self.peak_mb = rss
+
+    def start(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def start_server(server, port, threads):
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+               "--workers", "1", "--threads", str(threads), "--timeout", "0", "app:app"]
+    else:
+        cmd = [sys.executable, "-c", FLASK_BOOT_SCRIPT.format(port=port)]
+    return subprocess.Popen(cmd, cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_until_up(base_url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/healthz", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise TimeoutError("server did not come up in time")
+
+
+# --- Load ---
+def send(base_url, body, timeout):
+    req = urllib.request.Request(f"{base_url}/generate-roster", data=body,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    pos = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[pos], 4)
+
+
+def summarise(samples, elapsed):
+    latencies = sorted(s["latency"] for s in samples)
+    errors = sum(1 for s in samples if s["status"] != 200)
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else None,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else None,
+        "latency_p50_s": percentile(latencies, 0.50),
+        "latency_p95_s": percentile(latencies, 0.95),
+        "latency_p99_s": percentile(latencies, 0.99),
+        "latency_max_s": round(latencies[-1], 4) if latencies else None,
+    }
+
+
+def run_load(base_url, mix, concurrency, rate, duration, max_requests, timeout, seed):
+    rng = random.Random(seed)
+    modes = [m for m, _, _ in mix]
+    bodies = {m: json.dumps(p).encode("utf-8") for m, p, _ in mix}
+    weights = [w for _, _, w in mix]
+    samples = []
+    samples_lock = threading.Lock()
+    started = time.time()
+    deadline = started + duration
+
+    def one(mode, scheduled_at):
+        status = send(base_url, bodies[mode], timeout)
+        done = time.time()
+        with samples_lock:
+            samples.append({"mode": mode, "status": status, "latency": done - scheduled_at})
+
+    def more():
+        return time.time() < deadline and (max_requests is None or sent < max_requests)
+
+    sent = 0
+    if rate:
+        # Open loop: arrivals don't wait for responses
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_arrival = started
+            while more():
+                next_arrival += rng.expovariate(rate)
+                time.sleep(max(0.0, next_arrival - time.time()))
+                pool.submit(one, rng.choices(modes, weights)[0], next_arrival)
+                sent += 1
+    else:
+        # Closed loop: `concurrency` clients back to back
+        counter_lock = threading.Lock()
+
+        def client(client_rng):
+            nonlocal sent
+            while True:
+                with counter_lock:
+                    if not more():
+                        return
+                    sent += 1
+                one(client_rng.choices(modes, weights)[0], time.time())
+
+        threads = [threading.Thread(target=client, args=(random.Random(seed + i),)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    elapsed = time.time() - started
+    report = {"overall": summarise(samples, elapsed), "by_mode": {}}
+    for mode in modes:
+        report["by_mode"][mode] = summarise([s for s in samples if s["mode"] == mode], elapsed)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /generate-roster with a mix of scheduling modes.")
+    parser.add_argument("--url", help="target an already running service instead of starting one")
+    parser.add_argument("--server", choices=["gunicorn", "flask"], default="gunicorn")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads (Dockerfile uses 8)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop arrivals per second (0 = closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--payload", action="append", default=[], help="mode=path[:weight], repeatable")
+    parser.add_argument("--modes", default=",".join(MODES), help="built-in payload modes when no --payload is given")
+    parser.add_argument("--employees", type=int, default=40)
+    parser.add_argument("--days", type=int, default=9)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.payload:
+        mix = [parse_payload_arg(spec) for spec in args.payload]
+    else:
+        mix = [(m, build_payload(m, args.employees, args.days, args.seed), 1.0) for m in args.modes.split(",")]
+
+    proc = sampler = None
+    base_url = args.url.rstrip("/") if args.url else None
+    try:
+        if base_url is None:
+            port = free_port()
+            proc = start_server(args.server, port, args.threads)
+            base_url = f"http://127.0.0.1:{port}"
+            wait_until_up(base_url, 60)
+            sampler = MemorySampler(proc.pid)
+            sampler.start()
+
+        sys.stderr.write(f"Load: {base_url} modes={[m for m, _, _ in mix]} concurrency={args.concurrency} "
+                         f"rate={args.rate or 'closed-loop'} duration={args.duration}s\n")
+        report = run_load(base_url, mix, args.concurrency, args.rate, args.duration,
+                          args.requests, args.timeout, args.seed)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    report["config"] = {
+        "server": "external" if args.url else args.server,
+        "concurrency": args.concurrency,
+        "rate": args.rate or None,
+        "duration_s": args.duration,
+    }
+    report["peak_rss_mb"] = round(sampler.peak_mb, 1) if sampler and sampler.peak_mb else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
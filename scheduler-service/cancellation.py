@@ -0,0 +1,154 @@
+import sys
+import socket
+import select
+import threading
+from contextlib import contextmanager
+
+# --- Tunable Parameters ---
+# Requests sending both headers are keyed by (user, session): a newer request
+# with the same key cancels the one still queued or solving.
+USER_HEADER = "X-User-Id"
+SESSION_HEADER = "X-Session-Id"
+DISCONNECT_POLL_SECONDS = 0.5
+
+_active = {}  # (user, session) -> CancelToken of the newest request
+_active_lock = threading.Lock()
+_current = threading.local()  # token of the request running on this thread
+
+
+class Cancelled(Exception):
+    """Raised out of a solve (or the admission queue) once its request is cancelled."""
+
+    def __init__(self, reason):
+        super().__init__(f"Solve cancelled: {reason}")
+        self.reason = reason
+
+
+class CancelToken:
+    """
+    Cancellation state for one request. Cancelling runs the registered
+    callbacks (solve_control stops the running search with them, admission
+    wakes its queue); code between solves polls `cancelled`.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        label = f"request {self.key[0]}/{self.key[1]}" if self.key else "unkeyed request"
+        sys.stderr.write(f"Cancellation: Cancelling {label} ({reason})\n")
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback):
+        """Run `callback` on cancel (now, if already cancelled). Returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+
+def request_key(headers):
+    """(user, session) from the request headers, or None when either is missing (never superseded)."""
+    user = headers.get(USER_HEADER)
+    session = headers.get(SESSION_HEADER)
+    return (user, session) if user and session else None
+
+
+@contextmanager
+def supersedable(key):
+    """
+    Yield a token for a new request, cancelling the in-flight request with the
+    same key as "superseded". Unkeyed requests still get a token (for disconnects).
+    """
+    token = CancelToken(key)
+    previous = None
+    if key is not None:
+        with _active_lock:
+            previous = _active.get(key)
+            _active[key] = token
+    if previous is not None:
+        previous.cancel("superseded")
+    try:
+        yield token
+    finally:
+        if key is not None:
+            with _active_lock:
+                if _active.get(key) is token:
+                    del _active[key]
+
+
+def current():
+    """The token of the request running on this thread, or None."""
+    return getattr(_current, "token", None)
+
+
+@contextmanager
+def attached(token):
+    """Make `token` current on this thread (decompose does this on its worker threads)."""
+    previous = current()
+    _current.token = token
+    try:
+        yield token
+    finally:
+        _current.token = previous
+
+
+def _peer_closed(sock):
+    # The body has been read in full, so a readable socket with nothing to peek means EOF
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except ValueError:
+        return False  # closed on our side
+    except OSError:
+        return True  # reset by the client
+
+
+@contextmanager
+def watch_disconnect(sock, token):
+    """Cancel `token` if the client closes `sock` while the enclosed block runs."""
+    if sock is None:
+        yield
+        return
+
+    done = threading.Event()
+
+    def _watch():
+        while not done.wait(DISCONNECT_POLL_SECONDS) and not token.cancelled:
+            if _peer_closed(sock):
+                token.cancel("client disconnected")
+                return
+
+    watcher = threading.Thread(target=_watch, name="disconnect-watch", daemon=True)
+    watcher.start()
+    try:
+        yield
+    finally:
+        done.set()
+        watcher.join()
@@ -0,0 +1,305 @@
+"""
+Coordinator: splits one roster job into independent shards and fans them out
+to peer scheduler instances over HTTP (POST /generate-roster on each), so a
+job larger than one container's cores and solver memory budget scales
+horizontally. Served by POST /coordinate-roster in app.py.
+
+Shards (the payload's `sharding.shardBy`):
+    parts     sites / console groups sharing no staff (decompose.py's splits)
+    window    horizon windows of `sharding.windowDays` request dates; pattern
+              offsets are fixed from the whole horizon first, which leaves the
+              scheduler3/4/5 model separable by day
+    scenario  one shard per `sharding.scenarios` variant, returned side by side
+    auto      parts if the payload splits, else windows if the horizon is longer
+              than one window, else the whole job as one shard
+
+Failed shards (connection errors, timeouts, 5xx, admission 503s) are retried
+on the next peer. Rosters are merged, and the peers' reserve pool indexes are
+fetched and merged into one published here.
+
+Try it against local processes standing in for peers:
+
+    python coordinator.py big_sim.json --local-peers 3 --window-days 7
+    COORDINATOR_PEERS=http://10.0.0.2:8080,http://10.0.0.3:8080 python coordinator.py big_sim.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import payload
+import admission
+import decompose
+import reserve_pool
+import site_registry
+import solve_control
+import scheduler_registry
+
+# --- Tunable Parameters ---
+PEERS = [p.strip().rstrip("/") for p in os.environ.get("COORDINATOR_PEERS", "").split(",") if p.strip()]
+SHARD_ATTEMPTS = 3  # Tries per shard, each on the next peer
+SHARD_OVERHEAD_SECONDS = 20.0  # Model build, result serialisation and transfer on top of the solve
+# A shard may wait out a peer's admission queue and then solve for the longest budget
+SHARD_TIMEOUT_SECONDS = (
+    admission.MAX_QUEUE_WAIT_SECONDS + solve_control.MAX_TIME_LIMIT_SECONDS + SHARD_OVERHEAD_SECONDS
+)
+MAX_RETRY_WAIT_SECONDS = 10.0  # Cap on a peer's Retry-After before trying the next one
+SHARDS_PER_PEER = 2  # Shards in flight per peer; their admission control queues the rest
+WINDOW_MODES = {"competency", "simulation", "simulation-pending"}  # Separable by day once offsets are fixed
+SPLIT_MODES = {"individual", "competency", "simulation", "simulation-pending"}  # Modes with decompose.py splits
+
+
+class ShardFailed(Exception):
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+# --- Sharding ---
+def _pattern_length(data, mode):
+    registry = site_registry.from_payload(data)
+    names = site_registry.DEFAULT_PATTERN_NAMES if mode == "competency" else data.get("shiftPattern")
+    return len(registry.pattern_from_names(names or site_registry.DEFAULT_PATTERN_NAMES))
+
+
+def split_parts(data, mode):
+    """decompose.py's site, then console-group split of the whole payload, or None."""
+    if mode not in SPLIT_MODES:
+        return None
+    parts = decompose.split_by_site(data, site_registry.from_payload(data))
+    if parts is None and mode in WINDOW_MODES:
+        parts = decompose.split_by_competency(data, _pattern_length(data, mode))
+    return parts
+
+
+def split_windows(data, mode, window_days):
+    """
+    Consecutive windows of `window_days` request dates, or None. Offsets are
+    fixed from the whole horizon and re-based to each window's first date
+    (schedulers index days by position in the sorted request dates).
+    """
+    if mode not in WINDOW_MODES:
+        return None
+    employees_data = data.get("employees", [])
+    requests_data = data.get("requests", [])
+    all_dates = sorted({req["date"] for req in requests_data})
+    if len(all_dates) <= window_days:
+        return None
+
+    pattern_length = _pattern_length(data, mode)
+    offsets = site_registry.balanced_offsets(employees_data, requests_data, pattern_length)
+    parts = []
+    for start in range(0, len(all_dates), window_days):
+        dates = set(all_dates[start:start + window_days])
+        sub = dict(data)
+        sub["employees"] = [dict(emp, offset=(o + start) % pattern_length) for emp, o in zip(employees_data, offsets)]
+        sub["requests"] = [req for req in requests_data if req["date"] in dates]
+        sub["ojtData"] = {d: users for d, users in data.get("ojtData", {}).items() if d in dates}
+        parts.append((f"{min(dates)}..{max(dates)}", sub))
+    return parts
+
+
+def split_scenarios(data, scenarios):
+    return [(scenario["name"], dict(data, **scenario.get("overrides", {}))) for scenario in scenarios]
+
+
+def plan_shards(data, mode):
+    """(shard_by, [(name, sub-payload)]) for a decoded payload."""
+    options = data.get("sharding") or {}
+    shard_by = options.get("shardBy", "auto")
+    window_days = options.get("windowDays", 7)
+
+    if shard_by == "scenario":
+        return shard_by, split_scenarios(data, options.get("scenarios", []))
+    if shard_by in ("parts", "auto"):
+        parts = split_parts(data, mode)
+        if parts:
+            return "parts", parts
+    if shard_by in ("window", "auto"):
+        parts = split_windows(data, mode, window_days)
+        if parts:
+            return "window", parts
+    return "none", [("all", data)]
+
+
+# --- Peers ---
+def _request(url, body=None, headers=None, timeout=SHARD_TIMEOUT_SECONDS):
+    """(status, headers, parsed JSON body); HTTP errors are returned, not raised."""
+    req = urllib.request.Request(url, data=body, headers=dict(headers or {}, **{"Content-Type": "application/json"}))
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, resp.headers, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        try:
+            parsed = json.loads(e.read())
+        except ValueError:
+            parsed = {"error": e.reason}
+        return e.code, e.headers, parsed
+
+
+def run_shard(seq, name, sub, mode, peers, run_id, user):
+    """
+    Solve shard number `seq` on the peers, starting with peers[seq % len(peers)]
+    and moving to the next on a retryable failure. Returns (roster, reserve
+    index or None, report); raises ShardFailed.
+    """
+    body = json.dumps(dict(payload.without_internal_keys(sub), schedulingMode=mode, sharding=None)).encode("utf-8")
+    report = {"shard": name, "employees": len(sub.get("employees", [])),
+              "requests": len(sub.get("requests", [])), "attempts": []}
+    started = time.time()
+    for attempt in range(SHARD_ATTEMPTS):
+        peer = peers[(seq + attempt) % len(peers)]
+        attempt_started = time.time()
+        retry_after = 0.0
+        try:
+            status, headers, result = _request(f"{peer}/generate-roster", body, {
+                "X-User-Id": user or "coordinator",
+                "X-Request-Id": f"{run_id}-{seq}-{attempt}",  # a ticket for the peer's /queue/<ticket>
+            })
+            error = result.get("error") if isinstance(result, dict) else None
+        except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError) as e:
+            status, headers, result, error = None, {}, None, f"{type(e).__name__}: {e}"
+        report["attempts"].append({"peer": peer, "status": status, "seconds": round(time.time() - attempt_started, 3),
+                                   **({"error": error} if error else {})})
+
+        if status == 200:
+            report.update(peer=peer, seconds=round(time.time() - started, 3))
+            return result, _fetch_reserve_index(peer, headers.get("X-Reserve-Index-Id")), report
+        if status is not None and status < 500 and status != 429:
+            # The peer rejected the shard itself (bad payload, scheduler error); another peer won't differ
+            report["seconds"] = round(time.time() - started, 3)
+            raise ShardFailed(f"[{name}] {error}", report)
+        if status in (429, 503):
+            retry_after = min(float(headers.get("Retry-After") or 0), MAX_RETRY_WAIT_SECONDS)
+        if attempt + 1 < SHARD_ATTEMPTS:
+            sys.stderr.write(f"Coordinator: Shard [{name}] failed on {peer} ({status or error}), retrying\n")
+            time.sleep(retry_after)
+
+    report["seconds"] = round(time.time() - started, 3)
+    last = report["attempts"][-1]
+    raise ShardFailed(f"[{name}] failed after {SHARD_ATTEMPTS} attempts: {last.get('error') or last['status']}", report)
+
+
+def _fetch_reserve_index(peer, index_id):
+    if not index_id:
+        return None
+    try:
+        status, _, result = _request(f"{peer}/reserve-pool/{index_id}", timeout=30)
+    except (urllib.error.URLError, ConnectionError, TimeoutError, ValueError):
+        status = None
+    if status != 200:
+        sys.stderr.write(f"Coordinator: Could not fetch reserve pool index {index_id} from {peer}\n")
+        return None
+    return result["data"]
+
+
+# --- Driver ---
+def coordinate(data, peers=None, user=None):
+    """
+    Shard a decoded payload, solve the shards on `peers` (default
+    COORDINATOR_PEERS) and merge. Returns (response body, HTTP status); the
+    merged reserve index, if any, is published on this thread as a solve's is.
+    """
+    peers = peers or PEERS
+    if not peers:
+        return {"error": "No peer workers configured (set COORDINATOR_PEERS)"}, 503
+
+    started = time.time()
+    mode = scheduler_registry.resolve_mode(data.get("schedulingMode"))
+    shard_by, shards = plan_shards(data, mode)
+    run_id = uuid.uuid4().hex[:12]
+    sys.stderr.write(
+        f"Coordinator: Run {run_id} split by {shard_by} into {len(shards)} shards over {len(peers)} peers: "
+        f"{[name for name, _ in shards]}\n"
+    )
+
+    reports = {}
+
+    def solve(numbered):
+        i, (name, sub) = numbered
+        try:
+            roster, index, reports[name] = run_shard(i, name, sub, mode, peers, run_id, user)
+            return name, roster, index, None
+        except ShardFailed as e:
+            reports[name] = e.report
+            return name, None, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=min(len(shards), len(peers) * SHARDS_PER_PEER)) as pool:
+        outcomes = list(pool.map(solve, enumerate(shards)))
+
+    elapsed = round(time.time() - started, 3)
+    shard_reports = [reports.get(name, {"shard": name}) for name, _ in shards]
+    stats = {"runId": run_id, "shardBy": shard_by, "peers": len(peers), "elapsedSeconds": elapsed,
+             "shards": shard_reports}
+    errors = [error for _, _, _, error in outcomes if error]
+    if errors:
+        sys.stderr.write(f"Coordinator: Run {run_id} failed: {errors}\n")
+        return {"error": "; ".join(errors), "stats": stats}, 502
+
+    if shard_by == "scenario":
+        data_out = {name: roster for name, roster, _, _ in outcomes}
+    else:
+        data_out = decompose.merge_rosters([roster for _, roster, _, _ in outcomes])
+        indexes = [index for _, _, index, _ in outcomes if index is not None]
+        if indexes:
+            reserve_pool.publish(reserve_pool.merge(indexes), "Coordinator", data.get("schedulingMode"))
+    sys.stderr.write(
+        f"Coordinator: Run {run_id} merged {len(shards)} shards in {elapsed:.2f}s "
+        f"(slowest {max(r.get('seconds', 0) for r in shard_reports):.2f}s)\n"
+    )
+    return {"success": True, "data": data_out, "stats": stats}, 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve one payload sharded across peer scheduler instances.")
+    parser.add_argument("payload", help="roster payload JSON file")
+    parser.add_argument("--peers", help="comma-separated peer base URLs (default: COORDINATOR_PEERS)")
+    parser.add_argument("--local-peers", type=int, default=0, help="start this many local service processes as peers")
+    parser.add_argument("--shard-by", choices=["auto", "parts", "window", "scenario"])
+    parser.add_argument("--window-days", type=int)
+    parser.add_argument("--out", help="write the merged roster here")
+    args = parser.parse_args()
+
+    with open(args.payload, "rb") as f:
+        data = payload.decode_request(f.read())
+    sharding = dict(data.get("sharding") or {})
+    if args.shard_by:
+        sharding["shardBy"] = args.shard_by
+    if args.window_days:
+        sharding["windowDays"] = args.window_days
+    data["sharding"] = sharding
+
+    servers = []
+    peers = [p.strip().rstrip("/") for p in (args.peers or "").split(",") if p.strip()]
+    try:
+        if args.local_peers:
+            from bench_load import start_server, wait_until_up
+            from bench_cold_start import free_port
+
+            for _ in range(args.local_peers):
+                port = free_port()
+                servers.append(start_server("flask", port, threads=8))
+                peers.append(f"http://127.0.0.1:{port}")
+            for peer in peers[-args.local_peers:]:
+                wait_until_up(peer, timeout=60)
+        body, status = coordinate(data, peers)
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+    if args.out and status == 200:
+        with open(args.out, "w") as f:
+            json.dump(body["data"], f)
+    print(json.dumps({"status": status, "error": body.get("error"), "stats": body["stats"] if "stats" in body else None},
+                     indent=2))
+    sys.exit(0 if status == 200 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Record-and-replay corpus of production solve requests.
+
+Recording is opt-in: set RECORD_CORPUS_DIR and every request dispatched by
+app.py is written there as one JSON file holding the payload, with user IDs
+and console names pseudonymised, next to its outcome (HTTP status, wall time
+and the status/objective/timings of every CP-SAT solve it ran).
+
+Pseudonyms are keyed hashes (RECORD_PSEUDONYM_KEY), so the same person or
+console maps to the same pseudonym across recordings made with one key while
+names cannot be recovered by hashing a staff list. Without a key a random one
+is drawn per process.
+
+Replay the corpus through the schedulers in this directory, or through
+another checkout (e.g. a `git worktree` of an older revision), optionally
+overriding solve parameters, and diff the results against the recordings:
+
+    python corpus.py replay /data/corpus
+    python corpus.py replay /data/corpus --service-dir /tmp/rev-abc123 --set solveProfile=fast
+    python corpus.py replay /data/corpus --set solveOptions.maxTimeSeconds=20 --dump-models /tmp/models
+
+    python corpus.py list /data/corpus
+"""
+import os
+import sys
+import json
+import time
+import hmac
+import random
+import hashlib
+import argparse
+import importlib
+import threading
+from contextlib import contextmanager
+
+import solve_history
+
+# --- Tunable Parameters ---
+CORPUS_DIR = os.environ.get("RECORD_CORPUS_DIR", "")  # "" disables recording
+SAMPLE_RATE = float(os.environ.get("RECORD_SAMPLE_RATE", "1"))  # Fraction of requests recorded
+PSEUDONYM_KEY = os.environ.get("RECORD_PSEUDONYM_KEY") or os.urandom(16).hex()
+MAX_RECORDINGS = 5000  # Oldest recordings are deleted first
+OBJECTIVE_TOLERANCE = 1e-6  # Relative change below which objectives count as equal
+
+_current = threading.local()  # Recording active on this thread
+_write_lock = threading.Lock()
+
+
+def enabled():
+    return bool(CORPUS_DIR) and random.random() < SAMPLE_RATE
+
+
+# --- Pseudonymisation ---
+def _pseudonym(prefix, value):
+    digest = hmac.new(PSEUDONYM_KEY.encode("utf-8"), f"{prefix}:{value}".encode("utf-8"), hashlib.sha256)
+    return f"{prefix}-{digest.hexdigest()[:10]}"
+
+
+def pseudonymise(data):
+    """
+    Copy of a scheduler payload with user IDs and console names replaced by
+    pseudonyms everywhere the schedulers read them: employees, requests,
+    leaveData, ojtData, pendingLeaves, and the roster/disruption of a repair.
+    Dates, grades, teams, sites and shift types are kept as they are.
+    """
+    user = lambda user_id: _pseudonym("user", user_id)
+    console = lambda name: _pseudonym("console", name)
+    # ojtData leaves are a console name or {console, location} (see payload.ojt_entry)
+    ojt = lambda value: dict(value, console=console(value["console"])) if isinstance(value, dict) else console(value)
+
+    out = {k: v for k, v in data.items() if not k.startswith("_")}
+    # Refers to in-process state of the recording worker; meaningless on replay
+    out.pop("reserveIndexId", None)
+
+    out["employees"] = [
+        dict(emp, id=user(emp["id"]), competencies=[console(c) for c in emp.get("competencies", [])])
+        for emp in data.get("employees", [])
+    ]
+    if "requests" in data:
+        out["requests"] = [
+            dict(req, required_competencies={console(c): n for c, n in req.get("required_competencies", {}).items()})
+            for req in data["requests"]
+        ]
+    if "leaveData" in data:
+        out["leaveData"] = {user(u): dates for u, dates in data["leaveData"].items()}
+    if "ojtData" in data:
+        out["ojtData"] = {
+            date_str: {user(u): {shift: ojt(c) for shift, c in shifts.items()} for u, shifts in users.items()}
+            for date_str, users in data["ojtData"].items()
+        }
+    if "pendingLeaves" in data:
+        out["pendingLeaves"] = [dict(leave, user_id=user(leave["user_id"])) for leave in data["pendingLeaves"]]
+    if "roster" in data:
+        out["roster"] = {
+            date_str: {
+                location: {
+                    shift: [
+                        dict(entry, user_id=user(entry["user_id"]), assigned_console=console(entry["assigned_console"]))
+                        for entry in entries
+                    ]
+                    for shift, entries in shifts.items()
+                }
+                for location, shifts in locations.items()
+            }
+            for date_str, locations in data["roster"].items()
+        }
+    if "disruption" in data and data["disruption"].get("user_id"):
+        out["disruption"] = dict(data["disruption"], user_id=user(data["disruption"]["user_id"]))
+    return out
+
+
+# --- Recording ---
+class Recording:
+    """
+    Solves run for one request, reported by solve_control. When `model_dir`
+    is set, each CpModel is also exported there (used by replay).
+    """
+
+    def __init__(self, model_dir=None, model_prefix="model"):
+        self.solves = []
+        self.model_dir = model_dir
+        self.model_prefix = model_prefix
+        self._lock = threading.Lock()
+
+    def add_solve(self, label, model, solver, status, settings, stats):
+        status_name = solver.StatusName(status)
+        has_solution = status_name in ("OPTIMAL", "FEASIBLE")
+        entry = {
+            "label": label,
+            "status": status_name,
+            "objective": solver.ObjectiveValue() if has_solution else None,
+            "bound": solver.BestObjectiveBound() if has_solution else None,
+            "searchSeconds": round(solver.WallTime(), 3),
+            "buildSeconds": round(stats["build_seconds"], 3) if stats.get("build_seconds") is not None else None,
+            "timeLimit": settings["time_limit"],
+            "profile": settings["profile"],
+            "numVars": stats["num_vars"],
+            "numConstraints": stats["num_constraints"],
+            "stoppedBy": stats["stopped_by"],
+            "backend": stats.get("backend"),
+        }
+        with self._lock:
+            if self.model_dir:
+                os.makedirs(self.model_dir, exist_ok=True)
+                path = os.path.join(self.model_dir, f"{self.model_prefix}-{len(self.solves)}-{label}.pb")
+                model.ExportToFile(path)
+                entry["modelFile"] = path
+            self.solves.append(entry)
+
+
+def current():
+    """The recording collecting solves for this thread's request, or None."""
+    return getattr(_current, "recording", None)
+
+
+@contextmanager
+def attached(recording):
+    """Make `recording` current (used by app.py, and by decompose for per-site parts)."""
+    previous = current()
+    _current.recording = recording
+    try:
+        yield recording
+    finally:
+        _current.recording = previous
+
+
+def _prune(directory):
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    for name in names[:max(0, len(names) - MAX_RECORDINGS)]:
+        os.remove(os.path.join(directory, name))
+
+
+def record(data, mode, status_code, elapsed_seconds, recording):
+    """Write one request to the corpus. Never raises: recording must not fail a request."""
+    try:
+        stamp = time.time()
+        anonymised = pseudonymise(data)
+        instance_id = solve_history.fingerprint(anonymised)
+        entry = {
+            "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(stamp)),
+            "mode": mode,
+            "fingerprint": instance_id,
+            "payload": anonymised,
+            "outcome": {
+                "httpStatus": status_code,
+                "elapsedSeconds": round(elapsed_seconds, 3),
+                "solves": recording.solves if recording is not None else [],
+            },
+        }
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(stamp))}-{int(stamp * 1000) % 1000:03d}-{mode}-{instance_id}.json"
+        with _write_lock:
+            os.makedirs(CORPUS_DIR, exist_ok=True)
+            with open(os.path.join(CORPUS_DIR, name), "w") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            _prune(CORPUS_DIR)
+        return name
+    except Exception as e:
+        sys.stderr.write(f"Corpus: Failed to record request: {e}\n")
+        return None
+
+
+# --- Replay ---
+def load_corpus(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), "r") as f:
+                yield name, json.load(f)
+
+
+def apply_overrides(data, overrides):
+    """Apply 'key=value' / 'parent.key=value' overrides; values are parsed as JSON when possible."""
+    for spec in overrides:
+        path, _, raw = spec.partition("=")
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        target = data
+        keys = path.split(".")
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return data
+
+
+def _objective(solves):
+    values = [s["objective"] for s in solves if s.get("objective") is not None]
+    return sum(values) if values else None
+
+
+def _objective_change(before, after):
+    if before is None or after is None:
+        return None
+    return (after - before) / max(1.0, abs(before))
+
+
+def replay(directory, service_dir=None, overrides=(), model_dir=None, mode_filter=None):
+    """
+    Re-run every recording and return one comparison row per recording.
+    Schedulers (and the solve hooks) are imported from `service_dir` when given,
+    so an older checkout can be measured against the same corpus.
+    """
+    if service_dir:
+        sys.path.insert(0, os.path.abspath(service_dir))
+    registry = importlib.import_module("scheduler_registry")
+    # The solve hooks report to the `corpus` module the schedulers import, which
+    # is not this one when running as a script or from another checkout
+    # (a checkout older than the hooks reports no solves, so only wall time is compared)
+    hooks = importlib.import_module("corpus")
+
+    rows = []
+    for name, entry in load_corpus(directory):
+        mode = entry["mode"]
+        if mode_filter and mode != mode_filter:
+            continue
+        data = apply_overrides(json.loads(json.dumps(entry["payload"])), overrides)
+        recording = hooks.Recording(model_dir, os.path.splitext(name)[0])
+
+        started = time.time()
+        error = None
+        try:
+            scheduler_main = registry.get_scheduler(mode)
+            with hooks.attached(recording):
+                result = scheduler_main(data)
+            parsed = json.loads(result)
+            if isinstance(parsed, dict) and "error" in parsed:
+                error = parsed["error"]
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.time() - started
+
+        recorded = entry["outcome"]
+        before = _objective(recorded.get("solves", []))
+        after = _objective(recording.solves)
+        rows.append({
+            "recording": name,
+            "mode": mode,
+            "recordedStatus": recorded["httpStatus"],
+            "replayError": error,
+            "recordedSeconds": recorded["elapsedSeconds"],
+            "replaySeconds": round(elapsed, 3),
+            "speedup": round(recorded["elapsedSeconds"] / elapsed, 3) if elapsed > 0 else None,
+            "recordedObjective": before,
+            "replayObjective": after,
+            "objectiveChange": _objective_change(before, after),
+            "recordedSolveStatus": [s["status"] for s in recorded.get("solves", [])],
+            "replaySolveStatus": [s["status"] for s in recording.solves],
+            "models": [s["modelFile"] for s in recording.solves if "modelFile" in s],
+        })
+    return rows
+
+
+def print_report(rows):
+    header = f"{'recording':<56} {'rec s':>8} {'new s':>8} {'speedup':>8} {'rec obj':>12} {'new obj':>12}  note"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        notes = []
+        if row["replayError"]:
+            notes.append(f"error: {row['replayError']}")
+        elif row["recordedStatus"] != 200:
+            notes.append(f"recorded HTTP {row['recordedStatus']}")
+        change = row["objectiveChange"]
+        if change is not None and abs(change) > OBJECTIVE_TOLERANCE:
+            notes.append(f"objective {'worse' if change > 0 else 'better'} by {abs(change):.2%}")
+        if row["replaySolveStatus"] and row["replaySolveStatus"] != row["recordedSolveStatus"]:
+            notes.append(f"status {row['recordedSolveStatus']} -> {row['replaySolveStatus']}")
+        fmt = lambda v: "-" if v is None else f"{v:.1f}"
+        print(
+            f"{row['recording'][:56]:<56} {row['recordedSeconds']:>8.2f} {row['replaySeconds']:>8.2f} "
+            f"{row['speedup'] or 0:>7.2f}x {fmt(row['recordedObjective']):>12} {fmt(row['replayObjective']):>12}  "
+            f"{'; '.join(notes)}"
+        )
+
+    speedups = sorted(r["speedup"] for r in rows if r["speedup"] and not r["replayError"])
+    worse = sum(1 for r in rows if (r["objectiveChange"] or 0) > OBJECTIVE_TOLERANCE)
+    better = sum(1 for r in rows if (r["objectiveChange"] or 0) < -OBJECTIVE_TOLERANCE)
+    errors = sum(1 for r in rows if r["replayError"])
+    median = speedups[len(speedups) // 2] if speedups else None
+    print(
+        f"\n{len(rows)} recordings: median speedup {median if median is not None else '-'}x, "
+        f"objective better {better} / worse {worse}, errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the recorded request corpus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="list recordings")
+    p_list.add_argument("directory", nargs="?", default=CORPUS_DIR)
+
+    p_replay = sub.add_parser("replay", help="re-run recordings and diff timings and objectives")
+    p_replay.add_argument("directory", nargs="?", default=CORPUS_DIR)
+    p_replay.add_argument("--service-dir", help="import schedulers from another checkout of scheduler-service")
+    p_replay.add_argument("--set", dest="overrides", action="append", default=[],
+                          help="payload override, e.g. solveProfile=fast or solveOptions.maxTimeSeconds=20 (repeatable)")
+    p_replay.add_argument("--mode", help="only replay recordings of this schedulingMode")
+    p_replay.add_argument("--dump-models", metavar="DIR", help="export every CpModel proto to DIR")
+    p_replay.add_argument("--json", action="store_true", help="print the comparison rows as JSON")
+    args = parser.parse_args()
+
+    if not args.directory:
+        raise SystemExit("Pass a corpus directory or set RECORD_CORPUS_DIR")
+
+    if args.command == "list":
+        for name, entry in load_corpus(args.directory):
+            outcome = entry["outcome"]
+            print(f"{name}  HTTP {outcome['httpStatus']}  {outcome['elapsedSeconds']:.2f}s  "
+                  f"employees={len(entry['payload'].get('employees', []))} solves={len(outcome['solves'])}")
+        return
+
+    rows = replay(args.directory, args.service_dir, args.overrides, args.dump_models, args.mode)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import reserve_pool
+import payload
+import profiling
+import corpus
+import cancellation
+import site_registry
+import solve_control
+
+# --- Tunable Parameters ---
+MAX_PARALLEL_PARTS = max(1, min(4, os.cpu_count() or 1))
+
+
+def _components(nodes, groups):
+    """Connected components over `nodes`, where every group in `groups` links its members."""
+    parent = {n: n for n in nodes}
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for group in groups:
+        group = list(group)
+        for other in group[1:]:
+            root_a, root_b = find(group[0]), find(other)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    components = {}
+    for n in nodes:
+        components.setdefault(find(n), []).append(n)
+    return list(components.values())
+
+
+def _sub_payload(data, employee_ids, request_filter, consoles=None):
+    """Copy of `data` restricted to some employees and requests (and to some consoles of each request)."""
+    sub = dict(data)
+    sub.pop(payload.WORKFORCE_KEY, None)  # rebuilt per part by payload.workforce_for
+    sub["employees"] = [emp for emp in data.get("employees", []) if emp["id"] in employee_ids]
+    sub["requests"] = [req for req in data.get("requests", []) if request_filter(req)]
+    if consoles is not None:
+        sub["requests"] = [
+            dict(req, required_competencies={
+                c: n for c, n in req.get("required_competencies", {}).items() if c in consoles
+            })
+            for req in sub["requests"]
+        ]
+    sub["leaveData"] = {u: d for u, d in data.get("leaveData", {}).items() if u in employee_ids}
+    sub["ojtData"] = {
+        date_str: {u: shifts for u, shifts in users.items() if u in employee_ids}
+        for date_str, users in data.get("ojtData", {}).items()
+    }
+    if "pendingLeaves" in data:
+        sub["pendingLeaves"] = [l for l in data["pendingLeaves"] if l.get("user_id") in employee_ids]
+    return sub
+
+
+def split_by_site(data, registry):
+    """
+    Split a payload into independent per-site sub-payloads when no employee can
+    work at sites from two different groups (employees list their `sites`).
+    Returns None when everything is connected, i.e. there is nothing to split.
+    """
+    employees_data = data.get("employees", [])
+    if not employees_data or any(not emp.get("sites") for emp in employees_data):
+        return None
+
+    site_components = _components(
+        registry.site_names,
+        [[s for s in emp["sites"] if s in registry.site_index] for emp in employees_data],
+    )
+    if len(site_components) < 2:
+        return None
+
+    parts = []
+    for sites in site_components:
+        site_set = set(sites)
+        employee_ids = {emp["id"] for emp in employees_data if site_set.intersection(emp["sites"])}
+        sub = _sub_payload(data, employee_ids, lambda req, site_set=site_set: req["location"] in site_set)
+        if not sub["requests"]:
+            continue
+        sub.update(registry.to_payload())
+        parts.append((", ".join(sorted(sites)), sub))
+
+    return parts if len(parts) > 1 else None
+
+
+def split_by_competency(data, pattern_length):
+    """
+    Split a payload into independent sub-payloads by connected components of
+    the employee-console graph, where staff link the consoles they are
+    certified on that this horizon's requests ask for. Returns None when
+    fewer than two components have staff.
+
+    Pattern offsets are fixed from the whole payload first (the balancing
+    greedy looks at everyone), and every part keeps every request date with
+    only its own consoles, so the parts are exactly the one model cut into
+    pieces and their objectives add up to its objective.
+    """
+    employees_data = data.get("employees", [])
+    requests_data = data.get("requests", [])
+    demanded = sorted({
+        c for req in requests_data for c, n in req.get("required_competencies", {}).items() if n > 0
+    })
+    if len(demanded) < 2:
+        return None
+
+    demanded_set = set(demanded)
+    console_components = _components(
+        demanded,
+        [[c for c in emp.get("competencies", []) if c in demanded_set] for emp in employees_data],
+    )
+    if len(console_components) < 2:
+        return None
+
+    groups = []
+    unstaffed = set()
+    for consoles in console_components:
+        console_set = set(consoles)
+        employee_ids = {emp["id"] for emp in employees_data if console_set.intersection(emp.get("competencies", []))}
+        if employee_ids:
+            groups.append((console_set, employee_ids))
+        else:
+            unstaffed.update(console_set)
+    if len(groups) < 2:
+        return None
+
+    # Consoles nobody can staff and staff certified on nothing requested still
+    # add to the objective (understaffing, pattern deviations) and the reserve
+    # pool, so they ride along with the smallest part
+    smallest = min(groups, key=lambda g: len(g[1]))
+    smallest[0].update(unstaffed)
+    linked = set().union(*(employee_ids for _, employee_ids in groups))
+    smallest[1].update(emp["id"] for emp in employees_data if emp["id"] not in linked)
+
+    offsets = site_registry.balanced_offsets(employees_data, requests_data, pattern_length)
+    with_offsets = dict(data, employees=[dict(emp, offset=o) for emp, o in zip(employees_data, offsets)])
+
+    parts = []
+    for console_set, employee_ids in groups:
+        sub = _sub_payload(with_offsets, employee_ids, lambda req: True, consoles=console_set)
+        parts.append((", ".join(sorted(console_set)), sub))
+    return parts
+
+
+def count_parts(data, registry, by_competency=True):
+    """
+    (site parts, console parts) split_by_site and split_by_competency would
+    make of `data`, 1 where nothing splits, without building sub-payloads or
+    fixing offsets. Console parts are counted on the whole payload, before
+    any site split. For admission.estimate_cost.
+    """
+    employees_data = data.get("employees", [])
+    site_parts = 1
+    if employees_data and all(emp.get("sites") for emp in employees_data):
+        requested = {req["location"] for req in data.get("requests", [])}
+        site_components = _components(
+            registry.site_names,
+            [[s for s in emp["sites"] if s in registry.site_index] for emp in employees_data],
+        )
+        site_parts = max(1, sum(1 for sites in site_components if requested.intersection(sites)))
+    if not by_competency:
+        return site_parts, 1
+
+    demanded = {
+        c for req in data.get("requests", []) for c, n in req.get("required_competencies", {}).items() if n > 0
+    }
+    staffed = [[c for c in emp.get("competencies", []) if c in demanded] for emp in employees_data]
+    console_components = _components(sorted(demanded), staffed)
+    linked = set().union(*staffed) if staffed else set()
+    console_parts = max(1, sum(1 for consoles in console_components if linked.intersection(consoles)))
+    return site_parts, console_parts
+
+
+def merge_rosters(results):
+    """Union of rosters over disjoint staff or dates (per date, site and shift)."""
+    merged = {}
+    for roster in results:
+        for date_str, sites in roster.items():
+            merged_day = merged.setdefault(date_str, {})
+            for site, shifts in sites.items():
+                merged_site = merged_day.setdefault(site, {})
+                for shift_name, entries in shifts.items():
+                    merged_site.setdefault(shift_name, []).extend(entries)
+    return merged
+
+
+def run_parts(main_fn, parts, label):
+    """
+    Run `main_fn` on each (name, sub-payload) in parallel. CP-SAT releases the
+    GIL while searching, so threads are enough here. Returns, per part in
+    order, (name, result JSON, published reserve pool index or None, last_result).
+    """
+    sys.stderr.write(f"{label}: Solving {len(parts)} independent parts: {[name for name, _ in parts]}\n")
+
+    # Worker threads don't inherit the request's profiling session, corpus recording or cancel token
+    profile = profiling.current()
+    recording = corpus.current()
+    token = cancellation.current()
+
+    def run_part(part):
+        name, sub = part
+        part_start = time.time()
+        solve_control.note_result(None, None)
+        with profiling.attached(profile), corpus.attached(recording), cancellation.attached(token):
+            result = main_fn(sub)
+        # Taken out of the store right away: a horizon cut into many parts would evict its own indexes
+        index_id = reserve_pool.take_published()
+        index = reserve_pool.pop_index(index_id) if index_id else None
+        sys.stderr.write(f"{label}: Part [{name}] finished in {time.time() - part_start:.2f}s\n")
+        return name, result, index, solve_control.last_result()
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_PARTS, len(parts))) as pool:
+        return list(pool.map(run_part, parts))
+
+
+def solve_parts(main_fn, parts, label):
+    """
+    Run `main_fn` on each (name, sub-payload) in parallel and merge the rosters.
+    Reserve pool indexes published by the parts are merged into one, and the
+    parts' objectives are summed into this thread's solve_control.last_result.
+    """
+    start = time.time()
+    outcomes = run_parts(main_fn, parts, label)
+
+    rosters = []
+    indexes = []
+    statuses = []
+    objective = 0
+    for name, result, index, (status_name, part_objective) in outcomes:
+        parsed = json.loads(result)
+        if isinstance(parsed, dict) and "error" in parsed:
+            parsed["error"] = f"[{name}] {parsed['error']}"
+            return json.dumps(parsed)
+        rosters.append(parsed)
+        if index is not None:
+            indexes.append(index)
+        statuses.append(status_name)
+        objective = None if objective is None or part_objective is None else objective + part_objective
+
+    if indexes:
+        reserve_pool.publish(reserve_pool.merge(indexes), label, parts[0][1].get("schedulingMode"))
+
+    # OPTIMAL only if every part is; nested splits report their combined result the same way
+    status_name = "OPTIMAL" if all(s == "OPTIMAL" for s in statuses) else "FEASIBLE"
+    solve_control.note_result(status_name, objective)
+    sys.stderr.write(
+        f"{label}: All parts merged in {time.time() - start:.2f}s (status={status_name}, objective={objective})\n"
+    )
+    return json.dumps(merge_rosters(rosters))
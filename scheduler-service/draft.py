@@ -0,0 +1,190 @@
+import sys
+import json
+import time
+from datetime import datetime, timedelta
+
+import site_registry
+import reserve_pool
+import payload
+import presolve
+
+OFF = site_registry.OFF
+
+
+def greedy_fill(slots, scarcity_scores, rank):
+    """
+    Scarcity-ordered greedy over console slots. `slots` maps
+    (d_idx, s_idx, l_idx, console) -> (count, [(e_idx, expected_shift)]).
+    Slots of the scarcest consoles go first (fewest candidates breaking
+    ties), and each takes its best-ranked candidates not already working
+    that day. Returns {slot_key: [e_idx, ...]}; a slot may come back short.
+    """
+    order = sorted(slots, key=lambda key: (-scarcity_scores.get(key[3], 0), len(slots[key][1]), key))
+    busy = set()  # (e_idx, d_idx)
+    filled = {}
+    for key in order:
+        count, candidates = slots[key]
+        chosen = []
+        for candidate in sorted(candidates, key=lambda c: rank(key, c)):
+            if len(chosen) >= count:
+                break
+            e_idx = candidate[0]
+            if (e_idx, key[0]) in busy:
+                continue
+            busy.add((e_idx, key[0]))
+            chosen.append(e_idx)
+        filled[key] = chosen
+    return filled
+
+
+def add_hint(model, assignments, understaff_by_key, req_map, scarcity_scores, rank, expected_shift):
+    """
+    Hint a full greedy assignment to a scheduler3/4/5 model: every assignment
+    variable (var_registry.AssignmentRegistry) and every understaffing
+    variable. Returns the hinted shortfall.
+    """
+    keys = list(assignments.keys())
+    slots = {key: (req_map[key[:3]][key[3]], []) for key in understaff_by_key}
+    for (e_idx, d_idx, s_idx, l_idx, comp_name) in keys:
+        key = (d_idx, s_idx, l_idx, comp_name)
+        if key in slots:
+            slots[key][1].append((e_idx, expected_shift(e_idx, d_idx)))
+    filled = greedy_fill(slots, scarcity_scores, rank)
+
+    chosen = {(e_idx,) + key for key, e_list in filled.items() for e_idx in e_list}
+    for assign_key, v in zip(keys, assignments.vars):
+        model.AddHint(v, assign_key in chosen)
+    shortfall = 0
+    for key, understaff in understaff_by_key.items():
+        short = slots[key][0] - len(filled[key])
+        model.AddHint(understaff, short)
+        shortfall += short
+    return shortfall
+
+
+def _leave_days(data):
+    """user_id -> set of dates off: approved leave plus pending leave, as scheduler5 treats it."""
+    leave = {u: set(dates) for u, dates in data.get("leaveData", {}).items()}
+    for pending in data.get("pendingLeaves", []):
+        current = datetime.strptime(pending["start_date"].split("T")[0], "%Y-%m-%d")
+        end = datetime.strptime(pending["end_date"].split("T")[0], "%Y-%m-%d")
+        days = leave.setdefault(pending["user_id"], set())
+        while current <= end:
+            days.add(current.strftime("%Y-%m-%d"))
+            current += timedelta(days=1)
+    return leave
+
+
+def main(data):
+    """
+    Draft roster without a solver: the scheduler4/5 eligibility rules (leave
+    and pending leave, OJT days, pattern shift group, sites, competencies)
+    and a scarcity-ordered greedy fill. Returns in milliseconds in the same
+    format as scheduler4; slots nobody is left for stay short.
+    """
+    start_time = time.time()
+    employees_data = data.get("employees", [])
+    requests_data = data.get("requests", [])
+    ojt_data = data.get("ojtData", {})
+
+    if not requests_data:
+        return json.dumps({"error": "No shift requests to schedule."})
+
+    registry = site_registry.from_payload(data)
+    pattern_sequence = registry.pattern_from_names(data.get("shiftPattern") or site_registry.DEFAULT_PATTERN_NAMES)
+    workforce = payload.workforce_for(data)
+
+    all_dates = sorted({req["date"] for req in requests_data})
+    date_to_index = {date_str: i for i, date_str in enumerate(all_dates)}
+    scarcity_scores = site_registry.console_scarcity(employees_data, requests_data)
+    offsets = workforce.balanced_offsets(employees_data, requests_data, len(pattern_sequence))
+    employee_sites = [registry.employee_sites(emp) for emp in employees_data]
+    leave = _leave_days(data)
+
+    # OJT blocks the whole day and is rostered as given
+    day_has_ojt = set()
+    ojt_entries = []
+    for date_str, users in ojt_data.items():
+        if date_str not in date_to_index:
+            continue
+        for user_id, shifts in users.items():
+            if user_id not in workforce.index:
+                continue
+            for shift_name, entry in shifts.items():
+                if registry.shift_of(shift_name) is None:
+                    continue
+                day_has_ojt.add((workforce.index[user_id], date_to_index[date_str]))
+                ojt_entries.append((date_str, shift_name, user_id, payload.ojt_entry(entry)["console"]))
+
+    # Staff working by pattern each day: (e_idx, expected shift)
+    working = []
+    for d_idx, date_str in enumerate(all_dates):
+        day = []
+        for e_idx, emp in enumerate(employees_data):
+            if date_str in leave.get(emp["id"], ()) or (e_idx, d_idx) in day_has_ojt:
+                continue
+            expected_s = site_registry.expected_shift(pattern_sequence, offsets[e_idx], d_idx)
+            if expected_s != OFF:
+                day.append((e_idx, expected_s))
+        working.append(day)
+
+    slots = {}
+    for req in requests_data:
+        d_idx = date_to_index[req["date"]]
+        s_idx = registry.shift_of(req["shiftType"])
+        l_idx = registry.site_index.get(req["location"])
+        if s_idx is None or s_idx == OFF or l_idx is None:
+            continue
+        for comp_name, count in req.get("required_competencies", {}).items():
+            if count <= 0:
+                continue
+            slots[(d_idx, s_idx, l_idx, comp_name)] = (count, [
+                (e_idx, expected_s) for e_idx, expected_s in working[d_idx]
+                if comp_name in workforce.competency_sets[e_idx]
+                and registry.can_work_shift(expected_s, s_idx)
+                and (employee_sites[e_idx] is None or l_idx in employee_sites[e_idx])
+            ])
+
+    # Same candidate ranking as the presolve (pattern fit, other skills, reserve deployments)
+    ranker = presolve.CandidatePruner(
+        data, workforce.competency_sets, scarcity_scores,
+        [int(emp.get("reserve_deploy_count", 0)) for emp in employees_data],
+    )
+    filled = greedy_fill(slots, scarcity_scores, ranker.rank)
+
+    roster = {}
+    assigned_emp_days = set()
+    for (d_idx, s_idx, l_idx, comp_name), e_list in filled.items():
+        date_str = all_dates[d_idx]
+        day = roster.setdefault(date_str, registry.empty_day())
+        for e_idx in e_list:
+            assigned_emp_days.add((e_idx, d_idx))
+            day[registry.site_names[l_idx]][registry.shift_names[s_idx]].append({
+                "user_id": employees_data[e_idx]["id"],
+                "assigned_console": comp_name,
+                "is_ojt": False,
+            })
+    for date_str, shift_name, user_id, console in ojt_entries:
+        day = roster.setdefault(date_str, registry.empty_day())
+        day[registry.site_names[0]].setdefault(shift_name, []).append({
+            "user_id": user_id,
+            "assigned_console": console,
+            "is_ojt": True,
+        })
+
+    reserve_slots = [
+        (d_idx, e_idx, expected_s)
+        for d_idx, day in enumerate(working)
+        for e_idx, expected_s in day
+        if (e_idx, d_idx) not in assigned_emp_days
+    ]
+    reserve_index = reserve_pool.build_index(employees_data, all_dates, reserve_slots, registry.shift_names)
+    reserve_pool.publish(reserve_index, "Draft", data.get("schedulingMode"))
+
+    required = sum(count for count, _ in slots.values())
+    assigned = sum(len(e_list) for e_list in filled.values())
+    sys.stderr.write(
+        f"Draft: Filled {assigned} of {required} console slots for {len(employees_data)} employees "
+        f"in {(time.time() - start_time) * 1000:.1f}ms\n"
+    )
+    return json.dumps(roster)
@@ -0,0 +1,12 @@
+# Gunicorn picks this file up automatically from the working directory.
+# Command-line flags in the Dockerfile still take precedence over these settings.
+
+
+def post_worker_init(worker):
+    # The listening socket is already bound by the master at this point,
+    # so warming up here never delays the first health check.
+    from app import WARMUP_ENABLED
+    import scheduler_registry
+
+    if WARMUP_ENABLED:
+        scheduler_registry.start_warmup()
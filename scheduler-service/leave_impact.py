@@ -0,0 +1,237 @@
+"""
+Leave-approval impact (POST /leave-impact): what approving a block leave does
+to coverage, in milliseconds instead of a simulation-pending solve.
+
+Each day's coverage is risk.DayEngine's matching of console slots to the
+staff working by pattern. The baseline matching (approved leave and OJT
+removed, grown from the current `roster` when one is sent) is built once per
+touched day. A candidate leave then only takes its employee out of the days
+it covers: if they held a slot, one breadth-first search from that slot
+looks for cover. It ends at someone working but unassigned, i.e. the reserve
+pool, moving as few others along the way as possible. A day with no such path loses one
+slot, charged to the least constrained console the freed slot can reach
+(DayEngine leaves those short first too).
+
+Candidates are evaluated independently against the baseline; `combined` is
+the effect of approving all of them. Other pending leaves stay unapproved.
+Approvers send the same state with different candidates, so the per-day
+engines and baselines are kept for the last few states.
+"""
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import risk
+
+# --- Tunable Parameters ---
+MAX_CACHED_STATES = 8  # Availability states whose per-day baselines are kept; least recently used go first
+STATE_FIELDS = ("employees", "requests", "leaveData", "ojtData", "shiftPattern", "sites", "shiftTypes", "roster")
+
+_states = OrderedDict()  # state hash -> {date: (DayEngine, baseline matching)}
+_states_lock = threading.Lock()
+
+
+def _seed(date_roster, index):
+    """[(e_idx, slot_key)] for the regular assignments of one roster day."""
+    seed = []
+    for site, shifts in (date_roster or {}).items():
+        for shift_name, entries in shifts.items():
+            for entry in entries:
+                if not entry.get("is_ojt") and entry.get("user_id") in index:
+                    seed.append((index[entry["user_id"]], (shift_name, site, entry.get("assigned_console"))))
+    return seed
+
+
+def baseline_matching(engine, seed=()):
+    """
+    Maximum matching {e_idx: slot} for one day, keeping the `seed` assignments
+    that are still valid so the baseline is the roster being changed.
+    """
+    slots_by_key = {}
+    for slot, key in enumerate(engine.slot_keys):
+        slots_by_key.setdefault(key, []).append(slot)
+
+    owner = {}
+    held = set()
+    for e_idx, slot_key in seed:
+        if e_idx in owner:
+            continue
+        for slot in slots_by_key.get(slot_key, ()):
+            if slot not in held and e_idx in engine.slot_candidates[slot]:
+                owner[e_idx] = slot
+                held.add(slot)
+                break
+    for slot in range(len(engine.slot_keys)):
+        if slot not in held:
+            engine.augment(slot, owner, frozenset(), set())
+    return owner
+
+
+def _state_key(data):
+    state = {field: data.get(field) for field in STATE_FIELDS}
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _baselines(data, dates):
+    """{date: (DayEngine, baseline matching)} for `dates`, building only the days not cached for this state."""
+    key = _state_key(data)
+    with _states_lock:
+        days = _states.get(key)
+        if days is None:
+            days = _states[key] = {}
+            while len(_states) > MAX_CACHED_STATES:
+                _states.popitem(last=False)
+        else:
+            _states.move_to_end(key)
+        missing = set(dates) - set(days)
+
+    if missing:
+        index = {emp["id"]: i for i, emp in enumerate(data.get("employees", []))}
+        roster = data.get("roster") or {}
+        engines, _ = risk.build_engines(data, dates=missing)
+        built = {d: (engines[d], baseline_matching(engines[d], _seed(roster.get(d), index))) for d in missing}
+        with _states_lock:
+            days.update(built)
+    return {d: days[d] for d in dates}
+
+
+def _cover(engine, owner, slot, absent):
+    """
+    Fill `slot` (in place) through the shortest alternating path ending at
+    someone working but unassigned, so as few people as possible change
+    console. Returns (moved e_idxs, reserve first), or ([], slot left empty)
+    when there is no such path: people then shift so the slot left empty is
+    the least constrained one reachable (highest index, as DayEngine orders
+    slots).
+    """
+    parent = {slot: None}  # reached slot -> (slot its holder would move to, holder)
+    queue = [slot]
+    for current in queue:
+        for e in engine.slot_candidates[current]:
+            if e in absent:
+                continue
+            if e not in owner:
+                owner[e] = current
+                moved = [e]
+                while parent[current] is not None:
+                    current, holder = parent[current]
+                    owner[holder] = current
+                    moved.append(holder)
+                return moved, None
+            if owner[e] not in parent:
+                parent[owner[e]] = (current, e)
+                queue.append(owner[e])
+
+    empty = target = max(parent)
+    while parent[empty] is not None:
+        empty, holder = parent[empty]
+        owner[holder] = empty
+    return [], target
+
+
+def remove(engine, owner, e_idx, absent):
+    """
+    Take e_idx out of `owner` in place (`absent` gains e_idx). Returns
+    (held slot or None, moved e_idxs with the reserve first, slot left empty or None).
+    """
+    absent.add(e_idx)
+    slot = owner.pop(e_idx, None)
+    if slot is None:
+        return None, [], None
+    moved, empty = _cover(engine, owner, slot, absent)
+    return slot, moved, empty
+
+
+def _slot_dict(engine, slot):
+    shift_name, location, console = engine.slot_keys[slot]
+    return {"shift": shift_name, "location": location, "console": console}
+
+
+def evaluate(data):
+    """(response body, HTTP status) for a decoded /leave-impact payload."""
+    started = time.time()
+    candidates = data.get("candidateLeaves", [])
+    if not candidates:
+        return {"success": False, "message": "candidateLeaves is required"}, 400
+    if not data.get("requests"):
+        return {"success": False, "message": "No shift requests to evaluate"}, 400
+
+    employees_data = data.get("employees", [])
+    index = {emp["id"]: i for i, emp in enumerate(employees_data)}
+    horizon = {req["date"] for req in data["requests"]}
+    candidate_dates = [[d for d in risk.leave_dates(leave) if d in horizon] for leave in candidates]
+    touched = set().union(*candidate_dates)
+
+    cached = _baselines(data, touched)
+    engines = {d: engine for d, (engine, _) in cached.items()}
+    baselines = {d: owner for d, (_, owner) in cached.items()}
+    built = time.time()
+
+    results = []
+    combined_owner = {d: dict(owner) for d, owner in baselines.items()}
+    combined_absent = {d: set() for d in touched}
+    combined_delta = {}
+    for leave, dates in zip(candidates, candidate_dates):
+        user_id = leave["user_id"]
+        if user_id not in index:
+            results.append({"user_id": user_id, "error": "Unknown employee"})
+            continue
+        e_idx = index[user_id]
+        days = []
+        delta = []
+        for date_str in dates:
+            engine = engines[date_str]
+            owner = dict(baselines[date_str])
+            slot, moved, empty = remove(engine, owner, e_idx, set())
+            # Same removal on top of the candidates before this one
+            _, _, combined_empty = remove(engine, combined_owner[date_str], e_idx, combined_absent[date_str])
+            if combined_empty is not None:
+                key = (date_str, engine.slot_keys[combined_empty])
+                combined_delta[key] = combined_delta.get(key, 0) - 1
+
+            if slot is None:
+                status = "reserve" if e_idx in engine.working else "off"
+                days.append({"date": date_str, "status": status})
+                continue
+            day = dict({"date": date_str, "status": "assigned", "absorbed": empty is None}, **_slot_dict(engine, slot))
+            if empty is None:
+                # Someone from the reserve comes in; the others on the path move to the slot listed
+                day["coveredBy"] = employees_data[moved[0]]["id"]
+                day["moves"] = [dict({"user_id": employees_data[e]["id"]}, **_slot_dict(engine, owner[e])) for e in moved[1:]]
+            else:
+                delta.append(dict({"date": date_str, "delta": -1}, **_slot_dict(engine, empty)))
+            days.append(day)
+
+        results.append({
+            "user_id": user_id,
+            "start_date": leave["start_date"],
+            "end_date": leave["end_date"],
+            "absorbed": not delta,
+            "shortfallAdded": len(delta),
+            "daysInHorizon": len(dates),
+            "days": days,
+            "coverageDelta": delta,
+        })
+
+    combined = [
+        {"date": date_str, "shift": shift_name, "location": location, "console": console, "delta": change}
+        for (date_str, (shift_name, location, console)), change in sorted(combined_delta.items())
+    ]
+    elapsed = time.time() - started
+    sys.stderr.write(
+        f"LeaveImpact: {len(candidates)} candidates over {len(touched)} days in {elapsed * 1000:.1f}ms "
+        f"(baseline {(built - started) * 1000:.1f}ms)\n"
+    )
+    return {"success": True, "data": {
+        "candidates": results,
+        "combined": {"shortfallAdded": -sum(combined_delta.values()), "coverageDelta": combined},
+        "stats": {
+            "candidates": len(candidates),
+            "days": len(touched),
+            "baseline_ms": round((built - started) * 1000, 1),
+            "elapsed_ms": round(elapsed * 1000, 1),
+        },
+    }}, 200
@@ -0,0 +1,316 @@
+"""
+Streaming importer for leave-application workbooks
+(e.g. data/Leave Applications July-Dec_as of 6Mar.xlsx).
+
+Rows are streamed with openpyxl in read-only mode, so memory grows with the
+number of distinct (employee, leave interval) pairs rather than the sheet.
+Leave types are normalised to the Leaves collection enum, date ranges are
+clipped to an optional horizon, and overlapping/adjacent ranges per employee,
+status and leave type are merged into intervals.
+
+Write scheduler payload fragments (approved -> leaveData, pending -> pendingLeaves):
+
+    python leave_import.py "../data/Leave Applications July-Dec_as of 6Mar.xlsx" --out leave.json
+
+Or bulk-upsert one Leaves document per day into MongoDB (MONGODB_URI):
+
+    python leave_import.py workbook.xlsx --upsert --from 2026-07-01 --to 2026-12-31
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date, datetime, timedelta
+
+from openpyxl import load_workbook
+
+# --- Tunable Parameters ---
+DEFAULT_SHEET = "Leave Aplications"  # sic, as named in the workbook
+UPSERT_BATCH_SIZE = 500
+LEAVES_COLLECTION = "Leaves"
+
+# Header names in the workbook -> fields used here
+COLUMNS = {
+    "name": "Name of Employee",
+    "emp_id": "EmpID",
+    "leave_type": "Leave Type",
+    "start": "Start Date",
+    "end": "End Date",
+    "detail": "Indicate type of leave",
+    "status": "Status",
+}
+
+# Workbook "Leave Type" -> Leaves.leave_type. AdHoc rows use "Indicate type of leave" instead.
+LEAVE_TYPES = {
+    "advanced": "Advance Leave",
+    "blocked": "Block Leave",
+}
+ADHOC_LEAVE_TYPES = {
+    "annual leave": "Annual leave",
+    "medical leave": "Medical leave",
+    "hospitalisation leave": "Hospitalisation Leave",
+    "shared parental leave": "Parental Leave",
+    "childcare leave": "Annual leave",
+    "family care leave": "Annual leave",
+    "birthday leave": "Annual leave",
+    "birthday time off": "Annual leave",
+}
+STATUSES = {"approved": "Approved", "pending": "Pending", "rejected": "Rejected"}
+
+
+def user_id_from_name(name):
+    """Same convention the competency import used: 'Abdul Hadi' -> 'abdul.hadi'."""
+    return " ".join(str(name).split()).lower().replace(" ", ".")
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value.strip():
+        return datetime.strptime(value.strip()[:10], "%Y-%m-%d").date()
+    return None
+
+
+def normalise_leave_type(raw_type, detail):
+    """(leave_type, sub_leave_type) for the Leaves collection, or (None, reason) if unmapped."""
+    key = str(raw_type or "").strip().lower()
+    if key in LEAVE_TYPES:
+        return LEAVE_TYPES[key], (detail or None)
+    if key == "adhoc":
+        detail_key = str(detail or "annual leave").strip().lower()
+        if detail_key in ADHOC_LEAVE_TYPES:
+            return ADHOC_LEAVE_TYPES[detail_key], (detail or None)
+        return None, f"unknown AdHoc leave '{detail}'"
+    return None, f"unknown leave type '{raw_type}'"
+
+
+def stream_rows(path, sheet=DEFAULT_SHEET):
+    """Yield one dict per data row, keyed by the COLUMNS fields."""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows)]
+        missing = [title for title in COLUMNS.values() if title not in header]
+        if missing:
+            raise ValueError(f"Sheet '{sheet}' is missing columns: {missing}")
+        positions = {field: header.index(title) for field, title in COLUMNS.items()}
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            yield {field: (row[pos] if pos < len(row) else None) for field, pos in positions.items()}
+    finally:
+        workbook.close()
+
+
+def _merge_ranges(ranges):
+    """Merge overlapping or adjacent (start, end) ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(m) for m in merged]
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or adjacent (start, end, leave_type, sub_type) ranges of
+    the same type, so every merged day keeps the type it was applied for.
+    Ranges of different types may still overlap.
+    """
+    by_type = {}
+    for start, end, leave_type, sub_type in intervals:
+        by_type.setdefault((leave_type, sub_type), []).append((start, end))
+    return sorted((
+        (start, end, leave_type, sub_type)
+        for (leave_type, sub_type), ranges in by_type.items()
+        for start, end in _merge_ranges(ranges)
+    ), key=lambda i: (i[0], i[1]))
+
+
+def import_workbook(path, sheet=DEFAULT_SHEET, horizon_start=None, horizon_end=None, id_column="name"):
+    """
+    Stream the workbook and return
+    ({status: {user_id: [(start, end, leave_type, sub_type), ...]}}, stats)
+    with intervals merged per employee, status and leave type.
+    """
+    started = time.time()
+    raw = {}
+    stats = {"rows": 0, "imported": 0, "skipped": {}}
+
+    def skip(reason):
+        stats["skipped"][reason] = stats["skipped"].get(reason, 0) + 1
+
+    for row in stream_rows(path, sheet):
+        stats["rows"] += 1
+        status = STATUSES.get(str(row["status"] or "").strip().lower())
+        if status is None or status == "Rejected":
+            skip("not approved or pending")
+            continue
+        ident = row["emp_id"] if id_column == "emp_id" else row["name"]
+        if ident is None:
+            skip("no employee")
+            continue
+        user_id = str(ident) if id_column == "emp_id" else user_id_from_name(ident)
+
+        leave_type, sub_type = normalise_leave_type(row["leave_type"], row["detail"])
+        if leave_type is None:
+            skip(sub_type)
+            continue
+
+        try:
+            start, end = _to_date(row["start"]), _to_date(row["end"]) or _to_date(row["start"])
+        except ValueError:
+            skip("bad date")
+            continue
+        if start is None:
+            skip("bad date")
+            continue
+        if end < start:
+            start, end = end, start
+        if horizon_start:
+            start = max(start, horizon_start)
+        if horizon_end:
+            end = min(end, horizon_end)
+        if end < start:
+            skip("outside horizon")
+            continue
+
+        intervals = raw.setdefault(status, {}).setdefault(user_id, [])
+        intervals.append((start, end, leave_type, sub_type))
+        stats["imported"] += 1
+
+    result = {
+        status: {user_id: merge_intervals(intervals) for user_id, intervals in by_user.items()}
+        for status, by_user in raw.items()
+    }
+    stats["intervals"] = {status: sum(len(v) for v in by_user.values()) for status, by_user in result.items()}
+    stats["seconds"] = round(time.time() - started, 3)
+    return result, stats
+
+
+def _days(start, end):
+    d = start
+    while d <= end:
+        yield d
+        d += timedelta(days=1)
+
+
+def to_scheduler_payload(intervals):
+    """Approved leave as `leaveData` ({user_id: [dates]}), pending as `pendingLeaves` ranges."""
+    # The schedulers don't read leave types, so ranges of different types are merged here
+    leave_data = {
+        user_id: [d.isoformat() for start, end in _merge_ranges(r[:2] for r in ranges) for d in _days(start, end)]
+        for user_id, ranges in intervals.get("Approved", {}).items()
+    }
+    pending = [
+        {"user_id": user_id, "start_date": start.isoformat(), "end_date": end.isoformat()}
+        for user_id, ranges in sorted(intervals.get("Pending", {}).items())
+        for start, end in _merge_ranges(r[:2] for r in ranges)
+    ]
+    return {"leaveData": leave_data, "pendingLeaves": pending}
+
+
+def leave_documents(intervals):
+    """
+    One Leaves document per (user, day), as the Next.js leave routes store
+    them. A day covered by ranges of different types takes the type of the
+    one starting first.
+    """
+    for status, by_user in intervals.items():
+        for user_id, ranges in by_user.items():
+            written = set()
+            for start, end, leave_type, sub_type in ranges:
+                for d in _days(start, end):
+                    if d in written:
+                        continue
+                    written.add(d)
+                    doc = {
+                        "user_id": user_id,
+                        "date": datetime(d.year, d.month, d.day),
+                        "leave_type": leave_type,
+                        "status": status,
+                    }
+                    if sub_type:
+                        doc["sub_leave_type"] = sub_type
+                    yield doc
+
+
+def bulk_upsert(documents, batch_size=UPSERT_BATCH_SIZE):
+    """Upsert on (user_id, date) in unordered batches. Returns (matched, upserted)."""
+    try:
+        from pymongo import MongoClient, UpdateOne
+    except ImportError:
+        raise SystemExit("pymongo is required for --upsert (pip install pymongo)")
+    uri = os.environ.get("MONGODB_URI")
+    if not uri:
+        raise SystemExit("Set MONGODB_URI to upsert into MongoDB")
+
+    client = MongoClient(uri)
+    db_name = os.environ.get("MONGODB_DB")
+    collection = (client[db_name] if db_name else client.get_default_database())[LEAVES_COLLECTION]
+    matched = upserted = 0
+    batch = []
+    try:
+        for doc in documents:
+            now = datetime.utcnow()
+            batch.append(UpdateOne(
+                {"user_id": doc["user_id"], "date": doc["date"]},
+                {"$set": dict(doc, updatedAt=now), "$setOnInsert": {"createdAt": now}},
+                upsert=True,
+            ))
+            if len(batch) >= batch_size:
+                result = collection.bulk_write(batch, ordered=False)
+                matched += result.matched_count
+                upserted += result.upserted_count
+                batch = []
+        if batch:
+            result = collection.bulk_write(batch, ordered=False)
+            matched += result.matched_count
+            upserted += result.upserted_count
+    finally:
+        client.close()
+    return matched, upserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a leave-application workbook.")
+    parser.add_argument("workbook")
+    parser.add_argument("--sheet", default=DEFAULT_SHEET)
+    parser.add_argument("--from", dest="horizon_start", help="clip leave to start at YYYY-MM-DD")
+    parser.add_argument("--to", dest="horizon_end", help="clip leave to end at YYYY-MM-DD")
+    parser.add_argument("--id-column", choices=["name", "emp_id"], default="name",
+                        help="derive user_id from the employee name (default) or use EmpID")
+    parser.add_argument("--out", help="write {leaveData, pendingLeaves} JSON here (default stdout)")
+    parser.add_argument("--upsert", action="store_true", help="bulk-upsert Leaves documents into MongoDB")
+    parser.add_argument("--batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    intervals, stats = import_workbook(
+        args.workbook, args.sheet,
+        horizon_start=_to_date(args.horizon_start), horizon_end=_to_date(args.horizon_end),
+        id_column=args.id_column,
+    )
+    sys.stderr.write(f"LeaveImport: {json.dumps(stats)}\n")
+
+    if args.upsert:
+        matched, upserted = bulk_upsert(leave_documents(intervals), args.batch_size)
+        sys.stderr.write(f"LeaveImport: Upserted {upserted} new and updated {matched} existing leave days\n")
+        return
+
+    output = json.dumps(to_scheduler_payload(intervals), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
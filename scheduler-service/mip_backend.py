@@ -0,0 +1,242 @@
+"""
+MIP backend: solves a CP-SAT model with HiGHS (scipy.optimize.milp) instead.
+
+The schedulers keep building cp_model.CpModel; its proto is the backend-neutral
+model. Linear constraints, bool_or / bool_and (with enforcement literals),
+at_most_one / exactly_one and a linear objective translate exactly to a 0-1
+MIP. Anything else (no-overlap, element, multiplication, domains with holes,
+enforced linear constraints) raises Unsupported and the caller stays on CP-SAT.
+Hints and decision strategies are CP-SAT search guidance and are dropped.
+
+HighsSolver answers the part of the CpSolver API the schedulers, solve_history
+and corpus read after a solve (Value, ObjectiveValue, StatusName, ...), plus
+solution_values for solve_control.solution_values.
+"""
+import sys
+import time
+import types
+
+import numpy as np
+from ortools.sat import cp_model_pb2
+from ortools.sat.python import cp_model
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    from scipy.sparse import csr_matrix
+except ImportError:  # Optional: without SciPy every solve stays on CP-SAT
+    milp = None
+
+# CP-SAT encodes "unbounded" as +-INT64 max in domains
+_INT_BOUND = 2 ** 62
+
+
+class Unsupported(Exception):
+    """The model uses a constraint the MIP translation doesn't cover."""
+
+
+def available():
+    return milp is not None
+
+
+def _literal(ref):
+    """(coefficient, variable index, constant) so that literal `ref` == coefficient * x + constant."""
+    return (1, ref, 0) if ref >= 0 else (-1, -ref - 1, 1)
+
+
+def _bound(value):
+    if value <= -_INT_BOUND:
+        return -np.inf
+    if value >= _INT_BOUND:
+        return np.inf
+    return float(value)
+
+
+# Constraint kinds with an exact 0-1 MIP form
+_KINDS = ("linear", "bool_or", "bool_and", "at_most_one", "exactly_one")
+
+
+def _read(repeated):
+    """A repeated proto field as a list; indexing the wrapper is several times faster than iterating it."""
+    return [repeated[i] for i in range(len(repeated))]
+
+
+def _kind(ct):
+    for kind in _KINDS:
+        if getattr(ct, "has_" + kind)():
+            return kind
+    return None
+
+
+class MipTranslation:
+    """Sparse constraint rows (lower <= A x <= upper) built from CpModel.Proto()."""
+
+    def __init__(self, proto):
+        self.num_vars = len(proto.variables)
+        # One entry per term: row, coefficient, literal ref. Negated refs are resolved in bulk below.
+        rows, coeffs, refs = [], [], []
+        lower, upper = [], []
+
+        def add_row(row_coeffs, row_refs, row_lower, row_upper):
+            rows.extend([len(lower)] * len(row_refs))
+            coeffs.extend(row_coeffs)
+            refs.extend(row_refs)
+            lower.append(row_lower)
+            upper.append(row_upper)
+
+        # Proto() is a C++ wrapper: every element read is a call, so each repeated field is read once
+        self.var_lower = np.empty(self.num_vars)
+        self.var_upper = np.empty(self.num_vars)
+        for i, var in enumerate(proto.variables):
+            domain = _read(var.domain)
+            if len(domain) != 2:
+                raise Unsupported(f"variable {i} has a domain with holes")
+            self.var_lower[i] = _bound(domain[0])
+            self.var_upper[i] = _bound(domain[1])
+
+        for i, ct in enumerate(proto.constraints):
+            kind = _kind(ct)
+            enforcement = _read(ct.enforcement_literal)
+            if kind == "linear":
+                if enforcement:
+                    raise Unsupported("enforced linear constraint")
+                linear = ct.linear
+                domain = _read(linear.domain)
+                if len(domain) != 2:
+                    raise Unsupported("linear constraint with a domain with holes")
+                add_row(_read(linear.coeffs), _read(linear.vars), _bound(domain[0]), _bound(domain[1]))
+            elif kind == "bool_or":
+                # sum(literals) >= 1 whenever every enforcement literal holds
+                literals = _read(ct.bool_or.literals)
+                add_row([1] * len(literals) + [-1] * len(enforcement), literals + enforcement,
+                        1 - len(enforcement), np.inf)
+            elif kind == "bool_and":
+                for ref in _read(ct.bool_and.literals):
+                    add_row([1] + [-1] * len(enforcement), [ref] + enforcement, 1 - len(enforcement), np.inf)
+            elif kind in ("at_most_one", "exactly_one"):
+                if enforcement:
+                    raise Unsupported(f"enforced {kind}")
+                literals = _read(getattr(ct, kind).literals)
+                add_row([1] * len(literals), literals, 1 if kind == "exactly_one" else -np.inf, 1)
+            else:
+                raise Unsupported(f"constraint {i} is not linear, bool_or/bool_and or at_most_one/exactly_one")
+
+        # literal(ref) for ref < 0 is 1 - x[-ref - 1]: flip the coefficient and move the 1 to the bounds
+        refs = np.asarray(refs, dtype=np.int64)
+        coeffs = np.asarray(coeffs, dtype=np.float64)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        negated = refs < 0
+        self.cols = np.where(negated, -refs - 1, refs)
+        self.vals = np.where(negated, -coeffs, coeffs)
+        constants = np.zeros(len(lower))
+        np.add.at(constants, self.rows[negated], coeffs[negated])
+        self.lower = np.asarray(lower, dtype=np.float64) - constants
+        self.upper = np.asarray(upper, dtype=np.float64) - constants
+
+        if proto.has_floating_point_objective():
+            raise Unsupported("floating point objective")
+        self.cost = np.zeros(self.num_vars)
+        self.objective_offset = 0.0
+        self.objective_scale = 1.0
+        if proto.has_objective():
+            objective = proto.objective
+            objective_refs = _read(objective.vars)
+            objective_coeffs = _read(objective.coeffs)
+            for ref, coeff in zip(objective_refs, objective_coeffs):
+                coefficient, index, constant = _literal(ref)
+                self.cost[index] += coeff * coefficient
+            self.objective_offset = objective.offset + sum(
+                coeff for ref, coeff in zip(objective_refs, objective_coeffs) if ref < 0
+            )
+            self.objective_scale = objective.scaling_factor or 1.0
+
+    def new_solver(self):
+        return HighsSolver()
+
+    def objective(self, x):
+        return self.objective_scale * (float(self.cost @ x) + self.objective_offset)
+
+
+class HighsSolver:
+    """
+    Drop-in for the CpSolver calls made after solve_control.solve returns.
+    `parameters` accepts the CP-SAT fields the schedulers set; only the time
+    limit and relative gap mean anything to HiGHS (SciPy has no absolute gap
+    option, so HiGHS closes the relative one: proven optimal by default).
+    """
+
+    def __init__(self):
+        self.parameters = types.SimpleNamespace(
+            max_time_in_seconds=None, absolute_gap_limit=0.0, relative_gap_limit=0.0, num_search_workers=1,
+            max_memory_in_mb=None, log_search_progress=False, log_to_stdout=False,
+        )
+        self.log_callback = None
+        self._values = None
+        self._objective = 0.0
+        self._bound = 0.0
+        self._wall_time = 0.0
+        self.nodes = 0
+
+    def solve(self, translation):
+        """Solve a MipTranslation of the model; returns a cp_model status."""
+        started = time.time()
+        matrix = csr_matrix(
+            (translation.vals, (translation.rows, translation.cols)),
+            shape=(len(translation.lower), translation.num_vars),
+        )
+        options = {"disp": bool(self.parameters.log_search_progress), "mip_rel_gap": self.parameters.relative_gap_limit}
+        if self.parameters.max_time_in_seconds:
+            options["time_limit"] = self.parameters.max_time_in_seconds
+        result = milp(
+            translation.cost,
+            integrality=np.ones(translation.num_vars),
+            bounds=Bounds(translation.var_lower, translation.var_upper),
+            constraints=[LinearConstraint(matrix, translation.lower, translation.upper)] if len(translation.lower) else [],
+            options=options,
+        )
+        self._wall_time = time.time() - started
+        self.nodes = getattr(result, "mip_node_count", 0) or 0
+
+        if result.x is not None:
+            self._values = np.rint(result.x).astype(np.int64)
+            self._objective = translation.objective(self._values)
+            dual_bound = getattr(result, "mip_dual_bound", None)
+            self._bound = self._objective if dual_bound is None else translation.objective_scale * (
+                dual_bound + translation.objective_offset)
+        if self.log_callback is not None:
+            self.log_callback(f"HiGHS: {result.message} (nodes={self.nodes}, {self._wall_time:.2f}s)")
+
+        # 0: optimal (within mip_rel_gap), 1: time/iteration limit, 2: infeasible, 3: unbounded
+        if result.status == 0:
+            return cp_model.OPTIMAL
+        if result.status == 1 and self._values is not None:
+            return cp_model.FEASIBLE
+        if result.status == 2:
+            return cp_model.INFEASIBLE
+        if result.status == 3:
+            return cp_model.MODEL_INVALID
+        sys.stderr.write(f"MipBackend: HiGHS returned no solution: {result.message}\n")
+        return cp_model.UNKNOWN
+
+    def Value(self, expression):
+        if isinstance(expression, (int, np.integer)):
+            return int(expression)
+        coefficient, index, constant = _literal(expression.Index())
+        return int(coefficient * self._values[index] + constant)
+
+    def solution_values(self):
+        return self._values
+
+    def BooleanValue(self, literal):
+        return bool(self.Value(literal))
+
+    def ObjectiveValue(self):
+        return self._objective
+
+    def BestObjectiveBound(self):
+        return self._bound
+
+    def WallTime(self):
+        return self._wall_time
+
+    def StatusName(self, status):
+        return cp_model_pb2.CpSolverStatus.Name(status)
@@ -0,0 +1,425 @@
+import sys
+import json
+import time
+import hashlib
+import threading
+from datetime import date
+from collections import OrderedDict
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+
+import msgspec
+
+# Key under which the decoded payload carries its preprocessed workforce.
+# Internal only: strip it before serialising a payload (see without_internal_keys).
+WORKFORCE_KEY = "_workforce"
+
+ISODate = msgspec.Meta(pattern=r"^\d{4}-\d{2}-\d{2}$")
+ISODateTime = msgspec.Meta(pattern=r"^\d{4}-\d{2}-\d{2}(T.*)?$")  # pending leaves arrive as JS ISO strings
+Count = msgspec.Meta(ge=0)
+Probability = msgspec.Meta(ge=0, le=1)
+
+# --- Tunable Parameters ---
+MAX_SNAPSHOTS = 32  # Workforce snapshots kept in memory; least recently used are evicted
+MAX_CACHED_OFFSETS = 16  # Balanced offset assignments memoised per workforce
+
+
+# --- Schema ---
+class Employee(msgspec.Struct):
+    id: str
+    proficiency_grade: Optional[int] = 0  # null for users without a grade; read as 0
+    team: Optional[int] = None
+    competencies: List[str] = []
+    offset: Optional[Annotated[int, Count]] = None
+    sites: List[str] = []
+    reserve_deploy_count: Annotated[int, Count] = 0
+
+
+class ShiftRequest(msgspec.Struct):
+    date: Annotated[str, ISODate]
+    shiftType: str
+    location: str
+    required_competencies: Dict[str, Annotated[int, Count]] = {}
+    required_proficiencies: Dict[int, Annotated[int, Count]] = {}
+
+
+class PendingLeave(msgspec.Struct):
+    user_id: str
+    start_date: Annotated[str, ISODateTime]
+    end_date: Annotated[str, ISODateTime]
+    approvalProbability: Optional[Annotated[float, Probability]] = None
+
+
+class RosterEntry(msgspec.Struct):
+    user_id: str
+    assigned_console: Optional[str] = None
+    is_ojt: bool = False
+
+
+class OjtEntry(msgspec.Struct):
+    console: str
+    location: Optional[str] = None
+
+
+class ShiftType(msgspec.Struct):
+    name: str
+    group: Optional[str] = None
+
+
+class SolveOptions(msgspec.Struct):
+    maxTimeSeconds: Optional[float] = None
+    stallSeconds: Optional[float] = None
+    absoluteGap: Optional[float] = None  # objective units; default is below the scheduler's smallest penalty weight
+    relativeGap: Optional[float] = None
+    backend: Optional[Literal["auto", "cp-sat", "highs"]] = None  # see solve_control.choose_backend
+    tileCycles: Optional[bool] = None  # competency/simulation modes: solve one pattern cycle and tile it (see tiling.py)
+
+
+class Scenario(msgspec.Struct):
+    name: str
+    overrides: Dict[str, Any] = {}  # top-level payload fields replaced for this variant
+
+
+class ShardOptions(msgspec.Struct):
+    shardBy: Literal["auto", "parts", "window", "scenario"] = "auto"
+    windowDays: Annotated[int, msgspec.Meta(ge=1)] = 7
+    scenarios: List[Scenario] = []
+
+
+class WorkforceSnapshot(msgspec.Struct):
+    employees: List[Employee]
+
+
+class RosterPayload(msgspec.Struct):
+    employees: List[Employee] = []
+    workforceSnapshot: Optional[str] = None  # id from POST /workforce-snapshots, instead of employees
+    requests: List[ShiftRequest] = []
+    leaveData: Dict[str, Union[List[str], Dict[str, bool]]] = {}
+    ojtData: Dict[str, Dict[str, Dict[str, Union[str, OjtEntry]]]] = {}  # date -> user_id -> shift -> console (see ojt_entry)
+    pendingLeaves: List[PendingLeave] = []
+    schedulingMode: str = "individual"
+    shiftPattern: List[str] = []
+    sites: List[str] = []
+    shiftTypes: List[Union[str, ShiftType]] = []
+    solveProfile: Optional[str] = None
+    solveOptions: Optional[SolveOptions] = None
+    debugProfile: bool = False
+    riskSamples: Optional[Annotated[int, msgspec.Meta(ge=1)]] = None
+    riskSeed: Optional[int] = None
+    defaultApprovalProbability: Optional[Annotated[float, Probability]] = None
+    sharding: Optional[ShardOptions] = None  # /coordinate-roster only (see coordinator.py)
+    candidateLeaves: List[PendingLeave] = []  # /leave-impact only (see leave_impact.py)
+    roster: Optional[Dict[str, Dict[str, Dict[str, List[RosterEntry]]]]] = None  # /leave-impact: current roster
+
+
+class Disruption(msgspec.Struct):
+    user_id: str
+    dates: Annotated[List[Annotated[str, ISODate]], msgspec.Meta(min_length=1)]
+    shifts: List[str] = []  # default: every shift on those dates
+
+
+class RepairPayload(msgspec.Struct):
+    """POST /repair-roster (see repair.main)."""
+    roster: Annotated[Dict[Annotated[str, ISODate], Dict[str, Dict[str, List[RosterEntry]]]], msgspec.Meta(min_length=1)]
+    disruption: Disruption
+    employees: List[Employee] = []
+    leaveData: Dict[str, Union[List[str], Dict[str, bool]]] = {}
+    shiftPattern: List[str] = []
+    sites: List[str] = []
+    shiftTypes: List[Union[str, ShiftType]] = []
+    horizonStart: Optional[Annotated[str, ISODate]] = None
+    reserveIndexId: Optional[str] = None
+
+
+class PayloadError(Exception):
+    """Raised when a request body fails to decode or validate."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or []
+
+
+class SnapshotNotFound(PayloadError):
+    """Raised when a payload references a workforce snapshot this instance doesn't hold (unknown or evicted)."""
+
+
+_decoder = msgspec.json.Decoder(RosterPayload)
+_repair_decoder = msgspec.json.Decoder(RepairPayload)
+_snapshot_decoder = msgspec.json.Decoder(WorkforceSnapshot)
+_snapshots = OrderedDict()  # snapshot_id -> (employees, Workforce)
+_snapshots_lock = threading.Lock()
+
+
+# --- Preprocessed workforce ---
+class Workforce:
+    """
+    Index-aligned, interned view of the employee list: position i in every
+    array is employees[i]. Competencies are interned to dense integer ids.
+    """
+
+    __slots__ = ("ids", "index", "grades", "competency_names", "competency_index",
+                 "competency_ids", "competency_sets", "_offsets")
+
+    def __init__(self, employees_data):
+        self._offsets = OrderedDict()
+        self.ids = [sys.intern(emp["id"]) for emp in employees_data]
+        self.index = {emp_id: i for i, emp_id in enumerate(self.ids)}
+        self.grades = [int(emp.get("proficiency_grade", 0)) for emp in employees_data]
+        self.competency_names = []
+        self.competency_index = {}
+        self.competency_ids = []
+        self.competency_sets = []
+        for emp in employees_data:
+            comps = [sys.intern(c) for c in emp.get("competencies", [])]
+            ids = []
+            for c in comps:
+                if c not in self.competency_index:
+                    self.competency_index[c] = len(self.competency_names)
+                    self.competency_names.append(c)
+                ids.append(self.competency_index[c])
+            self.competency_ids.append(ids)
+            self.competency_sets.append(frozenset(comps))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def balanced_offsets(self, employees_data, requests_data, pattern_length):
+        """
+        site_registry.balanced_offsets, memoised on this workforce. The greedy
+        only reads the pattern length and each console's total demand, so
+        requests over a snapshot's workforce with the same demand reuse it.
+        """
+        import site_registry
+
+        demand = {}
+        for req in requests_data:
+            for comp, count in req.get("required_competencies", {}).items():
+                demand[comp] = demand.get(comp, 0) + count
+        key = (pattern_length, tuple(sorted(demand.items())))
+        offsets = self._offsets.get(key)
+        if offsets is None:
+            offsets = site_registry.balanced_offsets(employees_data, requests_data, pattern_length)
+            self._offsets[key] = offsets
+            while len(self._offsets) > MAX_CACHED_OFFSETS:
+                self._offsets.popitem(last=False)
+        return offsets
+
+
+def workforce_for(data):
+    """The decoded payload's workforce if present and in step, else build one."""
+    employees_data = data.get("employees", [])
+    workforce = data.get(WORKFORCE_KEY)
+    if workforce is None or len(workforce) != len(employees_data):
+        workforce = Workforce(employees_data)
+    return workforce
+
+
+def without_internal_keys(data):
+    """Shallow copy of a payload that is safe to serialise or split."""
+    if WORKFORCE_KEY not in data:
+        return data
+    return {k: v for k, v in data.items() if k != WORKFORCE_KEY}
+
+
+# --- Decoding ---
+def _validate(p):
+    """Cross-field checks msgspec's per-field validation can't express."""
+    errors = []
+    seen = set()
+    for i, emp in enumerate(p.employees):
+        if emp.id in seen:
+            errors.append(f"$.employees[{i}].id: duplicate employee id '{emp.id}'")
+        seen.add(emp.id)
+
+    shift_names = {s if isinstance(s, str) else s.name for s in p.shiftTypes}
+    for i, req in enumerate(p.requests):
+        try:
+            date.fromisoformat(req.date)
+        except ValueError:
+            errors.append(f"$.requests[{i}].date: '{req.date}' is not a calendar date")
+        if p.sites and req.location not in p.sites:
+            errors.append(f"$.requests[{i}].location: '{req.location}' is not one of the listed sites")
+        if shift_names and req.shiftType not in shift_names:
+            errors.append(f"$.requests[{i}].shiftType: '{req.shiftType}' is not one of the listed shiftTypes")
+
+    if p.workforceSnapshot and p.employees:
+        errors.append("$.workforceSnapshot: send either employees or a workforce snapshot id, not both")
+    if p.sharding is not None:
+        names = [scenario.name for scenario in p.sharding.scenarios]
+        if len(set(names)) != len(names):
+            errors.append("$.sharding.scenarios: scenario names must be unique")
+        if p.sharding.shardBy == "scenario" and not names:
+            errors.append("$.sharding.scenarios: required when shardBy is 'scenario'")
+    if p.schedulingMode.startswith("simulation") and not p.shiftPattern:
+        errors.append("$.shiftPattern: required for simulation modes")
+    return errors
+
+
+def ojt_entry(value):
+    """
+    One ojtData leaf as {"console", "location"?}. The Next.js routes send
+    {console, location} objects; older callers send just the console name.
+    """
+    if not isinstance(value, dict):
+        return {"console": value}
+    return {k: v for k, v in value.items() if v is not None}
+
+
+def _normalise_employees(employees):
+    for emp in employees:
+        emp["id"] = sys.intern(emp["id"])
+        if emp["proficiency_grade"] is None:
+            emp["proficiency_grade"] = 0
+        emp["competencies"] = [sys.intern(c) for c in emp["competencies"]]
+        for key in ("team", "offset"):
+            if emp[key] is None:
+                del emp[key]
+    return employees
+
+
+def _to_scheduler_input(p):
+    """
+    Plain dicts in the shape the schedulers already read, with ids, dates and
+    console names interned. Unset optional fields are dropped rather than sent
+    as None, since schedulers test for presence (e.g. custom `offset`s).
+    """
+    data = {k: v for k, v in msgspec.to_builtins(p).items() if v is not None}
+    _normalise_employees(data["employees"])
+    if "solveOptions" in data:
+        # solve_control treats a present key as an override
+        data["solveOptions"] = {k: v for k, v in data["solveOptions"].items() if v is not None}
+    for req in data["requests"]:
+        req["date"] = sys.intern(req["date"])
+        req["required_competencies"] = {sys.intern(c): n for c, n in req["required_competencies"].items()}
+    for users in data["ojtData"].values():
+        for shifts in users.values():
+            for shift_name, value in shifts.items():
+                shifts[shift_name] = ojt_entry(value)
+    return data
+
+
+def decode_request(raw):
+    """
+    Decode and validate a /generate-roster body in one pass, returning the
+    plain-dict payload the schedulers expect (with defaults filled in) plus its
+    preprocessed workforce under WORKFORCE_KEY. Raises PayloadError on bad input.
+    """
+    start = time.time()
+    try:
+        p = _decoder.decode(raw)
+    except msgspec.ValidationError as e:
+        raise PayloadError("Invalid roster payload", [str(e)])
+    except msgspec.DecodeError as e:
+        raise PayloadError("Malformed JSON", [str(e)])
+
+    errors = _validate(p)
+    if errors:
+        raise PayloadError("Invalid roster payload", errors)
+
+    data = _to_scheduler_input(p)
+    if p.workforceSnapshot:
+        snapshot = get_snapshot(p.workforceSnapshot)
+        if snapshot is None:
+            raise SnapshotNotFound("Unknown workforce snapshot", [f"$.workforceSnapshot: '{p.workforceSnapshot}'"])
+        # Shared with every request on this snapshot: schedulers only read employees
+        data["employees"], data[WORKFORCE_KEY] = snapshot
+        del data["workforceSnapshot"]
+    else:
+        data[WORKFORCE_KEY] = Workforce(data["employees"])
+    sys.stderr.write(
+        f"Payload: decoded {len(raw)} bytes, employees={len(data['employees'])}, "
+        f"requests={len(p.requests)} in {(time.time() - start) * 1000:.1f}ms\n"
+    )
+    return data
+
+
+def _validate_repair(p, registry):
+    errors = []
+    seen = set()
+    for i, emp in enumerate(p.employees):
+        if emp.id in seen:
+            errors.append(f"$.employees[{i}].id: duplicate employee id '{emp.id}'")
+        seen.add(emp.id)
+
+    for date_str in list(p.roster) + p.disruption.dates + ([p.horizonStart] if p.horizonStart else []):
+        try:
+            date.fromisoformat(date_str)
+        except ValueError:
+            errors.append(f"'{date_str}' is not a calendar date")
+    for date_str, sites in p.roster.items():
+        for site, shifts in sites.items():
+            if p.sites and site not in p.sites:
+                errors.append(f"$.roster['{date_str}']: '{site}' is not one of the listed sites")
+            for shift_name in shifts:
+                if shift_name not in registry.shift_index:
+                    errors.append(f"$.roster['{date_str}']['{site}']: unknown shift type '{shift_name}' (list it in shiftTypes)")
+    for shift_name in p.disruption.shifts:
+        if shift_name not in registry.shift_index:
+            errors.append(f"$.disruption.shifts: unknown shift type '{shift_name}'")
+    return errors
+
+
+def decode_repair(raw):
+    """
+    Decode and validate a /repair-roster body, returning plain dicts as
+    repair.main reads them. Every shift in the roster must be a known shift
+    type (listed in shiftTypes, or a default one). Raises PayloadError.
+    """
+    import site_registry
+
+    try:
+        p = _repair_decoder.decode(raw)
+    except msgspec.ValidationError as e:
+        raise PayloadError("Invalid repair payload", [str(e)])
+    except msgspec.DecodeError as e:
+        raise PayloadError("Malformed JSON", [str(e)])
+
+    data = {k: v for k, v in msgspec.to_builtins(p).items() if v is not None}
+    errors = _validate_repair(p, site_registry.from_payload(data))
+    if errors:
+        raise PayloadError("Invalid repair payload", errors)
+    _normalise_employees(data["employees"])
+    data["schedulingMode"] = "repair"
+    return data
+
+
+# --- Workforce snapshots ---
+def store_snapshot(raw):
+    """
+    Decode an uploaded {"employees": [...]} body and keep its preprocessed
+    workforce in memory under a content hash. Uploading the same employees
+    again returns the same id. Returns (snapshot_id, employee count).
+    """
+    try:
+        p = _snapshot_decoder.decode(raw)
+    except msgspec.ValidationError as e:
+        raise PayloadError("Invalid workforce snapshot", [str(e)])
+    except msgspec.DecodeError as e:
+        raise PayloadError("Malformed JSON", [str(e)])
+
+    seen = set()
+    for i, emp in enumerate(p.employees):
+        if emp.id in seen:
+            raise PayloadError("Invalid workforce snapshot", [f"$.employees[{i}].id: duplicate employee id '{emp.id}'"])
+        seen.add(emp.id)
+
+    employees = _normalise_employees(msgspec.to_builtins(p.employees))
+    canonical = json.dumps(employees, sort_keys=True, separators=(",", ":"))
+    snapshot_id = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:20]
+    with _snapshots_lock:
+        if snapshot_id in _snapshots:
+            _snapshots.move_to_end(snapshot_id)
+        else:
+            _snapshots[snapshot_id] = (employees, Workforce(employees))
+            while len(_snapshots) > MAX_SNAPSHOTS:
+                _snapshots.popitem(last=False)
+    sys.stderr.write(f"Payload: Stored workforce snapshot {snapshot_id} ({len(employees)} employees)\n")
+    return snapshot_id, len(employees)
+
+
+def get_snapshot(snapshot_id):
+    """(employees, Workforce) for a stored snapshot, or None if unknown or evicted."""
+    with _snapshots_lock:
+        snapshot = _snapshots.get(snapshot_id)
+        if snapshot is not None:
+            _snapshots.move_to_end(snapshot_id)
+        return snapshot
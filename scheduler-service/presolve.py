@@ -0,0 +1,250 @@
+import sys
+import json
+import time
+
+# --- Tunable Parameters ---
+KEEP_BEYOND_DEMAND = 6  # Candidates kept per console slot on top of its required count
+MAX_RESTORE_ROUNDS = 2  # Re-solves with restored days before pruning is switched off entirely
+MIN_RETRY_SECONDS = 1.0  # Restored days still get this long once the first solve has used its budget
+STATE_KEY = "_candidatePruning"  # Carried between rounds in the payload, like payload.WORKFORCE_KEY
+
+
+class CandidatePruner:
+    """
+    Presolve for scheduler3/4/5: keeps only the best KEEP_BEYOND_DEMAND
+    candidates beyond demand for each (day, shift, site, console), so large,
+    well-staffed sites don't get an assignment variable for every eligible
+    employee on every slot.
+
+    Candidates are ranked by pattern fit (working their own shift rather
+    than the other shift of the group), then by how scarce their other
+    skills are (generalists with scarce skills stay free for the consoles
+    that need them), then by reserve deployments (staff already deployed
+    from the reserve more often are rostered first, leaving the others as
+    the reserve the replacement lookup draws on).
+
+    The model separates by day once offsets are fixed. The objective only
+    improves when a short slot gains someone or someone moves onto their own
+    shift, and any such change to an optimal solution is a chain of moves
+    (an alternating path) that the pruned model would have found unless it
+    goes through a dropped candidate. So a pruned day is provably as good as
+    the unpruned one when no chain starting at a short slot or at someone off
+    their own shift reaches a dropped candidate (see uncertified_days). Days
+    failing that check are re-solved on their own with all their candidates
+    back, and merged into the rest of the first solution (see retry_parts).
+    """
+
+    def __init__(self, data, competency_sets, scarcity_scores, reserve_deploy_counts, keep=None):
+        state = data.get(STATE_KEY) or {}
+        self.round = state.get("round", 0)
+        self.full_days = set(state.get("fullDays", []))
+        self.enabled = self.round < MAX_RESTORE_ROUNDS
+        self.keep = KEEP_BEYOND_DEMAND if keep is None else keep
+        self.scarcity_scores = scarcity_scores
+        self.skill_scarcity = [sum(scarcity_scores.get(c, 0) for c in comps) for comps in competency_sets]
+        self.reserve_deploy_counts = reserve_deploy_counts
+        self.pruned_days = set()
+        self.eligible = {}  # slot key -> [(e_idx, expected_shift)] before pruning
+        self.dropped = {}  # slot key -> e_idxs pruned from it
+        self.kept = 0
+        self.dropped_count = 0
+
+    def rank(self, key, candidate):
+        """Sort key for an (e_idx, expected_shift) candidate of slot `key`; best first."""
+        _, s_idx, _, comp_name = key
+        e_idx, expected_s = candidate
+        return (
+            expected_s != s_idx,
+            self.skill_scarcity[e_idx] - self.scarcity_scores.get(comp_name, 0),
+            -self.reserve_deploy_counts[e_idx],
+            e_idx,
+        )
+
+    def select(self, key, count, eligible):
+        """Candidates to create variables for. `eligible` is [(e_idx, expected_shift)] in employee order."""
+        d_idx = key[0]
+        limit = int(count) + self.keep
+        self.eligible[key] = eligible
+        if not self.enabled or d_idx in self.full_days or len(eligible) <= limit:
+            self.kept += len(eligible)
+            return eligible
+
+        kept = sorted(sorted(eligible, key=lambda candidate: self.rank(key, candidate))[:limit])
+        self.pruned_days.add(d_idx)
+        self.dropped[key] = {e_idx for e_idx, _ in eligible} - {e_idx for e_idx, _ in kept}
+        self.kept += len(kept)
+        self.dropped_count += len(eligible) - len(kept)
+        return kept
+
+    def log(self, label):
+        if self.dropped_count:
+            sys.stderr.write(
+                f"{label}: Candidate pruning kept {self.kept} of {self.kept + self.dropped_count} pairs "
+                f"on {len(self.pruned_days)} days (round {self.round})\n"
+            )
+
+    def uncertified_days(self, values, assignments, understaff_by_key, expected_shift):
+        """
+        Pruned days where restoring the dropped candidates could improve the
+        solution. `values` is solve_control.solution_values.
+
+        Per day, a search over the unpruned eligibility follows every chain of
+        moves from a short slot ("needs": who could move in, leaving their own
+        slot needing someone) and from someone off their own shift (their slot
+        needs someone; a slot they could move to "sheds" someone, who could
+        move on). A day fails only if a chain crosses a dropped candidate.
+        """
+        failing = set()
+        if not self.pruned_days:
+            return failing
+
+        holders = {}  # slot key -> e_idxs assigned to it
+        slot_of = {}  # (e_idx, d_idx) -> slot key
+        starts = {d_idx: [] for d_idx in self.pruned_days}  # d_idx -> [(direction, slot key)]
+        for k in assignments.chosen(values).tolist():
+            key = assignments.key(k)
+            e_idx, (d_idx, s_idx) = key[0], key[1:3]
+            if d_idx not in self.pruned_days:
+                continue
+            slot = key[1:]
+            holders.setdefault(slot, []).append(e_idx)
+            slot_of[(e_idx, d_idx)] = slot
+            if expected_shift(e_idx, d_idx) != s_idx:
+                starts[d_idx].append(("needs", slot))
+                starts[d_idx].append(("moves", e_idx))
+        for slot, understaff in understaff_by_key.items():
+            if slot[0] in self.pruned_days and values[understaff.Index()] > 0:
+                starts[slot[0]].append(("needs", slot))
+
+        slots_of = {}  # (e_idx, d_idx) -> slot keys the employee is eligible for
+        for slot, eligible in self.eligible.items():
+            if slot[0] in self.pruned_days:
+                for e_idx, _ in eligible:
+                    slots_of.setdefault((e_idx, slot[0]), []).append(slot)
+
+        no_drops = frozenset()
+        for d_idx, day_starts in starts.items():
+            seen = set()
+            stack = []
+            crossed = False
+
+            def move_in(e_idx, slot):
+                # e_idx takes a place in `slot`, which then sheds someone unless it is short
+                nonlocal crossed
+                if e_idx in self.dropped.get(slot, no_drops):
+                    crossed = True
+                elif ("sheds", slot) not in seen:
+                    seen.add(("sheds", slot))
+                    stack.append(("sheds", slot))
+
+            for direction, item in day_starts:
+                if direction == "moves":
+                    for slot in slots_of.get((item, d_idx), ()):
+                        if slot != slot_of.get((item, d_idx)):
+                            move_in(item, slot)
+                elif (direction, item) not in seen:
+                    seen.add((direction, item))
+                    stack.append((direction, item))
+            while stack and not crossed:
+                direction, slot = stack.pop()
+                if direction == "needs":
+                    dropped = self.dropped.get(slot, no_drops)
+                    for e_idx, _ in self.eligible.get(slot, ()):
+                        if slot_of.get((e_idx, d_idx)) == slot:
+                            continue
+                        if e_idx in dropped:
+                            crossed = True
+                            break
+                        previous = slot_of.get((e_idx, d_idx))
+                        if previous is not None and ("needs", previous) not in seen:
+                            seen.add(("needs", previous))
+                            stack.append(("needs", previous))
+                else:
+                    for e_idx in holders.get(slot, ()):
+                        for other in slots_of.get((e_idx, d_idx), ()):
+                            if other != slot:
+                                move_in(e_idx, other)
+            if crossed:
+                failing.add(d_idx)
+        return failing
+
+    def retry_parts(self, data, failing_days, all_dates, offsets, pattern_length, scarcity, time_limit,
+                    started, label):
+        """
+        [(name, sub-payload)] re-solving only `failing_days` with every
+        candidate restored, one part per run of consecutive days (patterns are
+        re-based as tiling.py does). Parts share what is left of the first
+        solve's `time_limit` after the time spent since `started`.
+        """
+        import tiling
+        import solve_control
+
+        by_date = {}
+        for req in data.get("requests", []):
+            by_date.setdefault(req["date"], []).append(req)
+        remaining = max(MIN_RETRY_SECONDS, time_limit - (time.time() - started))
+
+        parts = []
+        run = []
+        for d_idx in sorted(failing_days) + [None]:
+            if run and d_idx == run[-1] + 1:
+                run.append(d_idx)
+                continue
+            if run:
+                dates = [all_dates[i] for i in run]
+                sub = tiling.sub_payload(data, offsets, run[0], set(dates),
+                                         [req for d in dates for req in by_date[d]], scarcity, pattern_length)
+                sub[STATE_KEY] = {"round": self.round + 1, "fullDays": list(range(len(run)))}
+                sub[solve_control.TIME_CAP_KEY] = remaining
+                parts.append((f"{dates[0]}..{dates[-1]}", sub))
+            run = [d_idx]
+        sys.stderr.write(
+            f"{label}: Restoring pruned candidates on {len(failing_days)} days and re-solving them "
+            f"in {len(parts)} parts ({remaining:.1f}s left)\n"
+        )
+        return parts
+
+    def merge_retry(self, data, roster, index, status_name, kept_objective, outcomes, label):
+        """
+        The first solve's `roster` and reserve `index` (restored days left
+        out) with the re-solved days from decompose.run_parts `outcomes`
+        merged in. Notes the combined status and objective like
+        decompose.solve_parts does; returns the roster JSON.
+        """
+        import decompose
+        import reserve_pool
+        import solve_control
+
+        rosters = [roster]
+        indexes = [index]
+        statuses = [status_name]
+        objective = kept_objective
+        for name, result, part_index, (part_status, part_objective) in outcomes:
+            parsed = json.loads(result)
+            if isinstance(parsed, dict) and "error" in parsed:
+                parsed["error"] = f"[{name}] {parsed['error']}"
+                return json.dumps(parsed)
+            rosters.append(parsed)
+            if part_index is not None:
+                indexes.append(part_index)
+            statuses.append(part_status)
+            objective = None if objective is None or part_objective is None else objective + part_objective
+
+        reserve_pool.publish(reserve_pool.merge(indexes), label, data.get("schedulingMode"))
+        status_name = "OPTIMAL" if all(s == "OPTIMAL" for s in statuses) else "FEASIBLE"
+        solve_control.note_result(status_name, objective)
+        sys.stderr.write(f"{label}: Restored days merged (status={status_name}, objective={objective})\n")
+        return json.dumps(decompose.merge_rosters(rosters))
+
+
+def day_costs(model, values, day_of_var):
+    """
+    Objective contribution of each day in a solution: `day_of_var` maps
+    every objective variable's index to the day it belongs to.
+    """
+    costs = {}
+    objective = model.Proto().objective
+    for var, coeff in zip(objective.vars, objective.coeffs):
+        d_idx = day_of_var[var]
+        costs[d_idx] = costs.get(d_idx, 0) + coeff * int(values[var])
+    return costs
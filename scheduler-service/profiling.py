@@ -0,0 +1,220 @@
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import tempfile
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# --- Tunable Parameters ---
+# Opt in per request with the X-Debug-Profile header or "debugProfile": true in the payload.
+PROFILE_HEADER = "X-Debug-Profile"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "roster-profiles"))
+MAX_STORED_PROFILES = 20  # Oldest artifacts are deleted first
+TOP_FUNCTIONS = 40  # Rows kept in the text report
+TRACEMALLOC_FRAMES = 1
+
+_artifacts = OrderedDict()  # profile_id -> artifact directory
+_store_lock = threading.Lock()
+_current = threading.local()  # session active on this thread
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def requested(headers, data):
+    value = headers.get(PROFILE_HEADER, "")
+    return value.lower() in ("1", "true", "yes") or bool(data.get("debugProfile"))
+
+
+class ProfileSession:
+    """
+    Everything collected for one profiled request: a cProfile of the request
+    thread and of each part worker it fans out to, the tracemalloc peak,
+    build/search timings reported by solve_control, and the CP-SAT search log
+    of every solve.
+    """
+
+    def __init__(self, mode):
+        self.profile_id = uuid.uuid4().hex
+        self.mode = mode
+        self.started_at = time.time()
+        self.solves = []
+        self._log_lines = []
+        self._log_lock = threading.Lock()
+        self._profiler = cProfile.Profile()
+        self._profiling = False
+        self._thread_id = None
+        self._worker_profilers = []
+
+    def solver_log_callback(self, label):
+        """Callback for `solver.log_callback`; lines are prefixed so parallel parts stay readable."""
+        def _log(line):
+            with self._log_lock:
+                self._log_lines.append(f"[{label}] {line}")
+        return _log
+
+    def add_solve(self, stats):
+        with self._log_lock:
+            self.solves.append(stats)
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        try:
+            self._profiler.enable()
+            self._profiling = True
+        except ValueError as e:  # another profiler already owns this thread
+            sys.stderr.write(f"Profiling: cProfile unavailable for {self.profile_id}: {e}\n")
+        _start_tracemalloc()
+
+    @contextmanager
+    def worker(self):
+        """Profile the enclosed work on a part worker thread; merged into the report by write()."""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            sys.stderr.write(f"Profiling: cProfile unavailable on worker for {self.profile_id}: {e}\n")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._log_lock:
+                self._worker_profilers.append(profiler)
+
+    def stop(self):
+        if self._profiling:
+            self._profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        _stop_tracemalloc()
+        return peak
+
+    def write(self, peak_bytes, error=None):
+        """Write the artifact directory and return its summary."""
+        directory = os.path.join(PROFILE_DIR, self.profile_id)
+        os.makedirs(directory, exist_ok=True)
+
+        report = io.StringIO()
+        profilers = ([self._profiler] if self._profiling else []) + self._worker_profilers
+        if profilers:
+            stats = pstats.Stats(*profilers, stream=report)
+            stats.dump_stats(os.path.join(directory, "profile.pstats"))
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        with open(os.path.join(directory, "profile.txt"), "w") as f:
+            f.write(report.getvalue())
+        with open(os.path.join(directory, "solver.log"), "w") as f:
+            f.write("\n".join(self._log_lines))
+
+        summary = {
+            "profileId": self.profile_id,
+            "mode": self.mode,
+            "wallSeconds": round(time.time() - self.started_at, 3),
+            "tracemallocPeakMb": round(peak_bytes / (1024.0 * 1024.0), 1),
+            # tracemalloc can't attribute allocations to a request
+            "tracemallocScope": "process-wide, including concurrent requests",
+            "profiledThreads": len(profilers),
+            "solves": self.solves,
+            "error": error,
+            "files": sorted(os.listdir(directory) + ["summary.json"]),
+        }
+        with open(os.path.join(directory, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        _remember(self.profile_id, directory)
+        return summary
+
+
+def _start_tracemalloc():
+    # tracemalloc is process-wide; keep it on while any profiled request is running
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        else:
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def _remember(profile_id, directory):
+    with _store_lock:
+        _artifacts[profile_id] = directory
+        while len(_artifacts) > MAX_STORED_PROFILES:
+            _, old_directory = _artifacts.popitem(last=False)
+            for name in os.listdir(old_directory):
+                os.remove(os.path.join(old_directory, name))
+            os.rmdir(old_directory)
+
+
+def current():
+    """The session profiling this thread's request, or None."""
+    return getattr(_current, "session", None)
+
+
+@contextmanager
+def attached(session):
+    """
+    Make `session` current on a worker thread (used by decompose for per-site
+    parts), profiling that thread too when it isn't the request thread.
+    """
+    previous = current()
+    _current.session = session
+    try:
+        if session is not None and session._thread_id not in (None, threading.get_ident()):
+            with session.worker():
+                yield session
+        else:
+            yield session
+    finally:
+        _current.session = previous
+
+
+@contextmanager
+def profile_request(enabled, mode):
+    """
+    Profile the enclosed scheduler call when `enabled`; yields the session
+    (or None). The artifact is written even if the scheduler raises.
+    """
+    if not enabled:
+        yield None
+        return
+
+    session = ProfileSession(mode)
+    error = None
+    session.start()
+    try:
+        with attached(session):
+            yield session
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        peak = session.stop()
+        summary = session.write(peak, error)
+        sys.stderr.write(
+            f"Profiling: Wrote {summary['profileId']} (wall={summary['wallSeconds']}s, "
+            f"process peak={summary['tracemallocPeakMb']}MB, solves={len(summary['solves'])})\n"
+        )
+
+
+def artifact_path(profile_id, name="summary.json"):
+    """Path of a stored artifact file, or None if unknown/evicted."""
+    with _store_lock:
+        directory = _artifacts.get(profile_id)
+    if directory is None or os.path.basename(name) != name:
+        return None
+    path = os.path.join(directory, name)
+    return path if os.path.exists(path) else None
@@ -0,0 +1,306 @@
+import json
+import sys
+import time
+from ortools.sat.python import cp_model
+
+import reserve_pool
+import site_registry
+from site_registry import OFF
+
+# --- Tunable Parameters ---
+LATENCY_TARGET_SECONDS = 1.0             # Whole repair, including the neighbourhood solve
+NEIGHBOURHOOD_TIME_LIMIT_SECONDS = 0.5
+NEIGHBOURHOOD_SAFETY_MARGIN_SECONDS = 0.1
+NUM_SEARCH_WORKERS = 1                   # Tiny models; extra workers only add start-up cost
+UNFILLED_PENALTY_WEIGHT = 1000000
+CHANGE_PENALTY_WEIGHT = 1000             # Per existing assignment moved or dropped
+PATTERN_PENALTY_WEIGHT = 10              # Working a different shift than the pattern says
+
+
+def _emp_sort_key(emp):
+    return (int(emp.get("proficiency_grade", 0)), int(emp.get("reserve_deploy_count", 0)), emp["id"])
+
+
+def _entry(user_id, console):
+    return {"user_id": user_id, "assigned_console": console, "is_ojt": False}
+
+
+def main(data):
+    """
+    Minimum-change repair of an existing roster after a disruption.
+
+    Payload (decoded and validated by payload.decode_repair):
+      roster       - roster in the scheduler output format { date: { location: { shift: [entry] } } }
+      employees    - employees with competencies (and offsets, if the roster used custom ones)
+      disruption   - { "user_id", "dates": [...], "shifts": [...] (optional, default all) }
+      leaveData    - optional, as for the schedulers
+      shiftPattern - optional, defaults to the main roster pattern
+      horizonStart - optional, first day of the pattern horizon (defaults to the first roster date)
+      reserveIndexId - optional reserve pool index to take available staff from when no offsets are given
+
+    Vacancies are first filled greedily from staff working by pattern but unassigned,
+    then a small CP-SAT model over the affected day (its assignees plus candidates)
+    may reshuffle that day's assignments to cover what is left.
+    """
+    start_time = time.time()
+    employees_data = data.get("employees", [])
+    roster = data.get("roster", {})
+    leave_data = data.get("leaveData", {})
+    disruption = data.get("disruption", {})
+
+    if not roster:
+        return json.dumps({"error": "Roster is required for repair."})
+    disrupted_user = disruption.get("user_id")
+    disrupted_dates = set(disruption.get("dates", []))
+    if not disrupted_user or not disrupted_dates:
+        return json.dumps({"error": "Disruption must include user_id and dates."})
+    registry = site_registry.from_payload(data)
+    disrupted_shifts = set(disruption.get("shifts") or registry.shift_names)
+
+    custom_pattern = data.get("shiftPattern") or site_registry.DEFAULT_PATTERN_NAMES
+    pattern_sequence = registry.pattern_from_names(custom_pattern)
+    horizon_start = data.get("horizonStart") or min(roster.keys())
+
+    sys.stderr.write(
+        f"Repair: user={disrupted_user}, dates={sorted(disrupted_dates)}, shifts={sorted(disrupted_shifts)}\n"
+    )
+
+    employees_by_id = {emp["id"]: emp for emp in employees_data}
+    has_offsets = any("offset" in emp for emp in employees_data)
+
+    reserve_entry = None
+    if not has_offsets:
+        reserve_entry = reserve_pool.get_index(
+            index_id=data.get("reserveIndexId"), date=min(disrupted_dates)
+        )
+        if reserve_entry is None:
+            return json.dumps({
+                "error": "Cannot tell who is working by pattern: send employee offsets or solve the horizon first."
+            })
+
+    def is_unavailable(user_id, date_str, shift_name=None):
+        if user_id == disrupted_user and date_str in disrupted_dates:
+            if shift_name is None or shift_name in disrupted_shifts:
+                return True
+        return user_id in leave_data and date_str in leave_data[user_id]
+
+    def pattern_shift(user_id, date_str):
+        """Shift this person works by pattern on date_str, OFF, or None when not on the reserve list."""
+        if has_offsets:
+            emp = employees_by_id[user_id]
+            d_idx = site_registry.day_index(date_str, horizon_start)
+            return site_registry.expected_shift(pattern_sequence, int(emp.get("offset", 0)), d_idx)
+        for shift_name, slot in reserve_entry["index"]["slots"].get(date_str, {}).items():
+            if user_id in slot["employees"]:
+                return registry.shift_index[shift_name]
+        return None
+
+    # --- Remove the disrupted assignments ---
+    repaired = json.loads(json.dumps(roster))
+    vacancies = []
+    changes = []
+    for date_str in sorted(disrupted_dates):
+        for loc_name, shifts in repaired.get(date_str, {}).items():
+            for shift_name, entries in shifts.items():
+                if shift_name not in disrupted_shifts:
+                    continue
+                kept = []
+                for entry in entries:
+                    if entry["user_id"] != disrupted_user:
+                        kept.append(entry)
+                        continue
+                    change = {
+                        "date": date_str, "location": loc_name, "shift": shift_name,
+                        "console": entry["assigned_console"], "removed": disrupted_user, "added": None,
+                    }
+                    if entry.get("is_ojt"):
+                        # A trainee dropping out leaves no console uncovered
+                        change["method"] = "ojt-cancelled"
+                        changes.append(change)
+                    else:
+                        vacancies.append(change)
+                shifts[shift_name] = kept
+
+    def rostered_users(date_str):
+        users = set()
+        for shifts in repaired.get(date_str, {}).values():
+            for entries in shifts.values():
+                for entry in entries:
+                    users.add(entry["user_id"])
+        return users
+
+    def pool_for_date(date_str):
+        """Available staff on date_str who hold no assignment yet, with their pattern shift."""
+        busy = rostered_users(date_str)
+        pool = {}
+        for user_id in employees_by_id:
+            if user_id in busy or is_unavailable(user_id, date_str):
+                continue
+            expected_s = pattern_shift(user_id, date_str)
+            if expected_s is None or expected_s == OFF:
+                continue
+            pool[user_id] = expected_s
+        return pool
+
+    # --- Stage 1: greedy swap from the reserve pool ---
+    pools = {date_str: pool_for_date(date_str) for date_str in disrupted_dates}
+    remaining = []
+    greedy_filled = 0
+    for vacancy in vacancies:
+        s_idx = registry.shift_index[vacancy["shift"]]
+        pool = pools[vacancy["date"]]
+        candidates = [
+            employees_by_id[user_id]
+            for user_id, expected_s in pool.items()
+            if registry.can_work_shift(expected_s, s_idx)
+            and vacancy["console"] in employees_by_id[user_id].get("competencies", [])
+        ]
+        if not candidates:
+            remaining.append(vacancy)
+            continue
+        # Prefer staff whose pattern already puts them on this shift
+        best = min(candidates, key=lambda emp: (pool[emp["id"]] != s_idx,) + _emp_sort_key(emp))
+        repaired[vacancy["date"]][vacancy["location"]][vacancy["shift"]].append(_entry(best["id"], vacancy["console"]))
+        del pool[best["id"]]
+        vacancy.update({"added": best["id"], "method": "greedy"})
+        changes.append(vacancy)
+        greedy_filled += 1
+
+    # --- Stage 2: CP-SAT neighbourhood on each affected day ---
+    neighbourhood_filled = 0
+    unfilled = []
+    for date_str in sorted(set(v["date"] for v in remaining)):
+        day_vacancies = [v for v in remaining if v["date"] == date_str]
+        budget = LATENCY_TARGET_SECONDS - (time.time() - start_time) - NEIGHBOURHOOD_SAFETY_MARGIN_SECONDS
+        if budget <= 0:
+            unfilled.extend(day_vacancies)
+            continue
+        filled, day_changes = _solve_day_neighbourhood(
+            repaired, date_str, day_vacancies, pools[date_str], employees_by_id,
+            pattern_shift, is_unavailable, registry, min(budget, NEIGHBOURHOOD_TIME_LIMIT_SECONDS),
+        )
+        neighbourhood_filled += filled
+        changes.extend(day_changes)
+        unfilled.extend(v for v in day_vacancies if v.get("added") is None)
+
+    elapsed = time.time() - start_time
+    sys.stderr.write(
+        f"Repair: vacancies={len(vacancies)}, greedy={greedy_filled}, neighbourhood={neighbourhood_filled}, "
+        f"unfilled={len(unfilled)}, elapsed={elapsed * 1000:.0f}ms\n"
+    )
+
+    return json.dumps({
+        "roster": repaired,
+        "changes": changes,
+        "unfilled": [{k: v[k] for k in ("date", "location", "shift", "console")} for v in unfilled],
+        "stats": {
+            "vacancies": len(vacancies),
+            "greedy_filled": greedy_filled,
+            "neighbourhood_filled": neighbourhood_filled,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "within_latency_target": elapsed <= LATENCY_TARGET_SECONDS,
+        },
+    })
+
+
+def _solve_day_neighbourhood(repaired, date_str, day_vacancies, pool, employees_by_id,
+                             pattern_shift, is_unavailable, registry, time_limit):
+    """
+    Re-assign one day's regular (non-OJT) slots among their current holders and the
+    remaining reserve pool, keeping as many existing assignments as possible.
+    Returns (vacancies filled, change records) and updates `repaired` in place.
+    """
+    # Slots: every regular assignment on the day plus the open vacancies
+    slots = []  # (loc_name, shift_name, console, original_user or None, vacancy or None)
+    for loc_name, shifts in repaired.get(date_str, {}).items():
+        for shift_name, entries in shifts.items():
+            for entry in entries:
+                if not entry.get("is_ojt"):
+                    slots.append((loc_name, shift_name, entry["assigned_console"], entry["user_id"], None))
+    for vacancy in day_vacancies:
+        slots.append((vacancy["location"], vacancy["shift"], vacancy["console"], None, vacancy))
+
+    people = set(pool.keys()) | {s[3] for s in slots if s[3] is not None}
+
+    model = cp_model.CpModel()
+    x = {}  # (user_id, slot_idx) -> BoolVar
+    vars_by_slot = {}
+    vars_by_user = {}
+    penalty_terms = []
+    for slot_idx, (loc_name, shift_name, console, original_user, vacancy) in enumerate(slots):
+        s_idx = registry.shift_index[shift_name]
+        for user_id in people:
+            emp = employees_by_id.get(user_id)
+            if emp is None or console not in emp.get("competencies", []):
+                continue
+            off_pattern = False
+            if user_id != original_user:
+                if is_unavailable(user_id, date_str, shift_name):
+                    continue
+                expected_s = pool.get(user_id)
+                if expected_s is None:
+                    expected_s = pattern_shift(user_id, date_str)
+                if expected_s is None or not registry.can_work_shift(expected_s, s_idx):
+                    continue
+                off_pattern = expected_s != s_idx
+            v = model.NewBoolVar("")
+            x[(user_id, slot_idx)] = v
+            vars_by_slot.setdefault(slot_idx, []).append(v)
+            vars_by_user.setdefault(user_id, []).append(v)
+            if off_pattern:
+                penalty_terms.append((v, PATTERN_PENALTY_WEIGHT))
+
+    for slot_idx, slot in enumerate(slots):
+        slot_vars = vars_by_slot.get(slot_idx, [])
+        model.Add(sum(slot_vars) <= 1)
+        for v in slot_vars:
+            penalty_terms.append((v, -UNFILLED_PENALTY_WEIGHT))
+        keep = x.get((slot[3], slot_idx)) if slot[3] is not None else None
+        if keep is not None:
+            # Moving or dropping an existing assignment costs CHANGE_PENALTY_WEIGHT
+            model.AddHint(keep, 1)
+            penalty_terms.append((keep, -CHANGE_PENALTY_WEIGHT))
+
+    for user_vars in vars_by_user.values():
+        model.Add(sum(user_vars) <= 1)
+
+    model.Minimize(sum(weight * lit for lit, weight in penalty_terms))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_search_workers = NUM_SEARCH_WORKERS
+    status = solver.Solve(model)
+    sys.stderr.write(
+        f"Repair: {date_str} neighbourhood slots={len(slots)}, people={len(people)}, "
+        f"vars={len(x)}, status={solver.StatusName(status)}, {solver.WallTime() * 1000:.0f}ms\n"
+    )
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return 0, []
+
+    # --- Rebuild the day's regular assignments from the solution ---
+    new_holder = {}
+    for (user_id, slot_idx), v in x.items():
+        if solver.Value(v):
+            new_holder[slot_idx] = user_id
+
+    for loc_name, shifts in repaired.get(date_str, {}).items():
+        for shift_name in shifts:
+            shifts[shift_name] = [e for e in shifts[shift_name] if e.get("is_ojt")]
+
+    filled_count = 0
+    changes = []
+    for slot_idx, (loc_name, shift_name, console, original_user, vacancy) in enumerate(slots):
+        holder = new_holder.get(slot_idx)
+        if holder is not None:
+            repaired[date_str][loc_name][shift_name].append(_entry(holder, console))
+        if vacancy is not None:
+            if holder is not None:
+                vacancy.update({"added": holder, "method": "neighbourhood"})
+                changes.append(vacancy)
+                filled_count += 1
+        elif holder != original_user:
+            changes.append({
+                "date": date_str, "location": loc_name, "shift": shift_name, "console": console,
+                "removed": original_user, "added": holder, "method": "neighbourhood",
+            })
+    return filled_count, changes
@@ -0,0 +1,156 @@
+import sys
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+# --- Tunable Parameters ---
+MAX_STORED_INDEXES = 20  # Oldest reserve-pool indexes are evicted first
+# Modes whose roster is the one in use (the Next.js generate route). Simulations,
+# drafts and coordinator scenarios are what-ifs: only found by their index id.
+ROSTER_MODES = ("competency",)
+
+_indexes = OrderedDict()  # index_id -> index
+_store_lock = threading.Lock()
+_published = threading.local()  # index id produced by the solve running on this thread
+
+
+def _rank_key(entry):
+    # Same ordering as the Next.js find-replacements route:
+    # lowest sufficient grade first, then whoever has been deployed least
+    return (entry["proficiency_grade"], entry["reserve_deploy_count"], entry["user_id"])
+
+
+def _ranked(employees, slots):
+    for shifts in slots.values():
+        for shift_slot in shifts.values():
+            shift_slot["employees"].sort(key=lambda u: _rank_key(employees[u]))
+            for user_ids in shift_slot["by_console"].values():
+                user_ids.sort(key=lambda u: _rank_key(employees[u]))
+    return {"employees": employees, "slots": slots}
+
+
+def build_index(employees_data, all_dates, reserve_slots, shift_names):
+    """
+    Build the reserve-pool index from (d_idx, e_idx, s_idx) slots where an
+    employee is working by pattern but was not given a console.
+
+    Returns:
+    {
+        "employees": { user_id: {"user_id", "proficiency_grade", "reserve_deploy_count", "competencies"} },
+        "slots": { date: { shift_name: {"employees": [user_id, ...], "by_console": { console: [user_id, ...] }}}}
+    }
+    Lists are pre-ranked so lookups never sort.
+    """
+    employees = {}
+    slots = {}
+    for d_idx, e_idx, s_idx in reserve_slots:
+        emp = employees_data[e_idx]
+        user_id = emp["id"]
+        if user_id not in employees:
+            employees[user_id] = {
+                "user_id": user_id,
+                "proficiency_grade": int(emp.get("proficiency_grade", 0)),
+                "reserve_deploy_count": int(emp.get("reserve_deploy_count", 0)),
+                "competencies": list(emp.get("competencies", [])),
+            }
+        shift_slot = slots.setdefault(all_dates[d_idx], {}).setdefault(
+            shift_names[s_idx], {"employees": [], "by_console": {}}
+        )
+        shift_slot["employees"].append(user_id)
+        for console in employees[user_id]["competencies"]:
+            shift_slot["by_console"].setdefault(console, []).append(user_id)
+
+    return _ranked(employees, slots)
+
+
+def merge(indexes):
+    """Combine index dicts (from decomposed parts, or fetched from peers by coordinator.py) into one."""
+    employees = {}
+    slots = {}
+    for index in indexes:
+        employees.update(index["employees"])
+        for date_str, shifts in index["slots"].items():
+            for shift_name, shift_slot in shifts.items():
+                merged = slots.setdefault(date_str, {}).setdefault(shift_name, {"employees": [], "by_console": {}})
+                merged["employees"].extend(shift_slot["employees"])
+                for console, user_ids in shift_slot["by_console"].items():
+                    merged["by_console"].setdefault(console, []).extend(user_ids)
+
+    return _ranked(employees, slots)
+
+
+def publish(index, source, mode=None):
+    """
+    Store an index and remember it as this thread's latest solve output.
+    `mode` is the schedulingMode of the solve that built it (see ROSTER_MODES).
+    """
+    index_id = uuid.uuid4().hex
+    dates = sorted(index["slots"].keys())
+    entry = {
+        "index_id": index_id,
+        "source": source,
+        "mode": mode,
+        "created_at": time.time(),
+        "date_range": [dates[0], dates[-1]] if dates else [],
+        "index": index,
+    }
+    with _store_lock:
+        _indexes[index_id] = entry
+        while len(_indexes) > MAX_STORED_INDEXES:
+            _indexes.popitem(last=False)
+    _published.index_id = index_id
+    total = sum(len(s["employees"]) for shifts in index["slots"].values() for s in shifts.values())
+    sys.stderr.write(f"{source}: Published reserve pool index {index_id} ({total} slots)\n")
+    return index_id
+
+
+def pop_index(index_id):
+    """Remove a stored index and return it (None if evicted). Parts' indexes go once merged."""
+    with _store_lock:
+        entry = _indexes.pop(index_id, None)
+    return entry["index"] if entry is not None else None
+
+
+def take_published():
+    """Return (and clear) the index id published by the last solve on this thread."""
+    index_id = getattr(_published, "index_id", None)
+    _published.index_id = None
+    return index_id
+
+
+def get_index(index_id=None, date=None):
+    """
+    Look up an index by id, or else the newest one from a ROSTER_MODES solve
+    whose horizon covers `date`.
+    """
+    with _store_lock:
+        if index_id is not None:
+            return _indexes.get(index_id)
+        for entry in reversed(_indexes.values()):
+            if entry["mode"] in ROSTER_MODES and (date is None or date in entry["index"]["slots"]):
+                return entry
+    return None
+
+
+def find_replacements(date, shift_name, console=None, min_grade=None, index_id=None):
+    """
+    Who can cover `console` on `date`/`shift_name`: reserve staff working that
+    shift by pattern, already ranked, from index `index_id` or else the latest
+    roster solve covering the date. Returns (candidates, index_id) or
+    (None, None) when there is no such index.
+    """
+    entry = get_index(index_id=index_id, date=date)
+    if entry is None:
+        return None, None
+
+    index = entry["index"]
+    shift_slot = index["slots"].get(date, {}).get(shift_name)
+    if shift_slot is None:
+        return [], entry["index_id"]
+
+    user_ids = shift_slot["by_console"].get(console, []) if console else shift_slot["employees"]
+    candidates = [index["employees"][u] for u in user_ids]
+    if min_grade is not None:
+        candidates = [c for c in candidates if c["proficiency_grade"] >= min_grade]
+    return candidates, entry["index_id"]
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import random
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import site_registry
+
+# --- Tunable Parameters ---
+DEFAULT_SAMPLES = 2000  # Well under MIN_SAMPLES_PER_PROCESS: a default run takes ~0.1s in-process
+MAX_SAMPLES = 100000
+DEFAULT_APPROVAL_PROBABILITY = 0.5  # For pending leaves that don't carry approvalProbability
+MAX_PROCESSES = 4
+# Spawning workers costs ~0.5s; memoised matching runs ~30k samples/s per process,
+# so only runs asking for 40000+ riskSamples split across a process pool
+MIN_SAMPLES_PER_PROCESS = 20000
+
+
+def leave_dates(leave):
+    start = datetime.strptime(leave["start_date"].split("T")[0], "%Y-%m-%d")
+    end = datetime.strptime(leave["end_date"].split("T")[0], "%Y-%m-%d")
+    while start <= end:
+        yield start.strftime("%Y-%m-%d")
+        start += timedelta(days=1)
+
+
+class DayEngine:
+    """
+    Coverage for one day as a bipartite matching: console slots on the left,
+    employees working that day by pattern on the right (one slot each, same
+    shift group, certified, at an allowed site, not on leave or OJT).
+
+    Slots are tried most-constrained first, so when a day is short the
+    shortfall lands on the consoles with the fewest certified candidates.
+    Results are memoised per set of absent employees, since most samples
+    repeat the same few absence combinations on any one day.
+    """
+
+    def __init__(self, slots, candidates, working=None):
+        # slots: [(slot_key, [e_idx, ...])]; slot_key = (shift, location, console)
+        order = sorted(range(len(slots)), key=lambda i: len(slots[i][1]))
+        self.slot_keys = [slots[i][0] for i in order]
+        self.slot_candidates = [slots[i][1] for i in order]
+        self.candidates = candidates
+        self.working = working or {}  # e_idx -> shift index worked by pattern (leave_impact.py reads it)
+        self._memo = {}
+
+    def shortfall(self, absent):
+        """{slot_key: unfilled count} when the employees in `absent` are off."""
+        key = frozenset(absent & self.candidates)
+        result = self._memo.get(key)
+        if result is None:
+            result = self._match(key)
+            self._memo[key] = result
+        return result
+
+    def augment(self, slot, owner, absent, seen):
+        """Kuhn's augmenting search: fill `slot` in `owner` (e_idx -> slot index), moving others if needed."""
+        for e in self.slot_candidates[slot]:
+            if e in absent or e in seen:
+                continue
+            seen.add(e)
+            if e not in owner or self.augment(owner[e], owner, absent, seen):
+                owner[e] = slot
+                return True
+        return False
+
+    def _match(self, absent):
+        owner = {}
+        unfilled = {}
+        for slot in range(len(self.slot_keys)):
+            if not self.augment(slot, owner, absent, set()):
+                slot_key = self.slot_keys[slot]
+                unfilled[slot_key] = unfilled.get(slot_key, 0) + 1
+        return unfilled
+
+
+def build_engines(data, dates=None):
+    """One DayEngine per horizon date, or per date in `dates` (approved leave and OJT already removed)."""
+    employees_data = data.get("employees", [])
+    requests_data = data.get("requests", [])
+    leave_data = data.get("leaveData", {})
+    ojt_data = data.get("ojtData", {})
+    registry = site_registry.from_payload(data)
+    pattern_sequence = registry.pattern_from_names(data.get("shiftPattern") or site_registry.DEFAULT_PATTERN_NAMES)
+    offsets = site_registry.balanced_offsets(employees_data, requests_data, len(pattern_sequence))
+
+    all_dates = sorted({req["date"] for req in requests_data})
+    employee_sites = [registry.employee_sites(emp) for emp in employees_data]
+    competencies = [set(emp.get("competencies", [])) for emp in employees_data]
+
+    requests_by_date = {}
+    for req in requests_data:
+        requests_by_date.setdefault(req["date"], []).append(req)
+
+    engines = {}
+    for d_idx, date_str in enumerate(all_dates):
+        if dates is not None and date_str not in dates:
+            continue
+        working = []
+        for e_idx, emp in enumerate(employees_data):
+            if date_str in leave_data.get(emp["id"], ()) or emp["id"] in ojt_data.get(date_str, {}):
+                continue
+            expected_s = site_registry.expected_shift(pattern_sequence, offsets[e_idx], d_idx)
+            if expected_s != site_registry.OFF:
+                working.append((e_idx, expected_s))
+
+        slots = []
+        for req in requests_by_date[date_str]:
+            s_idx = registry.shift_of(req["shiftType"])
+            l_idx = registry.site_index.get(req["location"])
+            if s_idx is None or s_idx == site_registry.OFF or l_idx is None:
+                continue
+            for console, count in req.get("required_competencies", {}).items():
+                eligible = [
+                    e_idx for e_idx, expected_s in working
+                    if console in competencies[e_idx]
+                    and registry.can_work_shift(expected_s, s_idx)
+                    and (employee_sites[e_idx] is None or l_idx in employee_sites[e_idx])
+                ]
+                slot_key = (req["shiftType"], req["location"], console)
+                slots.extend([(slot_key, eligible)] * int(count))
+        candidates = {e for _, eligible in slots for e in eligible}
+        engines[date_str] = DayEngine(slots, candidates, dict(working))
+
+    return engines, all_dates
+
+
+def _pending_by_day(data, default_probability):
+    """[(e_idx, probability, [dates])] for pending leaves of known employees inside the horizon."""
+    index = {emp["id"]: i for i, emp in enumerate(data.get("employees", []))}
+    horizon = {req["date"] for req in data.get("requests", [])}
+    pending = []
+    for leave in data.get("pendingLeaves", []):
+        if leave.get("user_id") not in index:
+            continue
+        probability = leave.get("approvalProbability")
+        probability = default_probability if probability is None else float(probability)
+        dates = [d for d in leave_dates(leave) if d in horizon]
+        if dates and probability > 0:
+            pending.append((index[leave["user_id"]], probability, dates))
+    return pending
+
+
+def run_samples(engines, pending, seed, num_samples):
+    """Evaluate `num_samples` leave realisations. Returns {(date, slot_key): [short_samples, total_short]}."""
+    rng = random.Random(seed)
+    # Days no pending leave touches are the same in every sample; main() counts them once
+    touched = sorted({d for _, _, dates in pending for d in dates})
+    totals = {}
+    for _ in range(num_samples):
+        absent_by_day = {d: set() for d in touched}
+        for e_idx, probability, dates in pending:
+            if rng.random() < probability:
+                for d in dates:
+                    absent_by_day[d].add(e_idx)
+        for date_str in touched:
+            for slot_key, unfilled in engines[date_str].shortfall(absent_by_day[date_str]).items():
+                entry = totals.setdefault((date_str, slot_key), [0, 0])
+                entry[0] += 1
+                entry[1] += unfilled
+    return totals
+
+
+# Pool worker state, built once per process by _init_worker
+_worker = {}
+
+
+def _init_worker(data, default_probability):
+    _worker["engines"], _ = build_engines(data)
+    _worker["pending"] = _pending_by_day(data, default_probability)
+
+
+def _run_worker_samples(seed, num_samples):
+    return run_samples(_worker["engines"], _worker["pending"], seed, num_samples)
+
+
+def main(data):
+    """
+    Staffing risk over uncertain pending leave. Each sample approves every
+    pending leave independently with its `approvalProbability` (payload
+    default `defaultApprovalProbability`, else 0.5) and re-matches the days
+    it touches. Returns, per date/shift/location/console, the probability
+    of a shortfall and its expected size. Runs with the default sample
+    count stay in-process; see MIN_SAMPLES_PER_PROCESS.
+    """
+    start_time = time.time()
+    num_samples = max(1, min(int(data.get("riskSamples") or DEFAULT_SAMPLES), MAX_SAMPLES))
+    seed = int(data.get("riskSeed") or 0)
+    default_probability = data.get("defaultApprovalProbability")
+    default_probability = DEFAULT_APPROVAL_PROBABILITY if default_probability is None else float(default_probability)
+
+    if not data.get("requests"):
+        return json.dumps({"error": "No shift requests to evaluate."})
+
+    engines, _ = build_engines(data)
+    pending = _pending_by_day(data, default_probability)
+
+    # Baseline: approved leave only, evaluated on every day
+    baseline = {}
+    for date_str, engine in engines.items():
+        for slot_key, unfilled in engine.shortfall(set()).items():
+            baseline[(date_str, slot_key)] = unfilled
+
+    processes = min(MAX_PROCESSES, os.cpu_count() or 1, max(1, num_samples // MIN_SAMPLES_PER_PROCESS))
+    chunks = [num_samples // processes + (1 if i < num_samples % processes else 0) for i in range(processes)]
+    if processes > 1:
+        # spawn, not fork: the request thread lives in a multi-threaded server
+        pool_data = {k: v for k, v in data.items() if not k.startswith("_")}
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(pool_data, default_probability)) as pool:
+            outcomes = list(pool.map(_run_worker_samples, [seed + i for i in range(processes)], chunks))
+    else:
+        outcomes = [run_samples(engines, pending, seed, num_samples)]
+
+    totals = {}
+    for chunk_totals in outcomes:
+        for key, (short_samples, total_short) in chunk_totals.items():
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += short_samples
+            entry[1] += total_short
+
+    # Untouched days keep their baseline shortfall in every sample
+    touched = {d for _, _, dates in pending for d in dates}
+    for (date_str, slot_key), unfilled in baseline.items():
+        if date_str not in touched:
+            totals[(date_str, slot_key)] = [num_samples, unfilled * num_samples]
+
+    risk = []
+    for (date_str, (shift_name, location, console)), (short_samples, total_short) in sorted(totals.items()):
+        risk.append({
+            "date": date_str,
+            "shift": shift_name,
+            "location": location,
+            "console": console,
+            "shortfallProbability": round(short_samples / num_samples, 4),
+            "expectedShortfall": round(total_short / num_samples, 4),
+            "baselineShortfall": baseline.get((date_str, (shift_name, location, console)), 0),
+        })
+
+    elapsed = time.time() - start_time
+    sys.stderr.write(
+        f"Risk: {num_samples} samples over {len(pending)} pending leaves on {len(touched)} days "
+        f"in {elapsed:.2f}s ({num_samples / max(elapsed, 1e-9):.0f} samples/s, processes={processes})\n"
+    )
+    return json.dumps({
+        "risk": risk,
+        "stats": {
+            "samples": num_samples,
+            "pendingLeaves": len(pending),
+            "daysAffected": len(touched),
+            "processes": processes,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "samplesPerSecond": round(num_samples / max(elapsed, 1e-9)),
+        },
+    })
@@ -2,25 +2,22 @@ import json
 import sys
 from ortools.sat.python import cp_model
 
-# --- Constants ---
-MORNING, AFTERNOON, NIGHT, OFF = 0, 1, 2, -1
-SHIFT_TYPES = [MORNING, AFTERNOON, NIGHT]
-SHIFT_NAMES = {MORNING: "Morning", AFTERNOON: "Afternoon", NIGHT: "Night"}
-NAME_TO_SHIFT = {"Morning": MORNING, "Afternoon": AFTERNOON, "Night": NIGHT}
+import solve_control
+import site_registry
+import decompose
 
-EAST, WEST = 0, 1
-LOCATIONS = [EAST, WEST]
-LOCATION_NAMES = {EAST: "East", WEST: "West"}
-NAME_TO_LOCATION = {"East": EAST, "West": WEST}
+# --- Constants ---
+# Sites and shift types come from the request (see site_registry.py)
+OFF = site_registry.OFF
 
 # 9-day repeating pattern
-PATTERN_SEQUENCE = [MORNING, MORNING, AFTERNOON, AFTERNOON, OFF, NIGHT, NIGHT, OFF, OFF]
-PATTERN_LENGTH = len(PATTERN_SEQUENCE)
+PATTERN_NAMES = ["Morning", "Morning", "Afternoon", "Afternoon", "OFF", "Night", "Night", "OFF", "OFF"]
+PATTERN_LENGTH = len(PATTERN_NAMES)
 
 # --- Tunable Parameters ---
 PATTERN_PENALTY_WEIGHT = 100
 UNDERSTAFFING_PENALTY_WEIGHT = 1000
-TIME_LIMIT_SECONDS = 30
+TIME_LIMIT_SECONDS = 30  # Reference budget; solve_control scales it per instance
 NUM_SEARCH_WORKERS = 8
 
 # -----------------------------------------------------------------------------------
@@ -53,6 +50,14 @@ def main(data):
     # quick input acknowledgement
     sys.stderr.write("Scheduler: received data. Preprocessing...\n")
 
+    # Sites that share no staff are solved as separate models, in parallel
+    registry = site_registry.from_payload(data)
+    site_parts = decompose.split_by_site(data, registry)
+    if site_parts:
+        return decompose.solve_parts(main, site_parts, "Scheduler")
+    pattern_sequence = registry.pattern_from_names(PATTERN_NAMES)
+    employee_sites = [registry.employee_sites(emp) for emp in employees_data]
+
     model = cp_model.CpModel()
 
     # --- Preprocess dates and maps ---
@@ -83,8 +88,8 @@ def main(data):
 
     for req in requests_data:
         date_idx = date_to_index[req["date"]]
-        shift_idx = NAME_TO_SHIFT.get(req["shiftType"])
-        loc_idx = NAME_TO_LOCATION.get(req["location"])
+        shift_idx = registry.shift_index.get(req["shiftType"])
+        loc_idx = registry.site_index.get(req["location"])
         if shift_idx is None or loc_idx is None:
             raise ValueError(f"Unknown shift/location in request: {req}")
 
@@ -95,7 +100,11 @@ def main(data):
             count = int(count_str)
             total += count
             key = (date_idx, shift_idx, loc_idx, grade)
-            eligible = {i for i, emp in enumerate(employees_data) if emp["proficiency_grade"] >= grade}
+            eligible = {
+                i for i, emp in enumerate(employees_data)
+                if emp["proficiency_grade"] >= grade
+                and (employee_sites[i] is None or loc_idx in employee_sites[i])
+            }
             eligible_per_grade[key] = eligible
             union_set |= eligible
 
@@ -125,7 +134,7 @@ def main(data):
     for (date_idx, shift_idx, loc_idx), var_list in assign_vars_by_shiftloc.items():
         total_req = total_required.get((date_idx, shift_idx, loc_idx), 0)
         sys.stderr.write(
-            f"Shift {all_dates[date_idx]} {SHIFT_NAMES[shift_idx]} @ {LOCATION_NAMES[loc_idx]}: "
+            f"Shift {all_dates[date_idx]} {registry.shift_names[shift_idx]} @ {registry.site_names[loc_idx]}: "
             f"eligible_vars={len(var_list)}, required={total_req}\n"
         )
 
@@ -134,8 +143,8 @@ def main(data):
     for e_idx in range(num_employees):
         for d_idx in range(num_days):
             row = []
-            for s_idx in SHIFT_TYPES:
-                for l_idx in LOCATIONS:
+            for s_idx in registry.shift_types:
+                for l_idx in registry.sites:
                     key = (e_idx, d_idx, s_idx, l_idx)
                     if key in assign:
                         row.append(assign[key])
@@ -152,8 +161,8 @@ def main(data):
             if date_str not in date_to_index:
                 continue
             d_idx = date_to_index[date_str]
-            for s_idx in SHIFT_TYPES:
-                for l_idx in LOCATIONS:
+            for s_idx in registry.shift_types:
+                for l_idx in registry.sites:
                     key = (e_idx, d_idx, s_idx, l_idx)
                     if key in assign:
                         model.Add(assign[key] == 0)
@@ -169,8 +178,8 @@ def main(data):
     # Iterate through each unique shift request (date, shift, location)
     for req in requests_data:
         date_idx = date_to_index.get(req["date"])
-        shift_idx = NAME_TO_SHIFT.get(req["shiftType"])
-        loc_idx = NAME_TO_LOCATION.get(req["location"])
+        shift_idx = registry.shift_index.get(req["shiftType"])
+        loc_idx = registry.site_index.get(req["location"])
 
         if date_idx is None or shift_idx is None or loc_idx is None:
             continue
@@ -226,7 +235,7 @@ def main(data):
 
             offset = employee_offsets.get(e_idx, 0)
             pattern_pos = (d_idx + offset) % PATTERN_LENGTH
-            expected = PATTERN_SEQUENCE[pattern_pos]  # may be OFF
+            expected = pattern_sequence[pattern_pos]  # may be OFF
 
             # deviation boolean
             dev = model.NewBoolVar(f"pattern_dev_e{e_idx}_d{d_idx}")
@@ -235,8 +244,8 @@ def main(data):
             if expected == OFF:
                 # When OFF is expected, deviation = any shift assigned at all
                 all_shift_vars = []
-                for s_idx in SHIFT_TYPES:
-                    for l_idx in LOCATIONS:
+                for s_idx in registry.shift_types:
+                    for l_idx in registry.sites:
                         key = (e_idx, d_idx, s_idx, l_idx)
                         if key in assign:
                             all_shift_vars.append(assign[key])
@@ -247,17 +256,17 @@ def main(data):
                 # expected != OFF
                 # Collect vars for expected shift
                 expected_vars = []
-                for l_idx in LOCATIONS:
+                for l_idx in registry.sites:
                     key = (e_idx, d_idx, expected, l_idx)
                     if key in assign:
                         expected_vars.append(assign[key])
                 
                 # Collect vars for other shifts
                 other_vars = []
-                for s_idx in SHIFT_TYPES:
+                for s_idx in registry.shift_types:
                     if s_idx == expected:
                         continue
-                    for l_idx in LOCATIONS:
+                    for l_idx in registry.sites:
                         key = (e_idx, d_idx, s_idx, l_idx)
                         if key in assign:
                             other_vars.append(assign[key])
@@ -284,13 +293,14 @@ def main(data):
 
     # --- Solver ---
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = TIME_LIMIT_SECONDS
     solver.parameters.num_workers = NUM_SEARCH_WORKERS
     # optional: enable logging if needed
     # solver.parameters.log_search_progress = True
 
     sys.stderr.write("Starting solver...\n")
-    status = solver.Solve(model)
+    solver, status = solve_control.solve(solver, model, data, TIME_LIMIT_SECONDS, "Scheduler",
+                                 eligible_pairs=len(assign),
+                                 objective_step=PATTERN_PENALTY_WEIGHT)
     sys.stderr.write(f"Solver finished with status {solver.StatusName(status)}\n")
 
     # --- Build roster output (stdout ONLY) ---
@@ -302,10 +312,7 @@ def main(data):
         for req in requests_data:
             date_str = req["date"]
             if date_str not in roster:
-                roster[date_str] = {
-                    LOCATION_NAMES[l]: {SHIFT_NAMES[s]: [] for s in SHIFT_TYPES} 
-                    for l in LOCATIONS
-                }
+                roster[date_str] = registry.empty_day()
         
         # Populate roster with assigned employees
         for (e_idx, d_idx, s_idx, l_idx), var in assign.items():
@@ -313,8 +320,8 @@ def main(data):
                 date_str = all_dates[d_idx]
                 if date_str not in request_dates:
                     continue
-                loc_name = LOCATION_NAMES[l_idx]
-                shift_name = SHIFT_NAMES[s_idx]
+                loc_name = registry.site_names[l_idx]
+                shift_name = registry.shift_names[s_idx]
                 roster[date_str][loc_name][shift_name].append(employees_data[e_idx]["id"])
     else:
         sys.stderr.write(f"No feasible solution. Solver status: {solver.StatusName(status)}\n")
@@ -3,26 +3,15 @@ import sys
 import os
 from datetime import datetime, timedelta
 
+import site_registry
+
 # --- Constants ---
-MORNING, AFTERNOON, NIGHT, OFF = 0, 1, 2, -1
-SHIFT_TYPES = [MORNING, AFTERNOON, NIGHT]
-SHIFT_NAMES = {MORNING: "Morning", AFTERNOON: "Afternoon", NIGHT: "Night"}
-NAME_TO_SHIFT = {"Morning": MORNING, "Afternoon": AFTERNOON, "Night": NIGHT}
-
-EAST, WEST = 0, 1
-LOCATIONS = [EAST, WEST]
-LOCATION_NAMES = {EAST: "East", WEST: "West"}
-NAME_TO_LOCATION = {"East": EAST, "West": WEST}
-
-# All possible shift and location combinations
-ALL_SHIFT_LOCATION_SLOTS = [
-    (MORNING, EAST), (MORNING, WEST),
-    (AFTERNOON, EAST), (AFTERNOON, WEST),
-    (NIGHT, EAST), (NIGHT, WEST)
-]
+# Sites and shift types come from the request (see site_registry.py)
+OFF = site_registry.OFF
 
 # 9-day repeating pattern
-PATTERN_SEQUENCE = [MORNING, MORNING, AFTERNOON, AFTERNOON, OFF, NIGHT, NIGHT, OFF, OFF]
+PATTERN_NAMES = ["Morning", "Morning", "Afternoon", "Afternoon", "OFF", "Night", "Night", "OFF", "OFF"]
+PATTERN_SEQUENCE = site_registry.DEFAULT_REGISTRY.pattern_from_names(PATTERN_NAMES)
 PATTERN_LENGTH = len(PATTERN_SEQUENCE)
 
 # --- Tunable Parameters ---
@@ -36,10 +25,12 @@ def get_team_for_date(date_str, all_dates, team_start_offset=0):
     day_diff = (current_date - first_date).days
     return ((day_diff + team_start_offset) % NUM_TEAMS) + 1 # Teams are 1-indexed
 
-def get_team_for_shift_location(date_str, shift_type_const, location_const, all_dates, team_offsets):
+def get_team_for_shift_location(date_str, shift_type_const, location_const, all_dates, team_offsets,
+                                pattern_sequence=PATTERN_SEQUENCE):
     """
     Determines the responsible team for a specific (date, shift_type, location) slot,
-    based on the 9-day shift pattern and team offsets.
+    based on the 9-day shift pattern and team offsets. The n-th site (by registry
+    index) goes to the n-th team on that shift.
     """
     first_date_str = all_dates[0]
     first_date = datetime.strptime(first_date_str, '%Y-%m-%d').date()
@@ -51,7 +42,7 @@ def get_team_for_shift_location(date_str, shift_type_const, location_const, all_
     candidate_teams = []
     for team_id, offset in team_offsets.items():
         effective_day_for_team = (day_in_pattern + offset) % PATTERN_LENGTH
-        if PATTERN_SEQUENCE[effective_day_for_team] == shift_type_const:
+        if pattern_sequence[effective_day_for_team] == shift_type_const:
             candidate_teams.append(team_id)
 
     candidate_teams.sort() # Ensure consistent assignment for East/West
@@ -59,12 +50,10 @@ def get_team_for_shift_location(date_str, shift_type_const, location_const, all_
     if not candidate_teams:
         return None # No team scheduled for this shift type on this day
 
-    if location_const == EAST:
-        return candidate_teams[0] if len(candidate_teams) > 0 else None
-    elif location_const == WEST:
-        return candidate_teams[1] if len(candidate_teams) > 1 else None
+    if location_const < len(candidate_teams):
+        return candidate_teams[location_const]
     
-    return None # Should ideally not be reached if logic is sound
+    return None # More sites than teams on this shift
 
 def _run_greedy_team_based_scheduler(data):
     employees_data = data.get("employees", [])
@@ -73,6 +62,9 @@ def _run_greedy_team_based_scheduler(data):
 
     sys.stderr.write("Scheduler: received data for team-based scheduling (greedy). Preprocessing...\n")
 
+    registry = site_registry.from_payload(data)
+    pattern_sequence = registry.pattern_from_names(PATTERN_NAMES)
+
     # --- Preprocess dates and maps ---
     all_dates = sorted(
         list(
@@ -125,11 +117,11 @@ def _run_greedy_team_based_scheduler(data):
             location_name = req["location"]
             
             # Convert names to constants for internal logic
-            shift_type_const = NAME_TO_SHIFT[shift_type_name]
-            location_const = NAME_TO_LOCATION[location_name]
+            shift_type_const = registry.shift_index[shift_type_name]
+            location_const = registry.site_index[location_name]
 
             # Determine the team responsible for this specific (date, shift_type, location) slot
-            responsible_team_id = get_team_for_shift_location(date, shift_type_const, location_const, all_dates, team_offsets)
+            responsible_team_id = get_team_for_shift_location(date, shift_type_const, location_const, all_dates, team_offsets, pattern_sequence)
             
             if responsible_team_id is None:
                  error_detail = (
@@ -152,7 +144,7 @@ def _run_greedy_team_based_scheduler(data):
 
             # Initialize roster structure if not present
             if date not in roster:
-                roster[date] = {loc: {shift: [] for shift in SHIFT_NAMES.values()} for loc in LOCATION_NAMES.values()}
+                roster[date] = registry.empty_day()
             
             # Get requirements for this shift
             required_proficiencies = {int(g): int(c) for g, c in req["required_proficiencies"].items()}
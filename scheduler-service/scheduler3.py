@@ -4,25 +4,28 @@ import time
 import random
 from ortools.sat.python import cp_model
 
-# --- Constants ---
-MORNING, AFTERNOON, NIGHT, OFF = 0, 1, 2, -1
-SHIFT_TYPES = [MORNING, AFTERNOON, NIGHT]
-SHIFT_NAMES = {MORNING: "Morning", AFTERNOON: "Afternoon", NIGHT: "Night"}
-NAME_TO_SHIFT = {"Morning": MORNING, "Afternoon": AFTERNOON, "Night": NIGHT, "OFF": OFF}
+import solve_control
+import reserve_pool
+import site_registry
+import decompose
+import tiling
+import var_registry
+import payload
+import presolve
+import draft
 
-EAST, WEST = 0, 1
-LOCATIONS = [EAST, WEST]
-LOCATION_NAMES = {EAST: "East", WEST: "West"}
-NAME_TO_LOCATION = {"East": EAST, "West": WEST}
+# --- Constants ---
+# Sites and shift types come from the request (see site_registry.py)
+OFF = site_registry.OFF
 
 # 9-day repeating pattern (Main Roster Default)
-PATTERN_SEQUENCE = [MORNING, MORNING, AFTERNOON, AFTERNOON, OFF, NIGHT, NIGHT, OFF, OFF]
-PATTERN_LENGTH = len(PATTERN_SEQUENCE)
+PATTERN_NAMES = ["Morning", "Morning", "Afternoon", "Afternoon", "OFF", "Night", "Night", "OFF", "OFF"]
+PATTERN_LENGTH = len(PATTERN_NAMES)
 
 # --- Tunable Parameters ---
 PATTERN_PENALTY_WEIGHT = 5000
 UNDERSTAFFING_PENALTY_WEIGHT = 10000000 # 10M base penalty
-TIME_LIMIT_SECONDS = 60
+TIME_LIMIT_SECONDS = 60  # Reference budget; solve_control scales it per instance
 NUM_SEARCH_WORKERS = 2  # Optimized for Cloud Run memory
 MAX_MEMORY_MB = 1024    # 1GB limit for solver safety
 
@@ -46,6 +49,25 @@ def main(data):
     sys.stderr.write(f"Scheduler3 (Competency): Mimicking Scheduler4 logic for stability...\n")
     sys.stderr.write(f"Employees={len(employees_data)}, requests={len(requests_data)}, pattern_length={PATTERN_LENGTH}\n")
 
+    # Sites that share no staff are solved as separate models, in parallel
+    registry = site_registry.from_payload(data)
+    site_parts = decompose.split_by_site(data, registry)
+    if site_parts:
+        return decompose.solve_parts(main, site_parts, "Scheduler3")
+    # Interned ids and competency sets, prepared once when the payload was decoded
+    workforce = payload.workforce_for(data)
+    pattern_sequence = registry.pattern_from_names(PATTERN_NAMES)
+
+    # Console groups whose certified staff don't overlap are solved as separate models, in parallel
+    console_parts = decompose.split_by_competency(data, PATTERN_LENGTH)
+    if console_parts:
+        return decompose.solve_parts(main, console_parts, "Scheduler3")
+
+    # Horizons repeating the pattern cycle solve each distinct cycle day once (see tiling.py)
+    cycle_parts = tiling.plan_cycles(data, PATTERN_LENGTH)
+    if cycle_parts:
+        return tiling.solve_tiled(main, cycle_parts, "Scheduler3")
+
     model = cp_model.CpModel()
 
     # --- Preprocess dates and maps ---
@@ -70,57 +92,23 @@ def main(data):
     for comp, count in comp_counts.items():
         req_total = comp_requirements.get(comp, 0)
         scarcity_scores[comp] = req_total / (count + 0.1)
+    # Tiled parts weigh consoles as their whole horizon does
+    scarcity_scores = data.get(tiling.SCARCITY_KEY, scarcity_scores)
 
     all_ordered_consoles = sorted(scarcity_scores.keys(), key=lambda x: scarcity_scores[x], reverse=True)
     sys.stderr.write(f"Scheduler3: Consoles sorted by scarcity: {all_ordered_consoles}\n")
 
     # --- Balanced Offset Assignment (if not provided) ---
-    employee_offsets = {}
-    has_custom_offsets = any("offset" in emp for emp in employees_data)
-    
-    if has_custom_offsets:
-        for i, emp in enumerate(employees_data):
-            employee_offsets[i] = int(emp.get("offset", 0)) % PATTERN_LENGTH
-    else:
-        # Greedily assign offsets to balance competencies across the pattern phases
-        offset_counts = [0] * PATTERN_LENGTH
-        comp_offset_counts = {c: [0] * PATTERN_LENGTH for c in scarcity_scores.keys()}
-        
-        # Sort employees by their most constrained competency scarcity
-        def get_emp_max_scarcity(idx):
-            comps = employees_data[idx].get("competencies", [])
-            if not comps: return 0
-            return max(scarcity_scores.get(c, 0) for c in comps)
-            
-        sorted_indices = sorted(range(num_employees), key=get_emp_max_scarcity, reverse=True)
-        
-        for i in sorted_indices:
-            emp = employees_data[i]
-            comps = emp.get("competencies", [])
-            best_offset = -1
-            min_score = float('inf')
-            
-            for o in range(PATTERN_LENGTH):
-                # Score factors: overall offset balance + competency-specific balance
-                score = offset_counts[o] * 10
-                for c in comps:
-                    score += comp_offset_counts[c][o] * 100
-                
-                if score < min_score:
-                    min_score = score
-                    best_offset = o
-            
-            employee_offsets[i] = best_offset
-            offset_counts[best_offset] += 1
-            for c in comps:
-                comp_offset_counts[c][best_offset] += 1
+    # Memoised on the workforce, so requests over a stored snapshot reuse it
+    employee_offsets = dict(enumerate(workforce.balanced_offsets(employees_data, requests_data, PATTERN_LENGTH)))
 
     # --- Process OJT Data ---
     ojt_assignments = [] # To include in final roster
     ojt_blocked_day = {} # (e_idx, d_idx) -> True
 
     # Pre-map user_id to e_idx
-    user_to_idx = {emp["id"]: i for i, emp in enumerate(employees_data)}
+    user_to_idx = workforce.index
+    employee_sites = [registry.employee_sites(emp) for emp in employees_data]
 
     for date_str, users in ojt_data.items():
         if date_str not in date_to_index: continue
@@ -129,14 +117,15 @@ def main(data):
             if user_id not in user_to_idx: continue
             e_idx = user_to_idx[user_id]
             for shift_name, console_info in shifts.items():
-                if shift_name not in NAME_TO_SHIFT: continue
-                s_idx = NAME_TO_SHIFT[shift_name]
+                s_idx = registry.shift_of(shift_name)
+                if s_idx is None: continue
                 
                 # OJT shifts are usually fixed.
                 ojt_blocked_day[(e_idx, d_idx)] = True
                 
-                console = console_info.get("console") if isinstance(console_info, dict) else console_info
-                location = console_info.get("location", "East") if isinstance(console_info, dict) else "East"
+                entry = payload.ojt_entry(console_info)
+                console = entry["console"]
+                location = entry.get("location", "East")
 
                 ojt_assignments.append({
                     "date": date_str,
@@ -148,26 +137,28 @@ def main(data):
                 })
 
     # --- Variables ---
-    assign = {}
-    emp_day_vars = {}
-    emp_day_shift_vars = {}
-    req_comp_vars = {}
+    assignments = var_registry.AssignmentRegistry()
+    demand_slots = {}  # Ordered set of (d_idx, s_idx, l_idx, comp_name) with demand
 
     req_map = {}
     for req in requests_data:
         d_idx = date_to_index[req["date"]]
-        s_idx = NAME_TO_SHIFT[req["shiftType"]]
-        l_idx = NAME_TO_LOCATION[req["location"]]
+        s_idx = registry.shift_index[req["shiftType"]]
+        l_idx = registry.site_index[req["location"]]
         req_map[(d_idx, s_idx, l_idx)] = req.get("required_competencies", {})
 
         for comp_name, count in req_map[(d_idx, s_idx, l_idx)].items():
             if count <= 0: continue
             key_req = (d_idx, s_idx, l_idx, comp_name)
-            if key_req not in req_comp_vars:
-                req_comp_vars[key_req] = []
+            demand_slots[key_req] = None
 
-    for (d_idx, s_idx, l_idx, comp_name) in req_comp_vars.keys():
+    pruner = presolve.CandidatePruner(
+        data, workforce.competency_sets, scarcity_scores,
+        [int(emp.get("reserve_deploy_count", 0)) for emp in employees_data],
+    )
+    for (d_idx, s_idx, l_idx, comp_name) in demand_slots:
         date_str = all_dates[d_idx]
+        eligible = []
         for e_idx, emp in enumerate(employees_data):
             emp_id = emp["id"]
             if emp_id in leave_data and date_str in leave_data[emp_id]:
@@ -176,46 +167,43 @@ def main(data):
             # --- CUSTOM PATTERN LOGIC (HARD CONSTRAINTS) ---
             offset = employee_offsets.get(e_idx, 0)
             pattern_pos = (d_idx + offset) % PATTERN_LENGTH
-            expected_s = PATTERN_SEQUENCE[pattern_pos]
+            expected_s = pattern_sequence[pattern_pos]
 
             if expected_s == OFF:
                 continue
 
             # RULE: Cannot swap Day (M/A) with Night (N)
-            if expected_s in [MORNING, AFTERNOON] and s_idx == NIGHT:
+            if not registry.can_work_shift(expected_s, s_idx):
                 continue
-            if expected_s == NIGHT and s_idx in [MORNING, AFTERNOON]:
+
+            # RULE: Only at sites the employee is rostered for (if listed)
+            if employee_sites[e_idx] is not None and l_idx not in employee_sites[e_idx]:
                 continue
             
             # RULE: If already on OJT for this day, cannot be assigned to another console
             if ojt_blocked_day.get((e_idx, d_idx)):
                 continue
 
-            emp_comps = emp.get("competencies", [])
-            if comp_name not in emp_comps:
+            if comp_name not in workforce.competency_sets[e_idx]:
                 continue
 
-            v = model.NewBoolVar('')
-            assign[(e_idx, d_idx, s_idx, l_idx, comp_name)] = v
-            req_comp_vars[(d_idx, s_idx, l_idx, comp_name)].append(v)
-
-            if (e_idx, d_idx) not in emp_day_vars:
-                emp_day_vars[(e_idx, d_idx)] = []
-            emp_day_vars[(e_idx, d_idx)].append(v)
+            eligible.append((e_idx, expected_s))
 
-            shift_key = (e_idx, d_idx, s_idx)
-            if shift_key not in emp_day_shift_vars:
-                emp_day_shift_vars[shift_key] = []
-            emp_day_shift_vars[shift_key].append(v)
+        # Presolve: only the best-ranked candidates beyond demand get a variable (see presolve.py)
+        count_req = req_map[(d_idx, s_idx, l_idx)][comp_name]
+        for e_idx, expected_s in pruner.select((d_idx, s_idx, l_idx, comp_name), count_req, eligible):
+            assignments.add(model, e_idx, d_idx, s_idx, l_idx, comp_name)
+    assignments.freeze()
+    pruner.log("Scheduler3")
 
     # --- Capacity Check ---
     total_slots_required = sum(comp_requirements.values())
-    shift_capacity = {s: 0 for s in SHIFT_TYPES}
+    shift_capacity = {s: 0 for s in registry.shift_types}
     for d_idx in range(num_days):
         for e_idx in range(num_employees):
             offset = employee_offsets.get(e_idx, 0)
             pattern_pos = (d_idx + offset) % PATTERN_LENGTH
-            expected_s = PATTERN_SEQUENCE[pattern_pos]
+            expected_s = pattern_sequence[pattern_pos]
             if expected_s != OFF:
                 shift_capacity[expected_s] += 1
     
@@ -223,18 +211,22 @@ def main(data):
     sys.stderr.write(f"Scheduler3: Capacity by Shift Pattern: {shift_capacity}\n")
 
     # --- Constraints ---
-    for (e_idx, d_idx), vars_list in emp_day_vars.items():
-        model.Add(sum(vars_list) <= 1)
+    emp_day_indexes = assignments.by_employee_day()
+    for indexes in emp_day_indexes.values():
+        model.Add(sum(assignments.vars_at(indexes)) <= 1)
 
     # --- Soft Constraints: Understaffing ---
     total_understaff_penalty = 0
     understaff_vars = []
     understaff_map = {} 
-    for (d_idx, s_idx, l_idx, comp_name), vars_list in req_comp_vars.items():
+    understaff_by_key = {}
+    slot_indexes = assignments.by_slot()
+    for (d_idx, s_idx, l_idx, comp_name) in demand_slots:
         count_req = req_map.get((d_idx, s_idx, l_idx), {}).get(comp_name, 0)
         if count_req > 0:
             understaff = model.NewIntVar(0, count_req, "")
             understaff_vars.append(understaff)
+            understaff_by_key[(d_idx, s_idx, l_idx, comp_name)] = understaff
             if comp_name not in understaff_map:
                 understaff_map[comp_name] = []
             understaff_map[comp_name].append(understaff)
@@ -244,6 +236,7 @@ def main(data):
             specific_weight = int(UNDERSTAFFING_PENALTY_WEIGHT * weight_factor)
             
             total_understaff_penalty += understaff * specific_weight
+            vars_list = assignments.vars_at(slot_indexes.get((d_idx, s_idx, l_idx, comp_name), var_registry.NO_INDEXES))
             model.Add(sum(vars_list) + understaff == count_req)
 
     # --- Soft Constraints: Pattern deviations ---
@@ -252,12 +245,13 @@ def main(data):
         for d_idx in range(num_days):
             offset = employee_offsets.get(e_idx, 0)
             pattern_pos = (d_idx + offset) % PATTERN_LENGTH
-            expected = PATTERN_SEQUENCE[pattern_pos]
+            expected = pattern_sequence[pattern_pos]
 
             dev = model.NewBoolVar("")
             pattern_deviation_vars.append(dev)
 
-            all_emp_vars = emp_day_vars.get((e_idx, d_idx), [])
+            day_indexes = emp_day_indexes.get((e_idx, d_idx), var_registry.NO_INDEXES)
+            all_emp_vars = assignments.vars_at(day_indexes)
             if not all_emp_vars:
                 if expected != OFF:
                     model.Add(dev == 1)
@@ -268,8 +262,9 @@ def main(data):
             if expected == OFF:
                 safe_bool_or(model, all_emp_vars, dev)
             else:
-                expected_vars = emp_day_shift_vars.get((e_idx, d_idx, expected), [])
-                other_vars = [v for v in all_emp_vars if v not in expected_vars]
+                on_expected = assignments.shift[day_indexes] == expected
+                expected_vars = assignments.vars_at(day_indexes[on_expected])
+                other_vars = assignments.vars_at(day_indexes[~on_expected])
                 
                 expected_assigned = model.NewBoolVar("")
                 other_assigned = model.NewBoolVar("")
@@ -280,6 +275,13 @@ def main(data):
                 model.AddBoolOr([expected_assigned.Not(), other_assigned]).OnlyEnforceIf(dev)
                 model.AddBoolAnd([expected_assigned, other_assigned.Not()]).OnlyEnforceIf(dev.Not())
 
+    # --- Hint: start the search from the greedy draft roster (see draft.py) ---
+    hinted_shortfall = draft.add_hint(
+        model, assignments, understaff_by_key, req_map, scarcity_scores, pruner.rank,
+        lambda e_idx, d_idx: pattern_sequence[(d_idx + employee_offsets.get(e_idx, 0)) % PATTERN_LENGTH],
+    )
+    sys.stderr.write(f"Scheduler3: Greedy hint leaves {hinted_shortfall} slots short\n")
+
     # --- Search Strategy ---
     rng = random.Random(42)
 
@@ -293,14 +295,14 @@ def main(data):
             
     all_c_vars = []
     for comp_name in all_ordered_consoles:
-        c_vars = [v for (e_idx, d_idx, s_idx, l_idx, c_name), v in assign.items() if c_name == comp_name]
+        c_vars = assignments.vars_at(assignments.indexes_for_console(comp_name))
         if c_vars:
             rng.shuffle(c_vars)
             all_c_vars.extend(c_vars)
     if all_c_vars:
         model.AddDecisionStrategy(all_c_vars, cp_model.CHOOSE_FIRST, cp_model.SELECT_MAX_VALUE)
 
-    remaining_vars = list(assign.values())
+    remaining_vars = list(assignments.vars)
     rng.shuffle(remaining_vars)
     model.AddDecisionStrategy(remaining_vars, cp_model.CHOOSE_FIRST, cp_model.SELECT_MAX_VALUE)
     model.AddDecisionStrategy(pattern_deviation_vars, cp_model.CHOOSE_FIRST, cp_model.SELECT_MIN_VALUE)
@@ -313,11 +315,12 @@ def main(data):
 
     # --- Solve ---
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = TIME_LIMIT_SECONDS
     solver.parameters.num_search_workers = NUM_SEARCH_WORKERS
     solver.parameters.max_memory_in_mb = MAX_MEMORY_MB
 
-    status = solver.Solve(model)
+    solver, status = solve_control.solve(solver, model, data, TIME_LIMIT_SECONDS, "Scheduler3",
+                                 build_started=start_time, eligible_pairs=len(assignments),
+                                 objective_step=PATTERN_PENALTY_WEIGHT)
 
     sys.stderr.write(f"Scheduler3: Solver Status: {solver.StatusName(status)}\n")
     sys.stderr.write(f"Scheduler3: Objective Value: {solver.ObjectiveValue()}\n")
@@ -325,36 +328,89 @@ def main(data):
     if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
         return json.dumps({"error": f"Solver status: {solver.StatusName(status)}"})
 
+    values = solve_control.solution_values(solver)
+
+    # Days where pruning may have cost quality are re-solved on their own with all their candidates
+    failing_days = pruner.uncertified_days(
+        values, assignments, understaff_by_key,
+        lambda e_idx, d_idx: pattern_sequence[(d_idx + employee_offsets.get(e_idx, 0)) % PATTERN_LENGTH],
+    )
+    failing_dates = {all_dates[d_idx] for d_idx in failing_days}
+    retried = None
+    if failing_days:
+        retried = decompose.run_parts(main, pruner.retry_parts(
+            data, failing_days, all_dates, [employee_offsets.get(e_idx, 0) for e_idx in range(num_employees)],
+            PATTERN_LENGTH, scarcity_scores, solver.parameters.max_time_in_seconds, start_time, "Scheduler3",
+        ), "Scheduler3")
+
     # --- Results ---
     # Initialize roster with all dates to ensure even empty dates are sent back
-    roster = {dt: {ln: {sn: [] for sn in SHIFT_NAMES.values()} for ln in LOCATION_NAMES.values()} for dt in all_dates}
+    roster = {dt: registry.empty_day() for dt in all_dates}
     assigned_count = 0
+    assigned_emp_days = set()
     # Add regular assignments
-    for (e_idx, d_idx, s_idx, l_idx, comp_name), v in assign.items():
-        if solver.Value(v):
-            assigned_count += 1
-            date_str = all_dates[d_idx]
-            loc_name = LOCATION_NAMES[l_idx]
-            shift_name = SHIFT_NAMES[s_idx]
-            roster[date_str][loc_name][shift_name].append({
-                "user_id": employees_data[e_idx]["id"],
-                "assigned_console": comp_name,
-                "is_ojt": False
-            })
+    for k in assignments.chosen(values).tolist():
+        e_idx, d_idx, s_idx, l_idx, comp_name = assignments.key(k)
+        if d_idx in failing_days:
+            continue
+        assigned_count += 1
+        assigned_emp_days.add((e_idx, d_idx))
+        date_str = all_dates[d_idx]
+        loc_name = registry.site_names[l_idx]
+        shift_name = registry.shift_names[s_idx]
+        roster[date_str][loc_name][shift_name].append({
+            "user_id": employees_data[e_idx]["id"],
+            "assigned_console": comp_name,
+            "is_ojt": False
+        })
 
     # Add OJT assignments
     for ojt in ojt_assignments:
+        if ojt["date"] in failing_dates:
+            continue
         assigned_count += 1
         date_str = ojt["date"]
         shift_name = ojt["shift_name"]
         loc_name = ojt["location"] 
         if date_str not in roster:
             # This case shouldn't happen if all dates are in all_dates, but for safety:
-            roster[date_str] = {ln: {sn: [] for sn in SHIFT_NAMES.values()} for ln in LOCATION_NAMES.values()}
+            roster[date_str] = registry.empty_day()
         roster[date_str][loc_name][shift_name].append({
             "user_id": ojt["user_id"],
             "assigned_console": ojt["assigned_console"],
             "is_ojt": True
         })
 
+    # --- Reserve Pool Index ---
+    # Staff working by pattern (not on leave or OJT) who were left without a console
+    reserve_slots = []
+    for d_idx in range(num_days):
+        if d_idx in failing_days:
+            continue
+        date_str = all_dates[d_idx]
+        for e_idx in range(num_employees):
+            if (e_idx, d_idx) in assigned_emp_days:
+                continue
+            emp_id = employees_data[e_idx]["id"]
+            if emp_id in leave_data and date_str in leave_data[emp_id]:
+                continue
+            if ojt_blocked_day.get((e_idx, d_idx)):
+                continue
+            offset = employee_offsets.get(e_idx, 0)
+            expected_s = pattern_sequence[(d_idx + offset) % PATTERN_LENGTH]
+            if expected_s != OFF:
+                reserve_slots.append((d_idx, e_idx, expected_s))
+    reserve_index = reserve_pool.build_index(employees_data, all_dates, reserve_slots, registry.shift_names)
+    if retried is None:
+        reserve_pool.publish(reserve_index, "Scheduler3", data.get("schedulingMode"))
+
+    if retried is not None:
+        # Every objective term belongs to one day: keep the first solve's cost on the days it kept
+        day_of_var = {understaff.Index(): key[0] for key, understaff in understaff_by_key.items()}
+        day_of_var.update((dev.Index(), i % num_days) for i, dev in enumerate(pattern_deviation_vars))
+        costs = presolve.day_costs(model, values, day_of_var)
+        kept_objective = sum(cost for d_idx, cost in costs.items() if d_idx not in failing_days)
+        return pruner.merge_retry(data, roster, reserve_index, solver.StatusName(status), kept_objective,
+                                  retried, "Scheduler3")
+
     return json.dumps(roster)
@@ -0,0 +1,81 @@
+import sys
+import time
+import importlib
+import threading
+
+# --- Mode Registry ---
+# schedulingMode -> (module name, description used in dispatcher logs).
+# Modules are only imported on first use so a cold start doesn't pay for
+# OR-Tools (or schedulers nobody has asked for yet).
+SCHEDULER_MODES = {
+    "individual": ("scheduler", "individual-based scheduler"),
+    "team": ("scheduler2", "team-based scheduler"),
+    "competency": ("scheduler3", "competency-based scheduler"),
+    "simulation": ("scheduler4", "simulation-based scheduler (Scheduler4)"),
+    "simulation-pending": ("scheduler5", "simulation-pending scheduler (Scheduler5)"),
+    "repair": ("repair", "same-day disruption repair"),
+    "simulation-risk": ("risk", "pending-leave staffing risk (Monte Carlo)"),
+    "draft": ("draft", "greedy draft roster (no solver)"),
+}
+DEFAULT_MODE = "individual"
+
+# --- Tunable Parameters ---
+WARMUP_DELAY_SECONDS = 1.0  # Give the server time to bind before importing
+
+_loaded_mains = {}  # module name -> main function
+_load_lock = threading.Lock()
+
+
+def resolve_mode(scheduling_mode):
+    """Map an incoming schedulingMode to a registered one (unknown modes fall back to individual)."""
+    if scheduling_mode in SCHEDULER_MODES:
+        return scheduling_mode
+    return DEFAULT_MODE
+
+
+def describe_mode(scheduling_mode):
+    return SCHEDULER_MODES[resolve_mode(scheduling_mode)][1]
+
+
+def get_scheduler(scheduling_mode):
+    """Return the main function for a mode, importing its module on first use."""
+    module_name = SCHEDULER_MODES[resolve_mode(scheduling_mode)][0]
+    main_fn = _loaded_mains.get(module_name)
+    if main_fn is not None:
+        return main_fn
+
+    with _load_lock:
+        main_fn = _loaded_mains.get(module_name)
+        if main_fn is None:
+            start = time.time()
+            module = importlib.import_module(module_name)
+            main_fn = module.main
+            _loaded_mains[module_name] = main_fn
+            sys.stderr.write(f"Registry: Loaded {module_name} in {time.time() - start:.3f}s\n")
+    return main_fn
+
+
+def loaded_modules():
+    return sorted(_loaded_mains.keys())
+
+
+def load_all():
+    """Import every registered scheduler (used by warm-up and benchmarks)."""
+    for mode in SCHEDULER_MODES:
+        try:
+            get_scheduler(mode)
+        except Exception as e:
+            sys.stderr.write(f"Registry: Failed to load scheduler for mode '{mode}': {e}\n")
+
+
+def start_warmup(delay=WARMUP_DELAY_SECONDS):
+    """Load all schedulers on a daemon thread so the first request of each mode is fast."""
+    def _warmup():
+        time.sleep(delay)
+        start = time.time()
+        load_all()
+        sys.stderr.write(f"Registry: Warm-up finished in {time.time() - start:.3f}s\n")
+
+    thread = threading.Thread(target=_warmup, name="scheduler-warmup", daemon=True)
+    thread.start()
+    return thread
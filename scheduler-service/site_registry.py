@@ -0,0 +1,166 @@
+import sys
+from datetime import datetime
+
+# --- Defaults ---
+# Used when the payload does not list its own sites/shift types, so existing
+# callers keep getting East/West x Morning/Afternoon/Night rosters.
+DEFAULT_SITES = ["East", "West"]
+DEFAULT_SHIFT_TYPES = [
+    {"name": "Morning", "group": "day"},
+    {"name": "Afternoon", "group": "day"},
+    {"name": "Night", "group": "night"},
+]
+OFF = -1
+OFF_NAME = "OFF"
+
+# 9-day repeating pattern (Main Roster Default)
+DEFAULT_PATTERN_NAMES = ["Morning", "Morning", "Afternoon", "Afternoon", "OFF", "Night", "Night", "OFF", "OFF"]
+
+
+class SiteShiftRegistry:
+    """
+    Dense integer indexing for sites and shift types.
+
+    Sites and shifts are numbered 0..n-1 in the order given. Each shift type
+    belongs to a group ("day", "night", ...); pattern swaps are only allowed
+    within a group, which generalises the Day (M/A) vs Night (N) rule.
+    """
+
+    def __init__(self, site_names, shift_types):
+        self.site_names = list(site_names)
+        self.site_index = {name: i for i, name in enumerate(self.site_names)}
+        self.sites = list(range(len(self.site_names)))
+
+        self.shift_names = [s["name"] for s in shift_types]
+        self.shift_groups = [s.get("group", s["name"]) for s in shift_types]
+        self.shift_index = {name: i for i, name in enumerate(self.shift_names)}
+        self.shift_types = list(range(len(self.shift_names)))
+
+    def shift_of(self, name):
+        """Shift index for a name, OFF for "OFF", None if unknown."""
+        if name == OFF_NAME:
+            return OFF
+        return self.shift_index.get(name)
+
+    def pattern_from_names(self, names):
+        # Unknown entries count as OFF, as the schedulers always did
+        return [self.shift_index.get(name, OFF) for name in names]
+
+    def can_work_shift(self, expected_s, s_idx):
+        """Nobody works on a pattern OFF day, and shifts can't be swapped across groups."""
+        if expected_s == OFF:
+            return False
+        return self.shift_groups[expected_s] == self.shift_groups[s_idx]
+
+    def employee_sites(self, emp):
+        """Set of site indices an employee may work at, or None for any site."""
+        names = emp.get("sites")
+        if not names:
+            return None
+        return {self.site_index[n] for n in names if n in self.site_index}
+
+    def empty_day(self):
+        return {site: {shift: [] for shift in self.shift_names} for site in self.site_names}
+
+    def to_payload(self):
+        return {
+            "sites": list(self.site_names),
+            "shiftTypes": [{"name": n, "group": g} for n, g in zip(self.shift_names, self.shift_groups)],
+        }
+
+
+def expected_shift(pattern_sequence, offset, d_idx):
+    """Shift an employee works by pattern on horizon day d_idx (may be OFF)."""
+    return pattern_sequence[(d_idx + offset) % len(pattern_sequence)]
+
+
+def console_scarcity(employees_data, requests_data):
+    """Required slots per certified employee for each console staff hold, as scheduler3/4/5 score it."""
+    comp_counts = {}
+    for emp in employees_data:
+        for comp in emp.get("competencies", []):
+            comp_counts[comp] = comp_counts.get(comp, 0) + 1
+    comp_requirements = {}
+    for req in requests_data:
+        for comp, count in req.get("required_competencies", {}).items():
+            comp_requirements[comp] = comp_requirements.get(comp, 0) + count
+    return {c: comp_requirements.get(c, 0) / (n + 0.1) for c, n in comp_counts.items()}
+
+
+def balanced_offsets(employees_data, requests_data, pattern_length):
+    """Pattern offset per employee: as given, or the balanced greedy scheduler3/4/5 run when none are."""
+    if any("offset" in emp for emp in employees_data):
+        return [int(emp.get("offset", 0)) % pattern_length for emp in employees_data]
+
+    scarcity = console_scarcity(employees_data, requests_data)
+
+    def max_scarcity(idx):
+        comps = employees_data[idx].get("competencies", [])
+        return max((scarcity.get(c, 0) for c in comps), default=0)
+
+    offsets = [0] * len(employees_data)
+    offset_counts = [0] * pattern_length
+    comp_offset_counts = {c: [0] * pattern_length for c in scarcity}
+    for i in sorted(range(len(employees_data)), key=max_scarcity, reverse=True):
+        comps = employees_data[i].get("competencies", [])
+        best_offset, min_score = -1, float("inf")
+        for o in range(pattern_length):
+            score = offset_counts[o] * 10 + sum(comp_offset_counts[c][o] * 100 for c in comps)
+            if score < min_score:
+                min_score, best_offset = score, o
+        offsets[i] = best_offset
+        offset_counts[best_offset] += 1
+        for c in comps:
+            comp_offset_counts[c][best_offset] += 1
+    return offsets
+
+
+def day_index(date_str, horizon_start):
+    """Days between horizon_start and date_str (both YYYY-MM-DD)."""
+    return (datetime.strptime(date_str, "%Y-%m-%d") - datetime.strptime(horizon_start, "%Y-%m-%d")).days
+
+
+def _normalise_shift_types(shift_types):
+    normalised = []
+    for s in shift_types:
+        if isinstance(s, str):
+            normalised.append({"name": s, "group": s})
+        else:
+            normalised.append({"name": s["name"], "group": s.get("group", s["name"])})
+    return normalised
+
+
+def from_payload(data):
+    """
+    Build the registry for one request. Payloads may list `sites` and
+    `shiftTypes` ([{"name", "group"}] or plain names); otherwise the defaults
+    are extended with any extra locations/shift types seen in the requests.
+    """
+    requests_data = data.get("requests", [])
+
+    site_names = list(data.get("sites") or DEFAULT_SITES)
+    if not data.get("sites"):
+        for req in requests_data:
+            loc = req.get("location")
+            if loc is not None and loc not in site_names:
+                site_names.append(loc)
+
+    if data.get("shiftTypes"):
+        shift_types = _normalise_shift_types(data["shiftTypes"])
+    else:
+        shift_types = [dict(s) for s in DEFAULT_SHIFT_TYPES]
+        known = {s["name"] for s in shift_types}
+        for req in requests_data:
+            name = req.get("shiftType")
+            if name is not None and name not in known and name != OFF_NAME:
+                shift_types.append({"name": name, "group": name})
+                known.add(name)
+
+    if len(site_names) != len(DEFAULT_SITES) or len(shift_types) != len(DEFAULT_SHIFT_TYPES):
+        sys.stderr.write(
+            f"SiteRegistry: sites={site_names}, shifts={[s['name'] for s in shift_types]}\n"
+        )
+    return SiteShiftRegistry(site_names, shift_types)
+
+
+DEFAULT_REGISTRY = SiteShiftRegistry(DEFAULT_SITES, DEFAULT_SHIFT_TYPES)
@@ -0,0 +1,320 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+from ortools.sat.python import cp_model
+
+import solve_history
+import profiling
+import corpus
+import cancellation
+
+# --- Solve Profiles ---
+# time limit = base + per_1k_vars * (model variables / 1000), or once the solve
+# history has HISTORY_MIN_RUNS comparable runs, HISTORY_HEADROOM * their p95
+# solve time; either way capped at max_factor * the scheduler's own TIME_LIMIT_SECONDS.
+# The search also stops early once the incumbent has not improved for
+# stall_seconds, or the gap to the best bound drops below gap_steps times the
+# scheduler's objective step (its smallest penalty weight, see solve) or below
+# relative_gap. Rosters total ~1e10-1e11 against a 1e7 understaffed slot, so
+# even a 0.5% relative gap would stop with dozens of fillable slots open; a gap
+# under one step only stops once no roster a whole step better can exist.
+SOLVE_PROFILES = {
+    "fast": {
+        "base_seconds": 2.0,
+        "seconds_per_1k_vars": 0.5,
+        "max_factor": 0.25,
+        "stall_seconds": 2.0,
+        "gap_steps": 0.9,
+        "relative_gap": 0.0,
+    },
+    "balanced": {
+        "base_seconds": 5.0,
+        "seconds_per_1k_vars": 2.0,
+        "max_factor": 1.5,
+        "stall_seconds": 10.0,
+        "gap_steps": 0.5,
+        "relative_gap": 0.0,
+    },
+    "thorough": {
+        "base_seconds": 15.0,
+        "seconds_per_1k_vars": 5.0,
+        "max_factor": 3.0,
+        "stall_seconds": 30.0,
+        "gap_steps": 0.0,
+        "relative_gap": 0.0,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+# --- Tunable Parameters ---
+MIN_TIME_LIMIT_SECONDS = 1.0
+DEFAULT_BACKEND = os.environ.get("SOLVER_BACKEND", "cp-sat")  # "cp-sat", "auto" or "highs"; solveOptions.backend overrides
+AUTO_HIGHS_MAX_VARS = 120000  # HiGHS has no memory cap; "auto" keeps bigger models on CP-SAT under MAX_MEMORY_MB
+MAX_TIME_LIMIT_SECONDS = 240.0  # Keep below the 300s client timeout in the Next.js routes
+STALL_POLL_SECONDS = 0.1
+HISTORY_MIN_RUNS = 5  # Comparable past runs (solve_history.predict_time_limit) before they set the budget
+HISTORY_HEADROOM = 1.5
+# Carried in re-solves of part of a request (see presolve.retry_parts), like payload.WORKFORCE_KEY
+TIME_CAP_KEY = "_timeLimitCap"
+
+
+def resolve_settings(data, default_time_limit, num_vars, label=None, objective_step=None):
+    """
+    Work out the time limit, stall interval, gap thresholds and backend for one
+    solve, learning the budget from past runs of `label` when there are
+    enough of them. The absolute gap is the profile's gap_steps times
+    `objective_step`, 0 without one. Reads `solveProfile` and optional `solveOptions` overrides
+    ({"maxTimeSeconds", "stallSeconds", "absoluteGap", "relativeGap", "backend"}) from the request payload.
+    """
+    profile_name = data.get("solveProfile", DEFAULT_PROFILE)
+    if profile_name not in SOLVE_PROFILES:
+        sys.stderr.write(f"SolveControl: Unknown solveProfile '{profile_name}', using {DEFAULT_PROFILE}\n")
+        profile_name = DEFAULT_PROFILE
+    profile = SOLVE_PROFILES[profile_name]
+
+    options = data.get("solveOptions") or {}
+    budget = "profile"
+    if "maxTimeSeconds" in options:
+        budget = "request"
+        time_limit = max(MIN_TIME_LIMIT_SECONDS, min(float(options["maxTimeSeconds"]), MAX_TIME_LIMIT_SECONDS))
+    else:
+        predicted = profile["base_seconds"] + profile["seconds_per_1k_vars"] * (num_vars / 1000.0)
+        learned = None
+        if label is not None:
+            learned = solve_history.predict_time_limit(label, num_vars, profile_name, HISTORY_MIN_RUNS)
+        if learned is not None:
+            budget = "history"
+            predicted = learned * HISTORY_HEADROOM
+        cap = min(default_time_limit * profile["max_factor"], MAX_TIME_LIMIT_SECONDS)
+        time_limit = max(MIN_TIME_LIMIT_SECONDS, min(predicted, cap))
+    if TIME_CAP_KEY in data:
+        budget += ", capped"
+        time_limit = max(MIN_TIME_LIMIT_SECONDS, min(time_limit, data[TIME_CAP_KEY]))
+
+    return {
+        "profile": profile_name,
+        "budget": budget,
+        "time_limit": time_limit,
+        "stall_seconds": float(options.get("stallSeconds", profile["stall_seconds"])),
+        "absolute_gap": float(options.get("absoluteGap", profile["gap_steps"] * (objective_step or 0))),
+        "relative_gap": float(options.get("relativeGap", profile["relative_gap"])),
+        "backend": options.get("backend") or DEFAULT_BACKEND,
+    }
+
+
+class StallMonitor(cp_model.CpSolverSolutionCallback):
+    """
+    Tracks when the incumbent last improved. A watchdog thread stops the
+    search once no improvement has been seen for `stall_seconds`, or as soon
+    as the request's cancellation token is cancelled (superseded, client gone).
+    """
+
+    def __init__(self, solver, stall_seconds, token=None):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._solver = solver
+        self._stall_seconds = stall_seconds
+        self._token = token
+        self._unregister = None
+        self._last_improvement = None
+        self._done = threading.Event()
+        self._watchdog = None
+        self.solutions = 0
+        self.stopped_on_stall = False
+        self.stopped_on_cancel = False
+
+    def on_solution_callback(self):
+        # CP-SAT only reports strictly improving solutions
+        self.solutions += 1
+        self._last_improvement = time.time()
+        if self._token is not None and self._token.cancelled:
+            self.stopped_on_cancel = True
+            self.StopSearch()
+
+    def start(self):
+        if self._token is not None:
+            self._unregister = self._token.on_cancel(self._cancel)
+        if self._stall_seconds <= 0 and self._token is None:
+            return
+        self._watchdog = threading.Thread(target=self._watch, name="stall-monitor", daemon=True)
+        self._watchdog.start()
+
+    def finish(self):
+        self._done.set()
+        if self._unregister is not None:
+            self._unregister()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def _cancel(self):
+        self.stopped_on_cancel = True
+        self._solver.StopSearch()
+
+    def _watch(self):
+        while not self._done.wait(STALL_POLL_SECONDS):
+            # Also catches a cancel that landed before the search had started (StopSearch was a no-op then)
+            if self._token is not None and self._token.cancelled:
+                self._cancel()
+                return
+            last = self._last_improvement
+            if self._stall_seconds > 0 and last is not None and time.time() - last >= self._stall_seconds:
+                self.stopped_on_stall = True
+                self._solver.StopSearch()
+                return
+
+
+_last_result = threading.local()
+
+
+def note_result(status_name, objective):
+    """Remember the outcome of the solve just finished on this thread (see last_result)."""
+    _last_result.value = (status_name, objective)
+
+
+def last_result():
+    """(status name, objective or None) of the last solve on this thread, or None."""
+    return getattr(_last_result, "value", None)
+
+
+def choose_backend(requested, model, num_vars):
+    """
+    ("cp-sat", None) or ("highs", MipTranslation) for this model.
+
+    HiGHS only sees the model's constraints: no hint or decision strategies,
+    no stall detection or mid-search cancellation, no memory cap, and a time
+    limit hit before any incumbent is UNKNOWN. So CP-SAT is the default and
+    "auto" only routes solves nobody can cancel (batch and benchmark runs,
+    not HTTP requests) on models up to AUTO_HIGHS_MAX_VARS, where HiGHS
+    reached the same optimum 2-4x faster at every size bench_backends.py
+    covers; solve() re-runs them on CP-SAT if HiGHS ends without an
+    incumbent. "highs" forces it whenever the model translates.
+    """
+    if requested not in ("auto", "highs"):
+        return "cp-sat", None
+    import mip_backend  # SciPy is only loaded once a solve asks for HiGHS
+
+    if not mip_backend.available():
+        return "cp-sat", None
+    if requested == "auto" and (cancellation.current() is not None or num_vars > AUTO_HIGHS_MAX_VARS):
+        return "cp-sat", None
+    try:
+        return "highs", mip_backend.MipTranslation(model.Proto())
+    except mip_backend.Unsupported as e:
+        if requested == "highs":
+            sys.stderr.write(f"SolveControl: Model can't run on HiGHS ({e}), using CP-SAT\n")
+        return "cp-sat", None
+
+
+def _solve_cp_sat(solver, model, translation, settings, token):
+    monitor = StallMonitor(solver, settings["stall_seconds"], token)
+    monitor.start()
+    try:
+        status = solver.Solve(model, monitor)
+    finally:
+        monitor.finish()
+    stop_reason = "cancelled" if monitor.stopped_on_cancel else "stall" if monitor.stopped_on_stall else "solver"
+    return status, monitor.solutions, stop_reason
+
+
+def _solve_highs(solver, model, translation, settings, token):
+    # No stall detection or mid-search stop through SciPy: the time limit bounds it,
+    # and a cancel that lands meanwhile is honoured once it returns
+    status = solver.solve(translation)
+    has_solution = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    stop_reason = "cancelled" if token is not None and token.cancelled else "solver"
+    return status, int(has_solution), stop_reason
+
+
+def _configure(solver, settings, profile, label):
+    solver.parameters.max_time_in_seconds = settings["time_limit"]
+    solver.parameters.absolute_gap_limit = settings["absolute_gap"]
+    solver.parameters.relative_gap_limit = settings["relative_gap"]
+    if profile is not None:
+        # Capture the search log for this request only (see profiling.py)
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = profile.solver_log_callback(label)
+
+
+def solve(solver, model, data, default_time_limit, label, build_started=None, eligible_pairs=None,
+          objective_step=None):
+    """
+    Solve `model` with an adaptive time budget. The caller sets workers and
+    memory limits on `solver` as before; this fills in the time limit and
+    gap, runs the search with stall detection, records the run in the solve
+    history, and returns (solver, status).
+
+    The returned solver is `solver` itself after a CP-SAT search, or a
+    mip_backend.HighsSolver when the model ran on HiGHS; both answer the
+    Value / ObjectiveValue / StatusName calls the schedulers make afterwards.
+
+    `objective_step` is the smallest objective change between two rosters
+    (the scheduler's smallest penalty weight); the absolute gap stays below it.
+    `build_started` (time.time() when the scheduler began) and `eligible_pairs`
+    (number of assignment variables) are only used for the history row.
+    """
+    build_seconds = time.time() - build_started if build_started is not None else None
+    num_vars = len(model.Proto().variables)
+    settings = resolve_settings(data, default_time_limit, num_vars, label, objective_step)
+    backend, translation = choose_backend(settings["backend"], model, num_vars)
+    cp_solver = solver
+    if backend == "highs":
+        solver = translation.new_solver()
+
+    profile = profiling.current()
+    _configure(solver, settings, profile, label)
+
+    sys.stderr.write(
+        f"{label}: Solve backend={backend}, profile={settings['profile']}, vars={num_vars}, "
+        f"time_limit={settings['time_limit']:.1f}s ({settings['budget']}), stall={settings['stall_seconds']:.1f}s, "
+        f"gap={settings['absolute_gap']:g}/{settings['relative_gap']}\n"
+    )
+
+    token = cancellation.current()
+    if token is not None:
+        token.raise_if_cancelled()
+    run = _solve_highs if backend == "highs" else _solve_cp_sat
+    status, solutions, stop_reason = run(solver, model, translation, settings, token)
+    if backend == "highs" and status == cp_model.UNKNOWN and settings["backend"] == "auto":
+        sys.stderr.write(f"{label}: HiGHS found no solution in {solver.WallTime():.2f}s, re-solving on CP-SAT\n")
+        backend, solver = "cp-sat", cp_solver
+        _configure(solver, settings, profile, label)
+        status, solutions, stop_reason = _solve_cp_sat(solver, model, None, settings, token)
+
+    sys.stderr.write(
+        f"{label}: Solve finished in {solver.WallTime():.2f}s "
+        f"(solutions={solutions}, stopped_by={stop_reason})\n"
+    )
+    stats = {
+        "num_vars": num_vars,
+        "num_constraints": len(model.Proto().constraints),
+        "eligible_pairs": eligible_pairs,
+        "build_seconds": build_seconds,
+        "solutions": solutions,
+        "stopped_by": stop_reason,
+        "backend": backend,
+    }
+    solve_history.record_solve(label, data, solver, status, settings, stats)
+    has_solution = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    note_result(solver.StatusName(status), solver.ObjectiveValue() if has_solution else None)
+    recording = corpus.current()
+    if recording is not None:
+        recording.add_solve(label, model, solver, status, settings, stats)
+    if profile is not None:
+        profile.add_solve(dict(stats, label=label, search_seconds=solver.WallTime(),
+                               status=solver.StatusName(status), time_limit=settings["time_limit"]))
+    if stop_reason == "cancelled":
+        # Nobody will read this result; skip re-solves and result building
+        raise cancellation.Cancelled(token.reason)
+    return solver, status
+
+
+def solution_values(solver):
+    """
+    Every model variable's value in the solution `solve` returned, as one
+    int64 vector by proto index: one bulk read instead of a Value call each.
+    """
+    if not isinstance(solver, cp_model.CpSolver):
+        return solver.solution_values()  # mip_backend.HighsSolver
+    return np.array(solver.ResponseProto().solution, dtype=np.int64)
@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+# --- Tunable Parameters ---
+# One row per solve, in SQLite at SOLVE_HISTORY_DB. Point it at a mounted volume
+# (Cloud Run's /tmp is memory-backed and per instance); unset, nothing is recorded.
+DB_PATH = os.environ.get("SOLVE_HISTORY_DB", "")  # "" disables history
+RETENTION_DAYS = float(os.environ.get("SOLVE_HISTORY_RETENTION_DAYS", "30"))
+MAX_ROWS = 100000
+PRUNE_EVERY_ROWS = 100  # Retention runs on every Nth insert
+BUSY_TIMEOUT_MS = 5000
+DEFAULT_QUERY_LIMIT = 50
+MAX_QUERY_LIMIT = 1000
+
+# Payload keys that are solve parameters rather than part of the instance
+_PARAMETER_KEYS = ("schedulingMode", "solveProfile", "solveOptions")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS solve_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    label TEXT NOT NULL,
+    mode TEXT,
+    fingerprint TEXT NOT NULL,
+    employees INTEGER,
+    days INTEGER,
+    consoles INTEGER,
+    eligible_pairs INTEGER,
+    leave_density REAL,
+    num_vars INTEGER,
+    num_constraints INTEGER,
+    profile TEXT,
+    time_limit REAL,
+    stall_seconds REAL,
+    relative_gap_limit REAL,
+    build_seconds REAL,
+    solve_seconds REAL,
+    status TEXT,
+    objective REAL,
+    bound REAL,
+    gap REAL,
+    solutions INTEGER,
+    stopped_by TEXT,
+    backend TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_solve_runs_label_time ON solve_runs (label, created_at);
+CREATE INDEX IF NOT EXISTS idx_solve_runs_created ON solve_runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_solve_runs_fingerprint ON solve_runs (fingerprint);
+"""
+
+_COLUMNS = (
+    "created_at", "label", "mode", "fingerprint", "employees", "days", "consoles",
+    "eligible_pairs", "leave_density", "num_vars", "num_constraints", "profile",
+    "time_limit", "stall_seconds", "relative_gap_limit", "build_seconds", "solve_seconds",
+    "status", "objective", "bound", "gap", "solutions", "stopped_by", "backend",
+)
+# Columns added after the first release: (name, type), added to older databases on connect
+_ADDED_COLUMNS = (("backend", "TEXT"),)
+
+_init_lock = threading.Lock()
+_initialised_paths = set()
+
+
+def enabled(db_path=None):
+    return bool(db_path or DB_PATH)
+
+
+def _connect(db_path=None):
+    db_path = db_path or DB_PATH
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000.0)
+    conn.row_factory = sqlite3.Row
+    if db_path not in _initialised_paths:
+        with _init_lock:
+            if db_path not in _initialised_paths:
+                # WAL lets the API read while gunicorn threads are writing
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                existing = {row["name"] for row in conn.execute("PRAGMA table_info(solve_runs)")}
+                for name, column_type in _ADDED_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE solve_runs ADD COLUMN {name} {column_type}")
+                _initialised_paths.add(db_path)
+    return conn
+
+
+# --- Instance description ---
+def fingerprint(data):
+    """Stable hash of the instance itself (employees, requests, leave, OJT), ignoring solve parameters."""
+    instance = {k: v for k, v in data.items() if k not in _PARAMETER_KEYS and not k.startswith("_")}
+    canonical = json.dumps(instance, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def instance_features(data):
+    """Size features used to compare runs and predict budgets."""
+    employees_data = data.get("employees", [])
+    requests_data = data.get("requests", [])
+    dates = {req["date"] for req in requests_data}
+    consoles = set()
+    for req in requests_data:
+        consoles.update(req.get("required_competencies", {}).keys())
+
+    leave_days = 0
+    for emp in employees_data:
+        leave_days += sum(1 for d in data.get("leaveData", {}).get(emp["id"], []) if d in dates)
+    capacity = len(employees_data) * len(dates)
+
+    return {
+        "employees": len(employees_data),
+        "days": len(dates),
+        "consoles": len(consoles),
+        "leave_density": round(leave_days / capacity, 4) if capacity else 0.0,
+    }
+
+
+# --- Recording ---
+def record(row, db_path=None):
+    """
+    Insert one solve run. Never raises: history is diagnostics and must not
+    fail a roster request. Returns the new row id, or None.
+    """
+    if not enabled(db_path):
+        return None
+    try:
+        values = [row.get(c) for c in _COLUMNS]
+        conn = _connect(db_path)
+        try:
+            with conn:
+                cursor = conn.execute(
+                    f"INSERT INTO solve_runs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    values,
+                )
+                if cursor.lastrowid % PRUNE_EVERY_ROWS == 0:
+                    _prune(conn, cursor.lastrowid)
+            return cursor.lastrowid
+        finally:
+            conn.close()
+    except Exception as e:
+        sys.stderr.write(f"SolveHistory: Failed to record run: {e}\n")
+        return None
+
+
+def _prune(conn, last_id):
+    """Drop runs older than RETENTION_DAYS, and all but the newest MAX_ROWS."""
+    conn.execute(
+        "DELETE FROM solve_runs WHERE created_at < ? OR id <= ?",
+        (time.time() - RETENTION_DAYS * 86400, last_id - MAX_ROWS),
+    )
+
+
+def record_solve(label, data, solver, status, settings, stats):
+    """
+    Build a history row from a finished CP-SAT solve. `stats` carries what only
+    the caller knows: num_vars, num_constraints, eligible_pairs, build_seconds,
+    solutions, stopped_by.
+    """
+    from ortools.sat.python import cp_model
+
+    has_solution = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    objective = solver.ObjectiveValue() if has_solution else None
+    bound = solver.BestObjectiveBound() if has_solution else None
+    gap = None
+    if objective is not None and bound is not None:
+        gap = abs(objective - bound) / max(1.0, abs(objective))
+
+    row = {
+        "created_at": time.time(),
+        "label": label,
+        "mode": data.get("schedulingMode"),
+        "fingerprint": fingerprint(data),
+        "profile": settings["profile"],
+        "time_limit": settings["time_limit"],
+        "stall_seconds": settings["stall_seconds"],
+        "relative_gap_limit": settings["relative_gap"],
+        "solve_seconds": solver.WallTime(),
+        "status": solver.StatusName(status),
+        "objective": objective,
+        "bound": bound,
+        "gap": gap,
+    }
+    row.update(instance_features(data))
+    row.update(stats)
+    return record(row)
+
+
+# --- Queries ---
+def recent(label=None, mode=None, fingerprint=None, since=None, limit=DEFAULT_QUERY_LIMIT, db_path=None):
+    """Most recent runs first, optionally filtered."""
+    if not enabled(db_path):
+        return []
+    clauses, params = [], []
+    for column, value in (("label", label), ("mode", mode), ("fingerprint", fingerprint)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    params.append(max(1, min(int(limit), MAX_QUERY_LIMIT)))
+
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT * FROM solve_runs {where} ORDER BY created_at DESC LIMIT ?", params)
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    pos = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[pos]
+
+
+def summary(since=None, db_path=None):
+    """Per-scheduler aggregates: run count, solve time percentiles, status mix."""
+    groups = {}
+    for run in recent(since=since, limit=MAX_QUERY_LIMIT, db_path=db_path):
+        groups.setdefault(run["label"], []).append(run)
+
+    result = {}
+    for label, runs in sorted(groups.items()):
+        solve_times = sorted(r["solve_seconds"] for r in runs if r["solve_seconds"] is not None)
+        statuses = {}
+        for r in runs:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        result[label] = {
+            "runs": len(runs),
+            "solve_seconds_p50": _percentile(solve_times, 0.5),
+            "solve_seconds_p95": _percentile(solve_times, 0.95),
+            "solve_seconds_max": solve_times[-1] if solve_times else None,
+            "statuses": statuses,
+        }
+    return result
+
+
+def predict_time_limit(label, num_vars, profile=None, min_runs=1, db_path=None):
+    """
+    p95 solve time of past runs of `label` (and `profile`) within +/-25% of
+    `num_vars` that reached a solution and weren't cancelled. None when fewer
+    than `min_runs` are comparable or history is off.
+    """
+    if not enabled(db_path):
+        return None
+    clauses, params = ["label = ?"], [label]
+    if profile is not None:
+        clauses.append("profile = ?")
+        params.append(profile)
+    params += [int(num_vars * 0.75), int(num_vars * 1.25)]
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT solve_seconds FROM solve_runs WHERE {' AND '.join(clauses)} AND num_vars BETWEEN ? AND ? "
+            "AND status IN ('OPTIMAL', 'FEASIBLE') AND stopped_by IS NOT 'cancelled' ORDER BY solve_seconds",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+    if len(rows) < min_runs:
+        return None
+    return _percentile([r["solve_seconds"] for r in rows], 0.95)
+
+
+# --- CLI ---
+def _print_table(runs):
+    columns = ("id", "label", "mode", "fingerprint", "employees", "days", "num_vars",
+               "build_seconds", "solve_seconds", "status", "objective", "gap")
+    print("\t".join(columns))
+    for run in runs:
+        cells = []
+        for c in columns:
+            v = run.get(c)
+            cells.append(f"{v:.3f}" if isinstance(v, float) else ("" if v is None else str(v)))
+        print("\t".join(cells))
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local solve history.")
+    parser.add_argument("--db", default=None, help="database path (default $SOLVE_HISTORY_DB)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_recent = sub.add_parser("recent", help="list recent runs")
+    p_recent.add_argument("--label")
+    p_recent.add_argument("--mode")
+    p_recent.add_argument("--fingerprint")
+    p_recent.add_argument("--hours", type=float, help="only runs from the last N hours")
+    p_recent.add_argument("--limit", type=int, default=DEFAULT_QUERY_LIMIT)
+
+    p_summary = sub.add_parser("summary", help="aggregate by scheduler")
+    p_summary.add_argument("--hours", type=float)
+
+    p_predict = sub.add_parser("predict", help="suggest a time limit from past runs")
+    p_predict.add_argument("label")
+    p_predict.add_argument("num_vars", type=int)
+
+    args = parser.parse_args(argv)
+    if not enabled(args.db):
+        parser.error("set SOLVE_HISTORY_DB or pass --db")
+    since = time.time() - args.hours * 3600 if getattr(args, "hours", None) else None
+
+    if args.command == "recent":
+        runs = recent(args.label, args.mode, args.fingerprint, since, args.limit, db_path=args.db)
+        if args.json:
+            print(json.dumps(runs, indent=2))
+        else:
+            _print_table(runs)
+    elif args.command == "summary":
+        print(json.dumps(summary(since, db_path=args.db), indent=2))
+    elif args.command == "predict":
+        seconds = predict_time_limit(args.label, args.num_vars, db_path=args.db)
+        print(json.dumps({"label": args.label, "num_vars": args.num_vars, "p95_solve_seconds": seconds}))
+
+
+if __name__ == "__main__":
+    cli()
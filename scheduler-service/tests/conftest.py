@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payload  # noqa: E402
+
+PATTERN = ["Morning", "Morning", "Afternoon", "Afternoon", "Night", "Night", "Off", "Off", "Off", "Off"]
+SHIFTS = ("Morning", "Afternoon", "Night")
+START = date(2026, 3, 1)
+
+
+def dates(days):
+    return [(START + timedelta(days=d)).isoformat() for d in range(days)]
+
+
+@pytest.fixture
+def roster_body():
+    """
+    Factory for small /generate-roster bodies: `competencies` is one list per
+    employee, `demand` {console: count} is required on every shift of every
+    day. Solves run to proven optimality so objectives can be compared.
+    """
+
+    def build(competencies, days, demand, mode="simulation", leave=None, **extra):
+        body = {
+            "employees": [{"id": f"u{i:03d}", "competencies": comps} for i, comps in enumerate(competencies)],
+            "requests": [
+                {"date": d, "shiftType": shift, "location": "East", "required_competencies": dict(demand)}
+                for d in dates(days) for shift in SHIFTS
+            ],
+            "leaveData": leave or {},
+            "ojtData": {},
+            "schedulingMode": mode,
+            "shiftPattern": PATTERN,
+            "solveOptions": {"backend": "cp-sat", "absoluteGap": 0, "relativeGap": 0, "stallSeconds": 0},
+        }
+        body.update(extra)
+        return body
+
+    return build
+
+
+def decode(body):
+    return payload.decode_request(json.dumps(body).encode("utf-8"))
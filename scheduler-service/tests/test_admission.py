@@ -0,0 +1,28 @@
+import admission
+import decompose
+
+
+def test_cost_scales_with_parallel_parts(roster_body, monkeypatch):
+    monkeypatch.setattr(decompose, "MAX_PARALLEL_PARTS", 4)
+    monkeypatch.setattr(admission, "CPU_BUDGET", 64)
+    linked = roster_body([["Radar", "Pilot"]] * 20, 10, {"Radar": 2, "Pilot": 1})
+    split = roster_body([["Radar"], ["Pilot"]] * 10, 10, {"Radar": 2, "Pilot": 1})
+    tiled = dict(split, solveOptions={"tileCycles": True})
+
+    memory, cpus = admission.estimate_cost(linked, "simulation")
+    split_memory, split_cpus = admission.estimate_cost(split, "simulation")
+    tiled_memory, tiled_cpus = admission.estimate_cost(tiled, "simulation")
+
+    assert (cpus, split_cpus, tiled_cpus) == (2, 4, 16)
+    assert split_memory == memory + admission.BASE_JOB_MB
+    assert tiled_memory > split_memory
+
+
+def test_highs_is_not_capped(roster_body, monkeypatch):
+    monkeypatch.setattr(admission, "MB_PER_1K_PAIRS", 1e6)
+    body = roster_body([["Radar"]] * 10, 5, {"Radar": 2})
+    capped, _ = admission.estimate_cost(body, "simulation")
+    uncapped, _ = admission.estimate_cost(dict(body, solveOptions={"backend": "highs"}), "simulation")
+
+    assert capped == admission.BASE_JOB_MB + admission.JOB_CLASSES["simulation"][2]
+    assert uncapped > capped
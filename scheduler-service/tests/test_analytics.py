@@ -0,0 +1,79 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import analytics
+import app
+
+YEAR = 2026
+
+
+def dataset(seed=3):
+    rng = random.Random(seed)
+    users = [
+        {"user_id": f"u{i:03d}", "account_type": "Planner" if i % 10 == 0 else "Non-Planner",
+         "proficiency_grade": rng.randint(1, 9), "team": rng.randint(1, 4)}
+        for i in range(40)
+    ]
+    day = lambda: date(YEAR, 1, 1) + timedelta(days=rng.randrange(-20, 385))
+    rosters = [{"user_id": rng.choice(users)["user_id"], "date": f"{day()}T00:00:00.000Z"} for _ in range(600)]
+    rosters.append({"user_id": "ghost", "date": f"{YEAR}-05-01T00:00:00.000Z"})
+    leaves = [
+        {"user_id": rng.choice(users)["user_id"], "date": f"{day()}T00:00:00.000Z",
+         "leave_type": rng.choice(list(analytics.LEAVE_TYPE_KEYS) + ["Childcare leave"]),
+         "status": rng.choice(["Approved", "Approved", "Pending"])}
+        for _ in range(300)
+    ]
+    return {"users": users, "rosters": rosters, "leaves": leaves}
+
+
+def in_year_month(value):
+    d = date.fromisoformat(value[:10])
+    return d.month - 1 if d.year == YEAR else None
+
+
+def test_metrics_match_a_row_by_row_count():
+    data = dataset()
+    result = analytics.compute(*analytics.load_from_payload(data), YEAR, analytics.ALL_GRADES, analytics.METRICS)
+    staff = {u["user_id"]: u["proficiency_grade"] for u in data["users"] if u["account_type"] == "Non-Planner"}
+
+    for grade in analytics.ALL_GRADES:
+        workforce = sum(1 for g in staff.values() if g == grade)
+        for m in range(12):
+            deployed = {r["user_id"] for r in data["rosters"]
+                        if in_year_month(r["date"]) == m and staff.get(r["user_id"]) == grade}
+            expected = round(len(deployed) / workforce * 100.0, 2) if workforce else 0.0
+            assert result["deploymentRate"][m][f"grade_{grade}"] == pytest.approx(expected)
+
+    for leave_type, key in analytics.LEAVE_TYPE_KEYS.items():
+        for m in range(12):
+            expected = sum(1 for l in data["leaves"] if l["status"] == "Approved"
+                           and l["leave_type"] == leave_type and in_year_month(l["date"]) == m)
+            assert result["leaves"][m][key] == expected
+
+    for row in result["teamProficiency"]:
+        for grade, n in row.items():
+            if grade != "team":
+                assert n == sum(1 for u in data["users"]
+                                if u["team"] == row["team"] and u["proficiency_grade"] == int(grade))
+    assert sum(row["count"] for row in result["workforceStructure"]) == len(staff)
+
+
+def test_results_are_cached_by_data_version():
+    client = app.app.test_client()
+    body = dataset(seed=4)
+    first = client.post(f"/analytics?year={YEAR}&metrics=leaves", json=body).get_json()
+    again = client.post(f"/analytics?year={YEAR}&metrics=leaves", json=body).get_json()
+    assert first["success"] and not first["cached"] and again["cached"]
+    assert again["data"] == first["data"] and list(first["data"]) == ["leaves"]
+
+    body["leaves"].append({"user_id": "u001", "date": f"{YEAR}-02-02", "leave_type": "Medical leave"})
+    changed = client.post(f"/analytics?year={YEAR}&metrics=leaves", json=body).get_json()
+    assert not changed["cached"] and changed["dataVersion"] != first["dataVersion"]
+    assert changed["data"]["leaves"][1]["medical"] == first["data"]["leaves"][1]["medical"] + 1
+
+
+def test_bad_parameters_are_400():
+    response = app.app.test_client().post("/analytics?year=next", json={})
+    assert response.status_code == 400
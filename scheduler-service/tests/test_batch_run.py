@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import batch_run
+import scheduler_registry
+from bench_cold_start import build_team_payload
+
+
+def test_threads_per_job_follow_the_schedulers():
+    import scheduler
+    import scheduler3
+    import scheduler4
+    import scheduler5
+    import repair
+    import risk
+
+    assert set(batch_run.THREADS_PER_JOB) == set(scheduler_registry.SCHEDULER_MODES)
+    assert batch_run.THREADS_PER_JOB["individual"] == scheduler.NUM_SEARCH_WORKERS
+    for mode, module in (("competency", scheduler3), ("simulation", scheduler4), ("simulation-pending", scheduler5)):
+        assert batch_run.THREADS_PER_JOB[mode] == module.NUM_SEARCH_WORKERS * 4
+    assert batch_run.THREADS_PER_JOB["repair"] == repair.NUM_SEARCH_WORKERS
+    assert batch_run.THREADS_PER_JOB["simulation-risk"] == risk.MAX_PROCESSES
+
+
+@pytest.mark.parametrize("cores, mode, jobs", [
+    (16, "individual", 2), (16, "team", 16), (16, "simulation", 2), (16, None, 2), (4, "competency", 1),
+    (16, "no-such-mode", 2), (None, "team", 1),
+])
+def test_default_jobs_divide_the_cores(monkeypatch, cores, mode, jobs):
+    monkeypatch.setattr(batch_run.os, "cpu_count", lambda: cores)
+    assert batch_run.default_jobs(mode) == jobs
+
+
+def test_batch_streams_every_job():
+    body = json.dumps(build_team_payload()).encode("utf-8")
+    jobs = [("a.json", body), ("b.json", body), ("bad.json", b"{")]
+    emitted = []
+    succeeded, failed = batch_run.run_batch(jobs, lambda *row: emitted.append(row), workers=2, quiet=True)
+
+    assert (succeeded, failed) == (2, 1)
+    by_job = {job_id: (result, stats) for job_id, result, stats in emitted}
+    assert by_job["a.json"][0] == by_job["b.json"][0] and by_job["a.json"][1]["mode"] == "team"
+    assert not by_job["bad.json"][1]["ok"] and "error" in by_job["bad.json"][0]
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+import bench_load
+import payload
+from bench_cold_start import free_port
+
+
+@pytest.mark.parametrize("mode", bench_load.MODES)
+def test_built_in_payloads_decode(mode):
+    body = bench_load.build_payload(mode, num_employees=12, num_days=3)
+    data = payload.decode_request(json.dumps(body).encode("utf-8"))
+    assert data["employees"]
+
+
+def test_summary_percentiles_and_errors():
+    samples = [{"mode": "team", "status": 200, "latency": t} for t in (0.1, 0.2, 0.3, 0.4)]
+    samples.append({"mode": "team", "status": None, "latency": 5.0})
+    report = bench_load.summarise(samples, elapsed=2.5)
+    assert report["requests"] == 5 and report["throughput_rps"] == 2.0
+    assert report["errors"] == 1 and report["error_rate"] == 0.2
+    assert report["latency_p50_s"] == 0.3 and report["latency_max_s"] == 5.0
+    assert bench_load.summarise([], elapsed=1.0)["latency_p95_s"] is None
+
+
+@pytest.fixture
+def server():
+    port = free_port()
+    proc = bench_load.start_server("flask", port, threads=4)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        bench_load.wait_until_up(base_url, 60)
+        yield base_url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+@pytest.mark.parametrize("rate", [0.0, 20.0])
+def test_load_run_against_a_live_server(server, rate):
+    mix = [(mode, bench_load.build_payload(mode, num_employees=12, num_days=3), 1.0)
+           for mode in ("team", "competency")]
+    report = bench_load.run_load(server, mix, concurrency=2, rate=rate, duration=60,
+                                 max_requests=6, timeout=60, seed=1)
+    assert report["overall"]["requests"] == 6
+    assert report["overall"]["errors"] == 0
+    assert sum(r["requests"] for r in report["by_mode"].values()) == 6
@@ -0,0 +1,144 @@
+import socket
+import threading
+import time
+
+import pytest
+from ortools.sat.python import cp_model
+
+import admission
+import app
+import cancellation
+import scheduler_registry
+import solve_control
+
+
+def golomb_ruler(marks):
+    """A model CP-SAT can't prove optimal for a long while."""
+    model = cp_model.CpModel()
+    top = marks * marks
+    x = [model.NewIntVar(0, top, "") for _ in range(marks)]
+    model.Add(x[0] == 0)
+    for a, b in zip(x, x[1:]):
+        model.Add(a < b)
+    diffs = []
+    for i in range(marks):
+        for j in range(i + 1, marks):
+            d = model.NewIntVar(1, top, "")
+            model.Add(d == x[j] - x[i])
+            diffs.append(d)
+    model.AddAllDifferent(diffs)
+    model.Minimize(x[-1])
+    return model
+
+
+def slow_solve():
+    solver = cp_model.CpSolver()
+    solver.parameters.num_search_workers = 2
+    solve_control.solve(solver, golomb_ruler(12), {"solveOptions": {"maxTimeSeconds": 60, "stallSeconds": 0}},
+                        60, "Test")
+    return "{}"
+
+
+def test_newer_request_supersedes_only_its_own_session():
+    with cancellation.supersedable(("u", "s")) as first:
+        with cancellation.supersedable(("u", "other")) as other, cancellation.supersedable(None) as unkeyed:
+            assert not first.cancelled and not other.cancelled and not unkeyed.cancelled
+        with cancellation.supersedable(("u", "s")) as second:
+            assert first.cancelled and first.reason == "superseded"
+            assert not second.cancelled
+        with pytest.raises(cancellation.Cancelled):
+            first.raise_if_cancelled()
+    # Finished requests leave nothing behind to cancel
+    assert ("u", "s") not in cancellation._active
+
+
+def test_callbacks_run_once_and_can_be_removed():
+    token = cancellation.CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("kept"))
+    remove = token.on_cancel(lambda: calls.append("removed"))
+    remove()
+    token.cancel("superseded")
+    token.cancel("client disconnected")
+    token.on_cancel(lambda: calls.append("late"))
+    assert calls == ["kept", "late"] and token.reason == "superseded"
+
+
+def test_closed_client_socket_cancels(monkeypatch):
+    monkeypatch.setattr(cancellation, "DISCONNECT_POLL_SECONDS", 0.02)
+    server, client = socket.socketpair()
+    token = cancellation.CancelToken()
+    with cancellation.watch_disconnect(server, token):
+        time.sleep(0.1)
+        assert not token.cancelled
+        client.close()
+        deadline = time.time() + 2
+        while not token.cancelled and time.time() < deadline:
+            time.sleep(0.02)
+    server.close()
+    assert token.reason == "client disconnected"
+
+
+def test_cancel_stops_a_running_search():
+    token = cancellation.CancelToken()
+    threading.Timer(0.5, token.cancel, args=("superseded",)).start()
+    started = time.time()
+    with cancellation.attached(token), pytest.raises(cancellation.Cancelled):
+        slow_solve()
+    assert time.time() - started < 5
+
+
+@pytest.fixture
+def slow_scheduler(monkeypatch):
+    """
+    /generate-roster runs a long search for rosters of four or more staff and
+    returns at once for smaller ones; `solving` is set while a search runs.
+    """
+    solving = threading.Event()
+
+    def main(data):
+        if len(data["employees"]) < 4:
+            return "{}"
+        solving.set()
+        return slow_solve()
+
+    monkeypatch.setattr(scheduler_registry, "get_scheduler", lambda mode: main)
+    # Otherwise the quick requests queue behind the slow one on a small machine
+    monkeypatch.setattr(admission, "ENABLED", False)
+    return solving
+
+
+def post(body, session, results):
+    headers = {cancellation.USER_HEADER: "planner", cancellation.SESSION_HEADER: session}
+    response = app.app.test_client().post("/generate-roster", json=body, headers=headers)
+    results.append((response.status_code, time.time()))
+
+
+def test_http_request_is_superseded_by_the_same_session(roster_body, slow_scheduler):
+    body = roster_body([["Radar"]] * 4, 1, {"Radar": 1}, mode="competency")
+    quick = roster_body([["Radar"]] * 3, 1, {"Radar": 1}, mode="competency")
+    first = []
+    thread = threading.Thread(target=post, args=(body, "tab-1", first))
+    thread.start()
+    assert slow_scheduler.wait(10)
+
+    other = []
+    post(quick, "tab-2", other)
+    assert other[0][0] == 200 and thread.is_alive()
+
+    newer = []
+    post(quick, "tab-1", newer)
+    thread.join(10)
+    assert newer[0][0] == 200 and first[0][0] == 409
+
+
+def test_http_request_reports_a_disconnect(roster_body, slow_scheduler):
+    body = roster_body([["Radar"]] * 4, 1, {"Radar": 1}, mode="competency")
+    results = []
+    thread = threading.Thread(target=post, args=(body, "tab-1", results))
+    thread.start()
+    assert slow_scheduler.wait(10)
+    (token,) = [t for key, t in cancellation._active.items() if key == ("planner", "tab-1")]
+    token.cancel("client disconnected")
+    thread.join(10)
+    assert results[0][0] == 499
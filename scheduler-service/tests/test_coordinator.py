@@ -0,0 +1,79 @@
+import pytest
+
+import admission
+import bench_load
+import coordinator
+import solve_control
+from bench_cold_start import free_port
+from conftest import decode
+
+
+def test_shard_timeout_covers_queue_wait_and_solve():
+    assert coordinator.SHARD_TIMEOUT_SECONDS > admission.MAX_QUEUE_WAIT_SECONDS + solve_control.MAX_TIME_LIMIT_SECONDS
+
+
+@pytest.fixture(scope="module")
+def peers():
+    procs, urls = [], []
+    try:
+        for _ in range(2):
+            port = free_port()
+            procs.append(bench_load.start_server("flask", port, threads=4))
+            urls.append(f"http://127.0.0.1:{port}")
+        for url in urls:
+            bench_load.wait_until_up(url, 60)
+        yield urls
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+def people_per_day(roster):
+    return {
+        date_str: [e["user_id"] for shifts in sites.values() for entries in shifts.values() for e in entries]
+        for date_str, sites in roster.items()
+    }
+
+
+def test_windows_are_solved_across_peers_and_merged(roster_body, peers):
+    body = roster_body([["Radar"]] * 16, 6, {"Radar": 1}, sharding={"shardBy": "window", "windowDays": 2})
+    result, status = coordinator.coordinate(decode(body), peers=peers)
+
+    assert status == 200 and result["stats"]["shardBy"] == "window"
+    assert {report["peer"] for report in result["stats"]["shards"]} == set(peers)
+    days = people_per_day(result["data"])
+    assert sorted(days) == sorted({req["date"] for req in body["requests"]})
+    assert all(len(people) == 3 == len(set(people)) for people in days.values())
+
+
+def test_failed_peer_is_retried_on_the_next(roster_body, peers):
+    dead = f"http://127.0.0.1:{free_port()}"
+    body = roster_body([["Radar"]] * 8, 2, {"Radar": 1}, mode="competency")
+    result, status = coordinator.coordinate(decode(body), peers=[dead, peers[0]])
+
+    assert status == 200
+    (report,) = result["stats"]["shards"]
+    assert [a["peer"] for a in report["attempts"]] == [dead, peers[0]] and report["peer"] == peers[0]
+
+
+def test_scenarios_come_back_side_by_side(roster_body, peers):
+    body = roster_body([["Radar"]] * 8, 2, {"Radar": 1}, mode="competency", sharding={
+        "shardBy": "scenario",
+        "scenarios": [{"name": "base"}, {"name": "u000 off", "overrides": {"leaveData": {"u000": ["2026-03-01"]}}}],
+    })
+    result, status = coordinator.coordinate(decode(body), peers=peers)
+
+    assert status == 200 and set(result["data"]) == {"base", "u000 off"}
+    assert "u000" not in people_per_day(result["data"]["u000 off"])["2026-03-01"]
+
+
+def test_rejected_shard_is_not_retried(roster_body, peers):
+    body = roster_body([["Radar"]] * 4, 1, {"Radar": 1}, mode="competency")
+    data = decode(body)
+    data["requests"][0]["date"] = "2026-02-30"
+    result, status = coordinator.coordinate(data, peers=peers)
+
+    assert status == 502
+    (report,) = result["stats"]["shards"]
+    assert len(report["attempts"]) == 1 and report["attempts"][0]["status"] == 400
@@ -0,0 +1,84 @@
+import json
+import random
+
+import pytest
+
+import draft
+import presolve
+import scheduler_registry
+from conftest import decode
+
+CONSOLES = ["Radar", "Pilot", "Berth", "VTIS"]
+UNPRUNED = {presolve.STATE_KEY: {"round": presolve.MAX_RESTORE_ROUNDS}}
+
+
+def random_body(roster_body, seed, mode):
+    rng = random.Random(seed)
+    body = roster_body([rng.sample(CONSOLES, rng.randint(1, 2)) for _ in range(20)], 5, {}, mode=mode)
+    for req in body["requests"]:
+        req["required_competencies"] = {c: rng.randint(0, 2) for c in rng.sample(CONSOLES, 2)}
+    ids = [emp["id"] for emp in body["employees"]]
+    body["leaveData"] = {rng.choice(ids): ["2026-03-02"]}
+    body["pendingLeaves"] = [{"user_id": rng.choice(ids), "start_date": "2026-03-03T00:00:00.000Z",
+                              "end_date": "2026-03-04T00:00:00.000Z"}]
+    return body
+
+
+def entries(roster):
+    for date_str, sites in roster.items():
+        for site, shifts in sites.items():
+            for shift_name, day_entries in shifts.items():
+                for entry in day_entries:
+                    yield date_str, site, shift_name, entry
+
+
+def test_greedy_fill_serves_scarce_consoles_first():
+    rank = lambda key, candidate: candidate
+    slots = {
+        (0, 0, 0, "Radar"): (2, [(0, 0), (1, 0), (2, 0)]),
+        (0, 1, 0, "Pilot"): (2, [(1, 1), (3, 1)]),
+    }
+    filled = draft.greedy_fill(slots, {"Pilot": 2.0, "Radar": 0.5}, rank)
+    assert filled == {(0, 1, 0, "Pilot"): [1, 3], (0, 0, 0, "Radar"): [0, 2]}
+
+    # Nobody works twice a day; a slot with too few candidates comes back short
+    filled = draft.greedy_fill({(0, 0, 0, "Radar"): (3, [(0, 0)]), (0, 1, 0, "Pilot"): (1, [(0, 1)])},
+                               {"Radar": 1.0}, rank)
+    assert filled == {(0, 0, 0, "Radar"): [0], (0, 1, 0, "Pilot"): []}
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_draft_roster_keeps_the_eligibility_rules(roster_body, seed):
+    body = random_body(roster_body, seed, "draft")
+    roster = json.loads(scheduler_registry.get_scheduler("draft")(decode(body)))
+    certified = {emp["id"]: set(emp["competencies"]) for emp in body["employees"]}
+    off = {(user, d) for user, days in body["leaveData"].items() for d in days}
+    off |= {(leave["user_id"], d) for leave in body["pendingLeaves"] for d in ("2026-03-03", "2026-03-04")}
+    demand = {(req["date"], req["shiftType"], c): n for req in body["requests"]
+              for c, n in req["required_competencies"].items()}
+
+    placed = {}
+    seen = set()
+    for date_str, _, shift_name, entry in entries(roster):
+        user, console = entry["user_id"], entry["assigned_console"]
+        assert (user, date_str) not in seen and (user, date_str) not in off
+        assert console in certified[user]
+        seen.add((user, date_str))
+        key = (date_str, shift_name, console)
+        placed[key] = placed.get(key, 0) + 1
+    assert all(n <= demand[key] for key, n in placed.items())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_solver_hint_is_the_draft_roster(roster_body, capsys, seed):
+    # With pruning off, scheduler4's greedy hint and draft mode fill the same slots
+    body = random_body(roster_body, seed, "simulation")
+    body.pop("pendingLeaves")
+    data = decode(body)
+    data.update(UNPRUNED)
+    scheduler_registry.get_scheduler("simulation")(data)
+    hinted = int(capsys.readouterr().err.split("Greedy hint leaves ")[1].split()[0])
+
+    roster = json.loads(scheduler_registry.get_scheduler("draft")(decode(dict(body, schedulingMode="draft"))))
+    required = sum(sum(req["required_competencies"].values()) for req in body["requests"])
+    assert hinted == required - sum(1 for _ in entries(roster))
@@ -0,0 +1,62 @@
+import random
+
+import leave_impact
+import risk
+from conftest import dates
+
+CONSOLES = ["Radar", "Pilot", "Berth"]
+
+
+def impact_body(roster_body, seed):
+    rng = random.Random(seed)
+    competencies = [rng.sample(CONSOLES, rng.randint(1, 2)) for _ in range(18)]
+    body = roster_body(competencies, 10, {"Radar": 2, "Pilot": 1, "Berth": 1})
+    horizon = dates(10)
+    candidates = []
+    for emp in rng.sample(body["employees"], 5):
+        start = rng.randrange(8)
+        candidates.append({"user_id": emp["id"], "start_date": horizon[start], "end_date": horizon[start + 2]})
+    body["candidateLeaves"] = candidates
+    return body
+
+
+def rematched_shortfall(body, user_ids):
+    """Slots short on the leave days of `user_ids`, re-matched from scratch with them away, minus before."""
+    index = {emp["id"]: i for i, emp in enumerate(body["employees"])}
+    absent = {}
+    for leave in body["candidateLeaves"]:
+        if leave["user_id"] in user_ids:
+            for d in risk.leave_dates(leave):
+                absent.setdefault(d, set()).add(index[leave["user_id"]])
+    engines, _ = risk.build_engines(body, dates=set(absent))
+    return sum(
+        sum(engine.shortfall(absent[d]).values()) - sum(engine.shortfall(set()).values())
+        for d, engine in engines.items()
+    )
+
+
+def test_shortfall_matches_rematching(roster_body):
+    for seed in range(10):
+        body = impact_body(roster_body, seed)
+        response, status = leave_impact.evaluate(body)
+        assert status == 200
+        data = response["data"]
+
+        for result in data["candidates"]:
+            assert result["shortfallAdded"] == rematched_shortfall(body, {result["user_id"]})
+            assert result["absorbed"] == (result["shortfallAdded"] == 0)
+        all_ids = {leave["user_id"] for leave in body["candidateLeaves"]}
+        assert data["combined"]["shortfallAdded"] == rematched_shortfall(body, all_ids)
+
+
+def test_moves_stay_on_certified_consoles(roster_body):
+    body = impact_body(roster_body, 3)
+    competencies = {emp["id"]: set(emp["competencies"]) for emp in body["employees"]}
+    response, _ = leave_impact.evaluate(body)
+
+    for result in response["data"]["candidates"]:
+        for day in result["days"]:
+            if day["status"] == "assigned" and day["absorbed"]:
+                assert day["console"] in competencies[day["coveredBy"]] or day["moves"]
+                for move in day["moves"]:
+                    assert move["console"] in competencies[move["user_id"]]
@@ -0,0 +1,70 @@
+import pytest
+from ortools.sat.python import cp_model
+
+import mip_backend
+import scheduler_registry
+import solve_control
+from conftest import decode
+
+pytestmark = pytest.mark.skipif(not mip_backend.available(), reason="SciPy is not installed")
+
+
+def small_model(maximize):
+    """Every translated constraint kind, negated literals and an objective offset."""
+    model = cp_model.CpModel()
+    x = [model.NewBoolVar(f"x{i}") for i in range(6)]
+    count = model.NewIntVar(0, 4, "count")
+    model.Add(sum(x[:4]) == count)
+    model.AddBoolOr([x[0], x[1].Not()]).OnlyEnforceIf(x[2])
+    model.AddBoolAnd([x[3], x[4].Not()]).OnlyEnforceIf(x[5])
+    model.AddAtMostOne([x[1], x[2], x[5]])
+    model.AddExactlyOne([x[0], x[4]])
+    objective = 3 * x[0] - 2 * x[1].Not() + 5 * x[5] - 4 * count + 7
+    if maximize:
+        model.Maximize(objective)
+    else:
+        model.Minimize(objective + 10 * x[4].Not())
+    return model
+
+
+def cp_sat_values(model):
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    proto = model.Proto()
+    return solver.ObjectiveValue(), [solver.Value(model.GetIntVarFromProtoIndex(i)) for i in range(len(proto.variables))]
+
+
+@pytest.mark.parametrize("maximize", [False, True])
+def test_translated_objective_matches_cp_sat(maximize):
+    model = small_model(maximize)
+    objective, values = cp_sat_values(model)
+    translation = mip_backend.MipTranslation(model.Proto())
+    assert translation.objective(values) == pytest.approx(objective)
+
+    solver = translation.new_solver()
+    assert solver.solve(translation) == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == pytest.approx(objective)
+    assert solver.BestObjectiveBound() == pytest.approx(objective)
+
+
+def test_unsupported_constraints_are_rejected():
+    model = cp_model.CpModel()
+    a, b = model.NewIntVar(0, 5, "a"), model.NewIntVar(0, 5, "b")
+    model.AddMultiplicationEquality(a, [b, b])
+    with pytest.raises(mip_backend.Unsupported):
+        mip_backend.MipTranslation(model.Proto())
+
+
+@pytest.mark.parametrize("mode", ["competency", "simulation"])
+def test_highs_roster_objective_matches_cp_sat(roster_body, mode):
+    competencies = [["Radar", "Pilot"] if i % 3 == 0 else ["Radar"] for i in range(12)]
+    body = roster_body(competencies, 4, {"Radar": 2, "Pilot": 1}, mode=mode, leaveData={"u002": ["2026-03-02"]})
+    scheduler_registry.get_scheduler(mode)(decode(body))
+    cp_sat = solve_control.last_result()
+
+    body["solveOptions"] = dict(body["solveOptions"], backend="highs")
+    scheduler_registry.get_scheduler(mode)(decode(body))
+    highs = solve_control.last_result()
+
+    assert cp_sat[0] == highs[0] == "OPTIMAL"
+    assert highs[1] == pytest.approx(cp_sat[1])
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import app
+import payload
+
+ROUTES = ["/generate-roster", "/coordinate-roster"]
+
+
+def post(route, body):
+    data = body if isinstance(body, (bytes, str)) else json.dumps(body)
+    return app.app.test_client().post(route, data=data, content_type="application/json")
+
+
+def mutate(roster_body, change):
+    body = roster_body([["Radar"]] * 4, 2, {"Radar": 1})
+    change(body)
+    return body
+
+
+CASES = {
+    "wrong type": (lambda b: b["employees"][0].update(competencies="Radar"), "competencies"),
+    "missing field": (lambda b: b["requests"][0].pop("shiftType"), "shiftType"),
+    "not iso date": (lambda b: b["requests"][0].update(date="01/03/2026"), "date"),
+    "not a calendar date": (lambda b: b["requests"][0].update(date="2026-02-30"), "2026-02-30"),
+    "duplicate id": (lambda b: b["employees"][1].update(id="u000"), "duplicate employee id"),
+    "unknown site": (lambda b: b.update(sites=["West"]), "listed sites"),
+    "unknown shift type": (lambda b: b.update(shiftTypes=["Morning", "Night"]), "'Afternoon'"),
+    "simulation without pattern": (lambda b: b.update(shiftPattern=[]), "shiftPattern"),
+}
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_invalid_payloads_raise(roster_body, case):
+    change, detail = CASES[case]
+    with pytest.raises(payload.PayloadError) as excinfo:
+        payload.decode_request(json.dumps(mutate(roster_body, change)).encode("utf-8"))
+    assert detail in " ".join(excinfo.value.details)
+
+
+@pytest.mark.parametrize("route", ROUTES)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_invalid_payloads_are_400(roster_body, route, case):
+    change, detail = CASES[case]
+    response = post(route, mutate(roster_body, change))
+    assert response.status_code == 400
+    assert detail in " ".join(response.get_json()["details"])
+
+
+@pytest.mark.parametrize("route", ROUTES)
+def test_malformed_json_is_400(route):
+    response = post(route, b'{"employees": [')
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Malformed JSON"
+
+
+def test_listed_shift_types_are_accepted(roster_body):
+    body = roster_body([["Radar"]] * 4, 2, {"Radar": 1},
+                       shiftTypes=[{"name": "Morning", "group": "day"}, "Afternoon", "Night"])
+    data = payload.decode_request(json.dumps(body).encode("utf-8"))
+    assert len(data["requests"]) == 6 and data["shiftTypes"][1] == "Afternoon"
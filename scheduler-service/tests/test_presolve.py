@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+import decompose
+import presolve
+import scheduler_registry
+import solve_control
+from conftest import decode
+
+CONSOLES = ["Radar", "Pilot", "Berth", "VTIS", "East Control"]
+UNPRUNED = {presolve.STATE_KEY: {"round": presolve.MAX_RESTORE_ROUNDS}}
+
+
+def solve(body, extra=None):
+    data = decode(body)
+    data.update(extra or {})
+    scheduler_registry.get_scheduler(body["schedulingMode"])(data)
+    return solve_control.last_result()
+
+
+def random_body(roster_body, seed, mode):
+    rng = random.Random(seed)
+    competencies = [rng.sample(CONSOLES, rng.randint(1, 3)) for _ in range(rng.randint(12, 30))]
+    days = rng.randint(3, 6)
+    body = roster_body(competencies, days, {}, mode=mode)
+    for req in body["requests"]:
+        req["required_competencies"] = {c: rng.randint(0, 3) for c in rng.sample(CONSOLES, 3)}
+    body["leaveData"] = {
+        emp["id"]: sorted({req["date"] for req in body["requests"] if rng.random() < 0.05})
+        for emp in body["employees"]
+    }
+    return body
+
+
+@pytest.mark.parametrize("keep", [0, 1])
+@pytest.mark.parametrize("mode", ["competency", "simulation", "simulation-pending"])
+@pytest.mark.parametrize("seed", range(4))
+def test_pruned_objective_matches_unpruned(roster_body, monkeypatch, seed, mode, keep):
+    monkeypatch.setattr(presolve, "KEEP_BEYOND_DEMAND", keep)
+    body = random_body(roster_body, seed, mode)
+
+    pruned_status, pruned = solve(body)
+    unpruned_status, unpruned = solve(body, UNPRUNED)
+
+    assert pruned_status == unpruned_status == "OPTIMAL"
+    assert pruned == pytest.approx(unpruned)
+
+
+def test_scarce_console_needs_no_restore(roster_body, capsys):
+    # Two Pilot holders for two Pilot seats a shift: every day is short, but no
+    # pruned candidate could fill a Pilot seat, so no day is restored
+    competencies = [["Radar"] + (["Pilot"] if i < 2 else []) for i in range(60)]
+    body = roster_body(competencies, 9, {"Radar": 4, "Pilot": 2})
+
+    pruned_status, pruned = solve(body)
+    assert "Restoring" not in capsys.readouterr().err
+    unpruned_status, unpruned = solve(body, UNPRUNED)
+
+    assert pruned_status == unpruned_status == "OPTIMAL"
+    assert pruned == pytest.approx(unpruned)
+
+
+@pytest.mark.parametrize("mode", ["competency", "simulation", "simulation-pending"])
+def test_only_uncertified_days_are_resolved(roster_body, monkeypatch, mode):
+    monkeypatch.setattr(presolve, "KEEP_BEYOND_DEMAND", 0)
+    rng = random.Random(2)
+    body = roster_body([rng.sample(CONSOLES, rng.randint(1, 3)) for _ in range(30)], 9, {}, mode=mode)
+    for req in body["requests"]:
+        req["required_competencies"] = {c: rng.randint(0, 3) for c in rng.sample(CONSOLES, 3)}
+
+    retried = []
+    run_parts = decompose.run_parts
+
+    def record(main_fn, parts, label):
+        if any(presolve.STATE_KEY in sub for _, sub in parts):
+            retried.extend(parts)
+        return run_parts(main_fn, parts, label)
+
+    monkeypatch.setattr(decompose, "run_parts", record)
+    data = decode(body)
+    roster = json.loads(scheduler_registry.get_scheduler(mode)(data))
+    pruned_status, pruned = solve_control.last_result()
+    unpruned_status, unpruned = solve(body, UNPRUNED)
+
+    retried_dates = {req["date"] for _, sub in retried for req in sub["requests"]}
+    assert 0 < len(retried_dates) < 9
+    assert all(sub[solve_control.TIME_CAP_KEY] < solve_control.MAX_TIME_LIMIT_SECONDS for _, sub in retried)
+    assert sorted(roster) == sorted({req["date"] for req in body["requests"]})
+    for date_str, sites in roster.items():
+        people = [e["user_id"] for shifts in sites.values() for entries in shifts.values() for e in entries]
+        assert len(people) == len(set(people))
+    assert pruned_status == unpruned_status == "OPTIMAL"
+    assert pruned == pytest.approx(unpruned)
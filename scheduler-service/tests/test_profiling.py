@@ -0,0 +1,29 @@
+import json
+import pstats
+
+import app
+import profiling
+
+
+def test_part_workers_are_profiled_into_one_report(roster_body, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    # Site-disjoint staff, so the request thread fans out to two part workers
+    body = roster_body([["Radar"]] * 12, 3, {"Radar": 1}, mode="competency")
+    body["requests"] += [dict(req, location="West") for req in body["requests"]]
+    for i, emp in enumerate(body["employees"]):
+        emp["sites"] = ["East"] if i % 2 else ["West"]
+
+    client = app.app.test_client()
+    response = client.post("/generate-roster", json=body, headers={profiling.PROFILE_HEADER: "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+
+    summary = client.get(f"/profiles/{profile_id}").get_json()
+    assert summary["profiledThreads"] == 3
+    assert "process-wide" in summary["tracemallocScope"]
+    assert len(summary["solves"]) == 2
+
+    stats = pstats.Stats(profiling.artifact_path(profile_id, "profile.pstats"))
+    solves = [calls for (path, _, name), (_, calls, *_) in stats.stats.items()
+              if path.endswith("solve_control.py") and name == "solve"]
+    assert solves == [2]
@@ -0,0 +1,89 @@
+import json
+import random
+
+import pytest
+
+import app
+import payload
+import repair
+import scheduler_registry
+from conftest import dates, decode
+
+DATE = "2026-03-01"
+
+
+def repair_body(roster, employees, user_id, days, **extra):
+    return dict({"roster": roster, "employees": employees, "disruption": {"user_id": user_id, "dates": days}}, **extra)
+
+
+def decode_repair(body):
+    return payload.decode_repair(json.dumps(body).encode("utf-8"))
+
+
+def run_repair(body):
+    response = app.app.test_client().post("/repair-roster", json=body)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def assignments(roster, date_str):
+    return [
+        (site, shift_name, entry["user_id"], entry["assigned_console"])
+        for site, shifts in roster.get(date_str, {}).items()
+        for shift_name, entries in shifts.items()
+        for entry in entries if not entry["is_ojt"]
+    ]
+
+
+def test_neighbourhood_swaps_a_holder_to_free_a_console():
+    # The only reserve holds Radar, the vacancy is Pilot: h has to move to Pilot for r to take Radar
+    employees = [
+        {"id": "p", "competencies": ["Pilot"], "offset": 0},
+        {"id": "h", "competencies": ["Radar", "Pilot"], "offset": 0},
+        {"id": "r", "competencies": ["Radar"], "offset": 0},
+    ]
+    roster = {DATE: {"East": {"Morning": [
+        {"user_id": "p", "assigned_console": "Pilot", "is_ojt": False},
+        {"user_id": "h", "assigned_console": "Radar", "is_ojt": False},
+    ]}}}
+    result = run_repair(repair_body(roster, employees, "p", [DATE], shiftPattern=["Morning"]))
+
+    assert sorted(assignments(result["roster"], DATE)) == [("East", "Morning", "h", "Pilot"), ("East", "Morning", "r", "Radar")]
+    assert result["unfilled"] == []
+    assert result["stats"]["neighbourhood_filled"] == 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_repaired_rosters_stay_feasible(roster_body, seed):
+    rng = random.Random(seed)
+    competencies = [rng.sample(["Radar", "Pilot", "Berth"], rng.randint(1, 2)) for _ in range(24)]
+    body = roster_body(competencies, 5, {"Radar": 2, "Pilot": 1, "Berth": 1}, mode="competency")
+    roster = json.loads(scheduler_registry.get_scheduler("competency")(decode(body)))
+    certified = {emp["id"]: set(emp["competencies"]) for emp in body["employees"]}
+
+    day = rng.choice(dates(5))
+    user_id = rng.choice([user for _, _, user, _ in assignments(roster, day)])
+    on_leave = rng.choice(list(certified))
+    result = json.loads(repair.main(decode_repair(repair_body(
+        roster, body["employees"], user_id, [day], leaveData={on_leave: [day]},
+    ))))
+
+    after = assignments(result["roster"], day)
+    people = [user for _, _, user, _ in after]
+    assert len(people) == len(set(people))
+    assert user_id not in people
+    assert all(console in certified[user] for _, _, user, console in after)
+    assert on_leave not in {change["added"] for change in result["changes"]}
+    assert len(after) == len(assignments(roster, day)) - len(result["unfilled"])
+
+
+@pytest.mark.parametrize("body, detail", [
+    ({"disruption": {"user_id": "p", "dates": [DATE]}}, "roster"),
+    ({"roster": {DATE: {}}, "disruption": {"user_id": "p", "dates": []}}, "dates"),
+    ({"roster": {DATE: {"East": {"Dusk": []}}}, "disruption": {"user_id": "p", "dates": [DATE]}}, "Dusk"),
+    ({"roster": {"2026-02-30": {}}, "disruption": {"user_id": "p", "dates": [DATE]}}, "2026-02-30"),
+])
+def test_bad_repair_payloads_are_400(body, detail):
+    response = app.app.test_client().post("/repair-roster", json=body)
+    assert response.status_code == 400
+    assert detail in " ".join(response.get_json()["details"])
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+import pytest
+
+import app
+import reserve_pool
+
+DATE = "2026-03-01"
+
+
+@pytest.fixture(autouse=True)
+def empty_store(monkeypatch):
+    monkeypatch.setattr(reserve_pool, "_indexes", OrderedDict())
+
+
+def index(*grades_and_counts):
+    """One Morning reserve slot on DATE per (proficiency_grade, reserve_deploy_count)."""
+    employees = [
+        {"id": f"u{i:03d}", "competencies": ["Radar"] + (["Pilot"] if i % 2 else []),
+         "proficiency_grade": grade, "reserve_deploy_count": count}
+        for i, (grade, count) in enumerate(grades_and_counts)
+    ]
+    return reserve_pool.build_index(employees, [DATE], [(0, e, 0) for e in range(len(employees))], ["Morning"])
+
+
+def test_replacements_rank_lowest_grade_then_least_deployed():
+    reserve_pool.publish(index((3, 0), (1, 5), (1, 2), (2, 0)), "Scheduler3", "competency")
+
+    candidates, _ = reserve_pool.find_replacements(DATE, "Morning")
+    assert [c["user_id"] for c in candidates] == ["u002", "u001", "u003", "u000"]
+
+    candidates, _ = reserve_pool.find_replacements(DATE, "Morning", console="Pilot", min_grade=2)
+    assert [c["user_id"] for c in candidates] == ["u003"]
+
+
+@pytest.mark.parametrize("mode", ["simulation", "simulation-pending", "draft", None])
+def test_date_lookup_skips_what_if_solves(mode):
+    roster_id = reserve_pool.publish(index((1, 0)), "Scheduler3", "competency")
+    what_if_id = reserve_pool.publish(index((1, 0), (2, 0)), "Scheduler4", mode)
+
+    assert reserve_pool.find_replacements(DATE, "Morning")[1] == roster_id
+    candidates, used = reserve_pool.find_replacements(DATE, "Morning", index_id=what_if_id)
+    assert used == what_if_id and len(candidates) == 2
+
+
+def test_simulation_alone_serves_no_replacements(roster_body):
+    body = roster_body([["Radar"]] * 12, 3, {"Radar": 1}, mode="simulation")
+    client = app.app.test_client()
+    response = client.post("/generate-roster", json=body)
+    assert response.status_code == 200
+    simulation_id = response.headers["X-Reserve-Index-Id"]
+
+    assert client.get("/replacements", query_string={"date": DATE, "shift": "Morning"}).status_code == 404
+    scoped = client.get("/replacements", query_string={"date": DATE, "shift": "Morning", "indexId": simulation_id})
+    assert scoped.status_code == 200 and scoped.get_json()["indexId"] == simulation_id
+
+    client.post("/generate-roster", json=dict(body, schedulingMode="competency"))
+    latest = client.get("/replacements", query_string={"date": DATE, "shift": "Morning"})
+    assert latest.status_code == 200 and latest.get_json()["indexId"] != simulation_id
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import risk
+
+DATES = ["2026-03-01", "2026-03-02", "2026-03-03"]
+
+
+def body(**extra):
+    # u000 alone covers the Radar slot every day; u001 works Morning too but isn't certified
+    data = {
+        "employees": [{"id": "u000", "competencies": ["Radar"]}, {"id": "u001", "competencies": ["Pilot"]}],
+        "requests": [{"date": d, "shiftType": "Morning", "location": "East", "required_competencies": {"Radar": 1}}
+                     for d in DATES],
+        "leaveData": {"u000": [DATES[2]]},
+        "ojtData": {},
+        "shiftPattern": ["Morning"],
+        "pendingLeaves": [{"user_id": "u000", "start_date": f"{DATES[0]}T00:00:00.000Z",
+                           "end_date": f"{DATES[0]}T00:00:00.000Z", "approvalProbability": 0.3}],
+        "riskSeed": 7,
+    }
+    data.update(extra)
+    return data
+
+
+def by_date(result):
+    return {row["date"]: row for row in result["risk"]}
+
+
+def test_default_samples_run_in_process():
+    result = json.loads(risk.main(body()))
+    assert result["stats"]["samples"] == risk.DEFAULT_SAMPLES
+    assert result["stats"]["processes"] == 1
+
+    rows = by_date(result)
+    assert rows[DATES[0]]["shortfallProbability"] == pytest.approx(0.3, abs=0.04)
+    assert rows[DATES[0]]["baselineShortfall"] == 0
+    assert DATES[1] not in rows
+    assert rows[DATES[2]] | {"date": None} == {
+        "date": None, "shift": "Morning", "location": "East", "console": "Radar",
+        "shortfallProbability": 1.0, "expectedShortfall": 1.0, "baselineShortfall": 1,
+    }
+
+
+def test_process_pool_agrees_with_one_process(monkeypatch):
+    single = json.loads(risk.main(body(riskSamples=4000)))
+    monkeypatch.setattr(risk, "MIN_SAMPLES_PER_PROCESS", 2000)
+    monkeypatch.setattr(risk.os, "cpu_count", lambda: 2)
+    pooled = json.loads(risk.main(body(riskSamples=4000)))
+
+    assert (single["stats"]["processes"], pooled["stats"]["processes"]) == (1, 2)
+    assert by_date(pooled).keys() == by_date(single).keys()
+    for date_str, row in by_date(pooled).items():
+        assert row["shortfallProbability"] == pytest.approx(by_date(single)[date_str]["shortfallProbability"], abs=0.04)
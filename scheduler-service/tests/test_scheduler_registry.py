@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import subprocess
+
+import scheduler_registry
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fresh_modules(code, stdin=""):
+    """Module names loaded after running `code` in a clean interpreter."""
+    script = f"import sys, json\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    out = subprocess.run([sys.executable, "-c", script], cwd=SERVICE_DIR, input=stdin, capture_output=True, text=True)
+    assert out.returncode == 0, out.stderr
+    return set(json.loads(out.stdout.splitlines()[-1]))
+
+
+def test_app_import_loads_no_scheduler():
+    modules = fresh_modules("import app")
+    assert "ortools" not in modules
+    assert not modules.intersection({"scheduler", "scheduler3", "scheduler4", "scheduler5", "repair"})
+
+
+def test_team_mode_never_loads_ortools(roster_body):
+    body = roster_body([["Radar"]] * 6, 3, {"Radar": 1}, mode="team")
+    for i, emp in enumerate(body["employees"]):
+        emp["team"] = i % 2 + 1
+    modules = fresh_modules(
+        "import app\n"
+        "response = app.app.test_client().post('/generate-roster', json=json.load(sys.stdin))\n"
+        "assert response.status_code == 200, response.get_data()",
+        stdin=json.dumps(body),
+    )
+    assert "scheduler2" in modules
+    assert "ortools" not in modules
+
+
+def test_unknown_mode_falls_back_to_individual():
+    assert scheduler_registry.resolve_mode("nonsense") == scheduler_registry.DEFAULT_MODE
+    assert scheduler_registry.resolve_mode("draft") == "draft"
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import decompose
+import scheduler_registry
+import site_registry
+from conftest import decode
+
+
+def test_defaults_extend_with_request_sites_and_shifts():
+    registry = site_registry.from_payload({"requests": [
+        {"date": "2026-03-01", "shiftType": "Evening", "location": "North"},
+        {"date": "2026-03-01", "shiftType": "Morning", "location": "East"},
+    ]})
+    assert registry.site_names == ["East", "West", "North"]
+    assert registry.shift_names == ["Morning", "Afternoon", "Night", "Evening"]
+    assert registry.shift_of("OFF") == site_registry.OFF and registry.shift_of("Dusk") is None
+
+
+def test_swaps_stay_inside_a_shift_group():
+    registry = site_registry.from_payload({"shiftTypes": [
+        {"name": "Early", "group": "day"}, {"name": "Late", "group": "day"}, "Night",
+    ]})
+    early, late, night = (registry.shift_index[n] for n in ("Early", "Late", "Night"))
+    assert registry.can_work_shift(early, late)
+    assert not registry.can_work_shift(early, night)
+    assert not registry.can_work_shift(site_registry.OFF, early)
+
+
+def entries(roster):
+    return [
+        (date_str, site, shift_name, entry["user_id"])
+        for date_str, sites in roster.items()
+        for site, shifts in sites.items()
+        for shift_name, day_entries in shifts.items()
+        for entry in day_entries
+    ]
+
+
+# Only the simulation schedulers take a custom shiftPattern
+@pytest.mark.parametrize("mode", ["simulation", "simulation-pending"])
+def test_custom_sites_and_shifts_shape_the_roster(roster_body, mode):
+    body = roster_body([["Radar"]] * 16, 4, {"Radar": 1}, mode=mode,
+                       sites=["Harbour", "Bay"], shiftTypes=[{"name": "Day", "group": "day"}, "Night"],
+                       shiftPattern=["Day", "Day", "Night", "Night", "OFF", "OFF"])
+    for req in body["requests"]:
+        req["shiftType"] = "Day" if req["shiftType"] != "Night" else "Night"
+        req["location"] = "Harbour"
+    bay = dict(body["requests"][0], location="Bay")
+    body["requests"].append(bay)
+    for i, emp in enumerate(body["employees"]):
+        emp["sites"] = ["Harbour", "Bay"] if i % 2 else ["Harbour"]
+
+    roster = json.loads(scheduler_registry.get_scheduler(mode)(decode(body)))
+    assert all(set(sites) == {"Harbour", "Bay"} for sites in roster.values())
+    assert all(set(shifts) == {"Day", "Night"} for sites in roster.values() for shifts in sites.values())
+    at_bay = {user for _, site, _, user in entries(roster) if site == "Bay"}
+    assert at_bay and all(int(user[1:]) % 2 for user in at_bay)
+
+
+@pytest.mark.parametrize("mode", ["competency", "simulation"])
+def test_site_parts_merge_into_one_roster(roster_body, monkeypatch, mode):
+    # East and West share no staff, so the payload is solved as two models
+    body = roster_body([["Radar"]] * 24, 5, {"Radar": 1}, mode=mode, leaveData={"u004": ["2026-03-02"]})
+    body["requests"] += [dict(req, location="West") for req in body["requests"]]
+    for i, emp in enumerate(body["employees"]):
+        emp["sites"] = ["East"] if i % 2 else ["West"]
+    registry = site_registry.from_payload(body)
+    assert len(decompose.split_by_site(decode(body), registry)) == 2
+
+    split = entries(json.loads(scheduler_registry.get_scheduler(mode)(decode(body))))
+    monkeypatch.setattr(decompose, "split_by_site", lambda data, registry: None)
+    whole = entries(json.loads(scheduler_registry.get_scheduler(mode)(decode(body))))
+
+    assert len(split) == len(whole) == len(body["requests"])
+    assert all((site == "East") == (int(user[1:]) % 2 == 1) for _, site, _, user in split)
+    assert not any(user == "u004" and date_str == "2026-03-02" for date_str, _, _, user in split)
@@ -0,0 +1,36 @@
+import pytest
+
+import scheduler_registry
+import solve_control
+from conftest import decode
+
+
+@pytest.mark.parametrize("profile", sorted(solve_control.SOLVE_PROFILES))
+@pytest.mark.parametrize("step", [100, 5000])
+def test_absolute_gap_stays_below_one_objective_step(profile, step):
+    settings = solve_control.resolve_settings({"solveProfile": profile}, 60, 1000, objective_step=step)
+    assert 0 <= settings["absolute_gap"] < step
+    assert settings["relative_gap"] == 0
+
+
+def test_absolute_gap_option_overrides_profile():
+    data = {"solveOptions": {"absoluteGap": 7}}
+    assert solve_control.resolve_settings(data, 60, 1000, objective_step=100)["absolute_gap"] == 7
+    assert solve_control.resolve_settings({}, 60, 1000)["absolute_gap"] == 0
+
+
+@pytest.mark.parametrize("mode", ["individual", "competency"])
+def test_default_profile_matches_exact_objective(roster_body, mode):
+    competencies = [["Radar", "Pilot"] if i % 4 == 0 else ["Radar"] for i in range(20)]
+    body = roster_body(competencies, 7, {"Radar": 2, "Pilot": 1}, mode=mode,
+                       leaveData={"u001": ["2026-03-02"], "u004": ["2026-03-03", "2026-03-04"]})
+    exact = body["solveOptions"]
+    scheduler_registry.get_scheduler(mode)(decode(body))
+    exact_result = solve_control.last_result()
+
+    body["solveOptions"] = {"backend": exact["backend"]}
+    scheduler_registry.get_scheduler(mode)(decode(body))
+    default_result = solve_control.last_result()
+
+    assert exact_result[0] == "OPTIMAL"
+    assert default_result[1] == pytest.approx(exact_result[1])
@@ -0,0 +1,38 @@
+import time
+
+import solve_history
+
+
+def run(label="Scheduler3", num_vars=1000, solve_seconds=1.0, **extra):
+    return dict({"created_at": time.time(), "label": label, "fingerprint": "f", "profile": "balanced",
+                 "num_vars": num_vars, "solve_seconds": solve_seconds, "status": "OPTIMAL"}, **extra)
+
+
+def test_disabled_without_db(monkeypatch):
+    monkeypatch.setattr(solve_history, "DB_PATH", "")
+    assert solve_history.record(run()) is None
+    assert solve_history.recent() == []
+    assert solve_history.predict_time_limit("Scheduler3", 1000) is None
+
+
+def test_retention_keeps_newest_rows(tmp_path, monkeypatch):
+    db = str(tmp_path / "history.sqlite3")
+    monkeypatch.setattr(solve_history, "PRUNE_EVERY_ROWS", 1)
+    monkeypatch.setattr(solve_history, "MAX_ROWS", 3)
+    solve_history.record(run(created_at=time.time() - (solve_history.RETENTION_DAYS + 1) * 86400), db_path=db)
+    for seconds in range(5):
+        solve_history.record(run(solve_seconds=seconds), db_path=db)
+
+    assert [r["solve_seconds"] for r in solve_history.recent(db_path=db)] == [4, 3, 2]
+
+
+def test_predict_needs_enough_comparable_runs(tmp_path):
+    db = str(tmp_path / "history.sqlite3")
+    for seconds in (1, 2, 3, 4):
+        solve_history.record(run(solve_seconds=seconds), db_path=db)
+    solve_history.record(run(solve_seconds=50, stopped_by="cancelled"), db_path=db)
+    solve_history.record(run(solve_seconds=60, num_vars=5000), db_path=db)
+    solve_history.record(run(solve_seconds=70, profile="thorough"), db_path=db)
+
+    assert solve_history.predict_time_limit("Scheduler3", 1000, "balanced", min_runs=5, db_path=db) is None
+    assert solve_history.predict_time_limit("Scheduler3", 1000, "balanced", min_runs=4, db_path=db) == 4
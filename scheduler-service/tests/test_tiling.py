@@ -0,0 +1,26 @@
+import pytest
+
+import scheduler_registry
+import solve_control
+from conftest import dates, decode
+
+
+def solve(body, tile):
+    body = dict(body, solveOptions=dict(body["solveOptions"], tileCycles=tile))
+    scheduler_registry.get_scheduler(body["schedulingMode"])(decode(body))
+    return solve_control.last_result()
+
+
+@pytest.mark.parametrize("mode", ["competency", "simulation", "simulation-pending"])
+def test_tiled_objective_matches_untiled(roster_body, capsys, mode):
+    horizon = dates(25)
+    competencies = [["Radar", "Pilot"] if i % 3 == 0 else ["Radar"] for i in range(24)]
+    leave = {"u001": horizon[3:6], "u006": horizon[12:13], "u009": horizon[20:22]}
+    body = roster_body(competencies, 25, {"Radar": 2, "Pilot": 1}, mode=mode, leave=leave)
+
+    tiled_status, tiled = solve(body, True)
+    assert "Tiled roster merged" in capsys.readouterr().err
+    untiled_status, untiled = solve(body, False)
+
+    assert tiled_status == untiled_status == "OPTIMAL"
+    assert tiled == pytest.approx(untiled)
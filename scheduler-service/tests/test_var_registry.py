@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from var_registry import AssignmentRegistry
+
+
+def random_registry(seed, size=200):
+    rng = random.Random(seed)
+    model = cp_model.CpModel()
+    registry = AssignmentRegistry()
+    model.NewBoolVar("before")  # proto indexes don't start at 0
+    added = []
+    for _ in range(size):
+        key = (rng.randrange(6), rng.randrange(4), rng.randrange(3), rng.randrange(2),
+               rng.choice(["Radar", "Pilot", "Berth"]))
+        registry.add(model, *key)
+        added.append(key)
+    return model, registry.freeze(), added
+
+
+def grouped(added, key_of):
+    """The dict of lists the schedulers built while adding variables."""
+    groups = {}
+    for k, key in enumerate(added):
+        groups.setdefault(key_of(key), []).append(k)
+    return groups
+
+
+def as_lists(groups):
+    return [(key, indexes.tolist()) for key, indexes in groups.items()]
+
+
+def test_groups_match_dicts_built_while_adding():
+    for seed in range(3):
+        _, registry, added = random_registry(seed)
+        assert as_lists(registry.by_employee_day()) == list(grouped(added, lambda key: key[:2]).items())
+        assert as_lists(registry.by_slot()) == list(grouped(added, lambda key: key[1:]).items())
+
+
+def test_keys_and_console_lookup():
+    _, registry, added = random_registry(4)
+    assert list(registry.keys()) == added
+    assert [registry.key(k) for k in range(len(registry))] == added
+    assert registry.indexes_for_console("Pilot").tolist() == [k for k, key in enumerate(added) if key[4] == "Pilot"]
+    assert len(registry.indexes_for_console("Tower")) == 0
+
+
+def test_chosen_reads_the_solution_vector():
+    model, registry, added = random_registry(5, size=20)
+    wanted = [k for k in range(len(registry)) if k % 3 == 0]
+    for k, v in enumerate(registry.vars):
+        model.Add(v == (k in wanted))
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    values = np.array([solver.Value(model.GetBoolVarFromProtoIndex(i)) for i in range(len(model.Proto().variables))])
+    assert registry.chosen(values).tolist() == wanted
+    assert [v.Index() for v in registry.vars_at(np.array(wanted))] == registry.var_index[wanted].tolist()
+
+
+def test_empty_registry_has_no_groups():
+    registry = AssignmentRegistry().freeze()
+    assert registry.by_employee_day() == {}
+    assert registry.by_slot() == {}
+    assert len(registry.indexes_for_console("Radar")) == 0
@@ -0,0 +1,63 @@
+import copy
+
+import app
+import payload
+import scheduler_registry
+import solve_control
+from conftest import decode
+
+
+def upload(client, employees):
+    response = client.post("/workforce-snapshots", json={"employees": employees})
+    assert response.status_code == 200
+    return response.get_json()["data"]["snapshotId"]
+
+
+def test_snapshot_ids_follow_content(roster_body):
+    client = app.app.test_client()
+    employees = roster_body([["Radar"], ["Radar", "Pilot"]], 1, {})["employees"]
+    snapshot_id = upload(client, employees)
+    assert upload(client, [dict(reversed(list(emp.items()))) for emp in employees]) == snapshot_id
+    assert upload(client, employees[:1]) != snapshot_id
+
+    info = client.get(f"/workforce-snapshots/{snapshot_id}").get_json()["data"]
+    assert (info["employees"], info["competencies"]) == (2, 2)
+    assert client.get("/workforce-snapshots/nope").status_code == 404
+    bad = client.post("/workforce-snapshots", json={"employees": employees + employees[:1]})
+    assert bad.status_code == 400 and "duplicate" in bad.get_json()["details"][0]
+
+
+def test_roster_from_a_snapshot_matches_inline_employees(roster_body):
+    client = app.app.test_client()
+    body = roster_body([["Radar", "Pilot"] if i % 3 else ["Radar"] for i in range(16)], 4,
+                       {"Radar": 1, "Pilot": 1}, mode="competency")
+    snapshot_id = upload(client, body["employees"])
+    employees, workforce = payload.get_snapshot(snapshot_id)
+    before = copy.deepcopy(employees)
+
+    solve = scheduler_registry.get_scheduler("competency")
+    solve(decode(body))
+    inline = solve_control.last_result()
+    by_snapshot = dict(body, employees=[], workforceSnapshot=snapshot_id)
+    solve(decode(by_snapshot))
+    offsets = dict(workforce._offsets)
+    assert solve_control.last_result() == inline
+    response = client.post("/generate-roster", json=by_snapshot)
+    assert response.status_code == 200 and set(response.get_json()) == {req["date"] for req in body["requests"]}
+
+    # Solves share the snapshot: they must not change it, and they reuse its offsets
+    assert employees == before
+    assert offsets and all(workforce._offsets[key] is value for key, value in offsets.items())
+
+
+def test_unknown_evicted_and_conflicting_snapshots(roster_body, monkeypatch):
+    monkeypatch.setattr(payload, "MAX_SNAPSHOTS", 2)
+    client = app.app.test_client()
+    body = roster_body([["Radar"]] * 3, 1, {"Radar": 1}, mode="competency")
+    ids = [upload(client, [dict(emp, competencies=[f"C{n}"]) for emp in body["employees"]]) for n in range(3)]
+
+    evicted = client.post("/generate-roster", json=dict(body, employees=[], workforceSnapshot=ids[0]))
+    assert evicted.status_code == 404 and ids[0] in evicted.get_json()["details"][0]
+    assert client.post("/generate-roster", json=dict(body, employees=[], workforceSnapshot=ids[2])).status_code == 200
+    both = client.post("/generate-roster", json=dict(body, workforceSnapshot=ids[2]))
+    assert both.status_code == 400 and "not both" in both.get_json()["details"][0]
@@ -0,0 +1,164 @@
+"""
+Periodic tiling for pattern-aligned horizons (solveOptions.tileCycles).
+
+Once pattern offsets are fixed, the scheduler3/4/5 model separates by day,
+and a day's subproblem depends only on its position in the pattern cycle
+(its index in the sorted request dates, mod the pattern length), its
+requests, and the leave and OJT falling on it. Days agreeing on the first
+two with no leave or OJT are the same problem: one day of each such class
+is solved and its roster (and reserve slots) copied to the rest. Days with
+leave or OJT are re-solved on their own, in runs of consecutive days.
+
+Every part carries the whole horizon's console scarcity, which weights
+understaffing in the objective, so the tiled roster is the one the whole
+model would find (up to ties) and the objectives add up to its objective.
+"""
+import sys
+import json
+import time
+
+import payload
+import presolve
+import reserve_pool
+import site_registry
+import solve_control
+import decompose
+
+# Console scarcity of the whole horizon, carried into the parts like payload.WORKFORCE_KEY
+SCARCITY_KEY = "_horizonScarcity"
+
+
+def enabled(data):
+    return bool((data.get("solveOptions") or {}).get("tileCycles"))
+
+
+def _signature(requests):
+    """Order-independent fingerprint of one day's requests (everything but the date)."""
+    return tuple(sorted(
+        json.dumps({k: v for k, v in req.items() if k != "date"}, sort_keys=True) for req in requests
+    ))
+
+
+def _disrupted_dates(data, request_dates):
+    """Request dates with leave or OJT for anyone in this payload."""
+    employee_ids = {emp["id"] for emp in data.get("employees", [])}
+    disrupted = set()
+    for user_id, days in data.get("leaveData", {}).items():
+        if user_id in employee_ids:
+            disrupted.update(d for d in days if d in request_dates)
+    for date_str, users in data.get("ojtData", {}).items():
+        if date_str in request_dates and any(u in employee_ids and shifts for u, shifts in users.items()):
+            disrupted.add(date_str)
+    return disrupted
+
+
+def sub_payload(data, offsets, start, dates, requests, scarcity, pattern_length):
+    """Payload for `dates`, starting at horizon day `start`: offsets are re-based so patterns line up."""
+    sub = {k: v for k, v in data.items() if k not in (payload.WORKFORCE_KEY, presolve.STATE_KEY)}
+    sub["employees"] = [
+        dict(emp, offset=(o + start) % pattern_length) for emp, o in zip(data.get("employees", []), offsets)
+    ]
+    sub["requests"] = requests
+    sub["ojtData"] = {d: users for d, users in data.get("ojtData", {}).items() if d in dates}
+    sub[SCARCITY_KEY] = scarcity
+    return sub
+
+
+def plan_cycles(data, pattern_length):
+    """
+    [(name, sub-payload, first, copy_to)] when tiling saves solving at least
+    one day, else None. Cycle-day parts solve date `first` alone and their
+    roster is copied to the dates in `copy_to`; runs of disrupted days have
+    first=None and copy_to=[].
+    """
+    if not enabled(data) or pattern_length <= 0:
+        return None
+    requests_data = data.get("requests", [])
+    by_date = {}
+    for req in requests_data:
+        by_date.setdefault(req["date"], []).append(req)
+    all_dates = sorted(by_date)
+    disrupted = _disrupted_dates(data, by_date)
+
+    classes = {}  # (cycle position, request signature) -> clean dates
+    for d_idx, date_str in enumerate(all_dates):
+        if date_str not in disrupted:
+            classes.setdefault((d_idx % pattern_length, _signature(by_date[date_str])), []).append(d_idx)
+    if len(classes) + len(disrupted) >= len(all_dates):
+        return None
+
+    offsets = payload.workforce_for(data).balanced_offsets(data.get("employees", []), requests_data, pattern_length)
+    scarcity = data.get(SCARCITY_KEY) or site_registry.console_scarcity(data.get("employees", []), requests_data)
+
+    parts = []
+    for d_indexes in classes.values():
+        first = all_dates[d_indexes[0]]
+        copy_to = [all_dates[i] for i in d_indexes[1:]]
+        sub = sub_payload(data, offsets, d_indexes[0], {first}, by_date[first], scarcity, pattern_length)
+        parts.append((f"{first} x{len(d_indexes)}", sub, first, copy_to))
+
+    run = []
+    for d_idx, date_str in enumerate(all_dates + [None]):
+        if date_str in disrupted:
+            run.append(d_idx)
+            continue
+        if run:
+            dates = {all_dates[i] for i in run}
+            requests = [req for d in sorted(dates) for req in by_date[d]]
+            sub = sub_payload(data, offsets, run[0], dates, requests, scarcity, pattern_length)
+            parts.append((f"{min(dates)}..{max(dates)}", sub, None, []))
+            run = []
+
+    sys.stderr.write(
+        f"Tiling: {len(all_dates)} days -> {len(classes)} cycle days tiled over {len(all_dates) - len(disrupted)} "
+        f"days, {len(disrupted)} days with leave or OJT re-solved\n"
+    )
+    return parts
+
+
+def _tile_index(index, first, copy_to):
+    if first not in index["slots"]:
+        return index
+    slots = dict(index["slots"], **{date_str: index["slots"][first] for date_str in copy_to})
+    return dict(index, slots=slots)
+
+
+def solve_tiled(main_fn, parts, label):
+    """
+    Solve the parts from plan_cycles, copy each cycle day to its class and
+    merge everything, like decompose.solve_parts (reserve pool index and
+    this thread's solve_control.last_result included).
+    """
+    start = time.time()
+    outcomes = decompose.run_parts(main_fn, [(name, sub) for name, sub, _, _ in parts], label)
+
+    rosters = []
+    indexes = []
+    statuses = []
+    objective = 0
+    for (name, result, index, (status_name, part_objective)), (_, _, first, copy_to) in zip(outcomes, parts):
+        parsed = json.loads(result)
+        if isinstance(parsed, dict) and "error" in parsed:
+            parsed["error"] = f"[{name}] {parsed['error']}"
+            return json.dumps(parsed)
+        if first in parsed:
+            # The copies share the day's entries; they are only read when the roster is serialised
+            parsed.update({date_str: parsed[first] for date_str in copy_to})
+        rosters.append(parsed)
+        if index is not None:
+            indexes.append(_tile_index(index, first, copy_to))
+        statuses.append(status_name)
+        if objective is not None and part_objective is not None:
+            objective += part_objective * (1 + len(copy_to))
+        else:
+            objective = None
+
+    if indexes:
+        reserve_pool.publish(reserve_pool.merge(indexes), label, parts[0][1].get("schedulingMode"))
+
+    status_name = "OPTIMAL" if all(s == "OPTIMAL" for s in statuses) else "FEASIBLE"
+    solve_control.note_result(status_name, objective)
+    sys.stderr.write(
+        f"{label}: Tiled roster merged in {time.time() - start:.2f}s (status={status_name}, objective={objective})\n"
+    )
+    return json.dumps(dict(sorted(decompose.merge_rosters(rosters).items())))
@@ -0,0 +1,102 @@
+"""
+Flat registry of the scheduler3/4/5 assignment variables.
+
+Variable k (in creation order) puts employee `emp[k]` on day `day[k]`,
+shift `shift[k]`, site `site[k]` and console `console[k]`, an integer
+interned through `console_names`; `var_index[k]` is its index in the model
+proto. The columns are compact arrays while the model is built and NumPy
+arrays once frozen. The per employee-day and per-slot groups the schedulers
+constrain are index arrays into them, and a solution is read back as one
+vector (solve_control.solution_values) rather than a solver.Value call per
+variable.
+"""
+from array import array
+
+import numpy as np
+
+NO_INDEXES = np.zeros(0, dtype=np.int64)
+
+
+class AssignmentRegistry:
+    def __init__(self):
+        self.console_names = []
+        self.console_id = {}
+        self.vars = []  # cp_model BoolVars by k, for building constraints
+        self.emp, self.day, self.shift, self.site, self.console = (array("i") for _ in range(5))
+        self.var_index = array("q")
+
+    def __len__(self):
+        return len(self.vars)
+
+    def add(self, model, e_idx, d_idx, s_idx, l_idx, console):
+        console_id = self.console_id.get(console)
+        if console_id is None:
+            console_id = self.console_id[console] = len(self.console_names)
+            self.console_names.append(console)
+        v = model.NewBoolVar("")
+        self.vars.append(v)
+        self.emp.append(e_idx)
+        self.day.append(d_idx)
+        self.shift.append(s_idx)
+        self.site.append(l_idx)
+        self.console.append(console_id)
+        self.var_index.append(v.Index())
+        return v
+
+    def freeze(self):
+        """Switch the columns to NumPy arrays once every variable is in."""
+        for name in ("emp", "day", "shift", "site", "console", "var_index"):
+            setattr(self, name, np.asarray(getattr(self, name)))
+        return self
+
+    def key(self, k):
+        """(e_idx, d_idx, s_idx, l_idx, console name) of variable k."""
+        return (int(self.emp[k]), int(self.day[k]), int(self.shift[k]), int(self.site[k]),
+                self.console_names[self.console[k]])
+
+    def keys(self):
+        names = self.console_names
+        return zip(self.emp.tolist(), self.day.tolist(), self.shift.tolist(), self.site.tolist(),
+                   [names[c] for c in self.console.tolist()])
+
+    def vars_at(self, indexes):
+        return [self.vars[k] for k in indexes.tolist()]
+
+    def _groups(self, columns):
+        """
+        (key, indexes) for each distinct combination of `columns`, ordered by
+        first use and with k ascending inside each, as dicts of lists built
+        while adding variables would have them.
+        """
+        if not len(self):
+            return []
+        order = np.lexsort(columns[::-1])  # stable, first column primary
+        ordered = [c[order] for c in columns]
+        starts = np.zeros(len(order), dtype=bool)
+        starts[0] = True
+        for c in ordered:
+            starts[1:] |= c[1:] != c[:-1]
+        starts = np.flatnonzero(starts)
+        keys = zip(*(c[starts].tolist() for c in ordered))
+        groups = zip(keys, np.split(order, starts[1:]))
+        return sorted(groups, key=lambda group: group[1][0])
+
+    def by_employee_day(self):
+        """{(e_idx, d_idx): indexes}"""
+        return dict(self._groups((self.emp, self.day)))
+
+    def by_slot(self):
+        """{(d_idx, s_idx, l_idx, console name): indexes}"""
+        names = self.console_names
+        return {
+            (d_idx, s_idx, l_idx, names[c]): indexes
+            for (d_idx, s_idx, l_idx, c), indexes in self._groups((self.day, self.shift, self.site, self.console))
+        }
+
+    def indexes_for_console(self, console):
+        console_id = self.console_id.get(console)
+        return NO_INDEXES if console_id is None else np.flatnonzero(self.console == console_id)
+
+    def chosen(self, values):
+        """Ascending k of the variables set in `values`, the solution vector by proto index."""
+        return np.flatnonzero(values[self.var_index])